@@ -5,8 +5,15 @@ import torch
 from model.textgeneration import DialogKoGPT2
 from kogpt2_transformers import get_kogpt2_tokenizer
 import emotionchat_config as config
+from model.registry import registry
+from model.device import DevicePolicy
+from model.batching import MicroBatcher
 #from recommend_contents import recommendContents
-import emotionchat_engine
+from emotionchat_session import LabelAggregator
+
+TOKENIZER_KEY = 'kogpt2_tokenizer'
+BATCHER_KEY = 'kogpt2_batcher'
+
 
 class EmotionAnswerer(BaseAnswerer):
     """
@@ -15,23 +22,86 @@ class EmotionAnswerer(BaseAnswerer):
     :return : 챗봇 답변 메세지
     """
 
-    def __init__(self):
+    def __init__(self, policy: DevicePolicy = None):
         #self.root_path = '/home/user/ittp'
         self.data_path = "./model/textgeneration/data/wellness_dialog_for_autoregressive_train.txt"
         self.checkpoint_path = "./model/textgeneration/model"
         self.save_ckpt_path = f"{self.checkpoint_path}/kogpt2-wellnesee-auto-regressive-0504_10.pth"
 
-        ctx = "cuda" if torch.cuda.is_available() else "cpu"
-        self.device = torch.device(ctx)
+        self.policy = policy if policy is not None else DevicePolicy.from_config()
+        self.device = self.policy.device
+        self.dtype = self.policy.dtype
+
+        # 저장한 Checkpoint와 토크나이저는 레지스트리에서 한 번만 로드해서 공유
+        self.model = registry.acquire(self.save_ckpt_path, self._load_model, self.device, self.dtype)
+        self.tokenizer = registry.acquire(TOKENIZER_KEY, get_kogpt2_tokenizer)
+
+        # batching 모드면 여러 세션의 생성 요청을 모아 한 번에 generate (batcher도 인스턴스 간 공유)
+        self.batcher = None
+        if config.BATCHING['enabled']:
+            self.batcher = registry.acquire(BATCHER_KEY, lambda: MicroBatcher(self.generate_batch, name='kogpt2'),
+                                            self.device, self.dtype)
+
+    def _load_model(self) -> DialogKoGPT2:
+        """
+        KoGPT2 체크포인트를 불러옵니다. (레지스트리에서 처음 요청될 때만 호출됨)
+        """
+
+        model = DialogKoGPT2()
+        model.load_state_dict(torch.load(self.save_ckpt_path, map_location=self.policy.map_location())['model_state_dict'])
+        return self.policy.to(model)
+
+    def close(self):
+        """
+        레지스트리에서 빌려온 모델과 토크나이저를 반납합니다.
+        """
+
+        registry.release(self.save_ckpt_path, self.device, self.dtype)
+        registry.release(TOKENIZER_KEY)
+        if self.batcher is not None:
+            registry.release(BATCHER_KEY, self.device, self.dtype)
+
+    def generate_text(self, text: str) -> str:
+        """
+        KoGPT2로 답변 문장을 생성합니다. (batching 모드면 다른 세션 요청과 묶어서 생성)
+
+        :param text: human utterance
+        :return: 디코딩된 생성 문장
+        """
 
-        # 저장한 Checkpoint 불러오기
-        # self.checkpoint = torch.load(self.save_ckpt_path, map_location=self.device)
-        # self.checkpoint = torch.load(self.save_ckpt_path, map_location='cpu')
-        self.model = DialogKoGPT2()
-        self.model.load_state_dict(torch.load(self.save_ckpt_path, map_location=self.device)['model_state_dict'])
-        self.tokenizer = get_kogpt2_tokenizer()
+        if self.batcher is not None:
+            return self.batcher(text)
 
-        self.model.eval()
+        return self.generate_batch([text])[0]
+
+    def generate_batch(self, texts: list) -> list:
+        """
+        여러 문장을 왼쪽 padding해서 한 번의 generate로 답변을 생성합니다.
+
+        :param texts: human utterance 리스트
+        :return: 문장별 디코딩된 생성 문장 리스트
+        """
+
+        prompts = [[self.tokenizer.bos_token_id, ] + self.tokenizer.encode(text) + [self.tokenizer.eos_token_id]
+                   for text in texts]
+        prompt_len = max(len(prompt) for prompt in prompts)
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None \
+            else self.tokenizer.eos_token_id
+
+        # 생성은 오른쪽으로 이어지므로 padding은 왼쪽에 둠
+        input_ids = torch.tensor([[pad_id] * (prompt_len - len(prompt)) + prompt for prompt in prompts])
+        attention_mask = torch.tensor([[0] * (prompt_len - len(prompt)) + [1] * len(prompt) for prompt in prompts])
+
+        with self.policy.inference():
+            sample_output = self.model.generate(input_ids=input_ids.to(self.device),
+                                                attention_mask=attention_mask.to(self.device),
+                                                pad_token_id=pad_id)
+
+        # 문장별로 num_return_sequences개가 연속으로 나오므로 각 묶음의 첫 번째만 사용
+        num_return_sequences = sample_output.shape[0] // len(texts)
+        return [self.tokenizer.decode(sample_output[i * num_return_sequences].tolist()[prompt_len - 1:],
+                                      skip_special_tokens=True)
+                for i in range(len(texts))]
 
     def generate_answer_collection(self, emotion: str, pre_emotion: str, pre_emotions: list, max_emotion_prob: float, topic: str, max_topic_prob: float, text,
                                    turn_cnt: int, pre_emotion_prob: list) -> str:
@@ -45,16 +115,8 @@ class EmotionAnswerer(BaseAnswerer):
 
             # for i in range(5):
             sent = text  # ex) '요즘 기분이 우울한 느낌이에요'
-            tokenized_indexs = self.tokenizer.encode(sent)
-
-            input_ids = torch.tensor(
-                [self.tokenizer.bos_token_id, ] + tokenized_indexs + [self.tokenizer.eos_token_id]).unsqueeze(0)
-            # set top_k to 50
             # 답변 생성
-            sample_output = self.model.generate(input_ids=input_ids)
-
-            msg_decode = self.tokenizer.decode(sample_output[0].tolist()[len(tokenized_indexs) + 1:],
-                                               skip_special_tokens=True)
+            msg_decode = self.generate_text(sent)
 
             # 문장 자르기(문장 2개까지만 나오게)
 
@@ -98,16 +160,8 @@ class EmotionAnswerer(BaseAnswerer):
 
             # for i in range(5):
             sent = text  # ex) '요즘 기분이 우울한 느낌이에요'
-            tokenized_indexs = self.tokenizer.encode(sent)
-
-            input_ids = torch.tensor(
-                [self.tokenizer.bos_token_id, ] + tokenized_indexs + [self.tokenizer.eos_token_id]).unsqueeze(0)
-            # set top_k to 50
             # 답변 생성
-            sample_output = self.model.generate(input_ids=input_ids)
-
-            msg_decode = self.tokenizer.decode(sample_output[0].tolist()[len(tokenized_indexs) + 1:],
-                                               skip_special_tokens=True)
+            msg_decode = self.generate_text(sent)
 
             # 문장 자르기(문장 2개까지만 나오게)
 
@@ -151,16 +205,8 @@ class EmotionAnswerer(BaseAnswerer):
 
         # for i in range(5):
         sent = text  # ex) '요즘 기분이 우울한 느낌이에요'
-        tokenized_indexs = self.tokenizer.encode(sent)
-
-        input_ids = torch.tensor(
-            [self.tokenizer.bos_token_id, ] + tokenized_indexs + [self.tokenizer.eos_token_id]).unsqueeze(0)
-        # set top_k to 50
         # 답변 생성
-        sample_output = self.model.generate(input_ids=input_ids)
-
-        msg_decode = self.tokenizer.decode(sample_output[0].tolist()[len(tokenized_indexs) + 1:],
-                                           skip_special_tokens=True)
+        msg_decode = self.generate_text(sent)
         print("(system msg) emotion_answerer > generate_answer_under5 함수 실행")
 
         # 문장 자르기(문장 2개까지만 나오게)
@@ -182,16 +228,18 @@ class EmotionAnswerer(BaseAnswerer):
 
         return msg
 
-    def generate_answer_over5(self, emotions: str) -> str:
+    def generate_answer_over5(self, emotions) -> str:
         """
         default 감정 답변 출력 함수
         감정-주제도 명확히 안잡히면서 turn 수 5회 초과일 때
-        :param text: human utterance
-        :param emotion: 감정-주제 분류 모델의 return값(6가지 감정 + None(threshold 만족 X)
+        :param emotions: 이전까지의 감정 기록 리스트(최신순) 또는 세션 감정 집계기(LabelAggregator)
         :return: chatbot response
         """
 
-        emotion = emotionchat_engine.most_freq(emotions)
+        # 세션 집계기가 넘어오면 기록을 다시 훑지 않고 최빈 감정을 바로 조회
+        if not isinstance(emotions, LabelAggregator):
+            emotions = LabelAggregator.from_history(emotions, [0.] * len(emotions))
+        emotion = emotions.mode()
 
         # 감정의 종류 : 기쁨 분노 슬픔 놀람 불안 신뢰
         if emotion in ['기쁨', '평온함']:
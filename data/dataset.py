@@ -8,6 +8,7 @@ from pandas import DataFrame
 from torch import Tensor
 from torch.utils.data import TensorDataset, DataLoader
 
+from data.feature_cache import FeatureCache
 from data.organizer import Organizer
 from data.preprocessor import Preprocessor
 from decorators.decorators import data
@@ -31,8 +32,8 @@ class Dataset:
         self.org = Organizer()
         self.prep = Preprocessor(naver_fix=naver_fix)
 
-        self.intent_dict = self.org.organize_intent()
-        self.entity_dict = self.org.organize_entity()
+        self.intent_dict, self.entity_dict = self.org.organize()
+        # 원본 데이터가 바뀌었을 때만 통합 파일과 라벨 딕셔너리를 다시 만듦
 
     def load_embed(self) -> list:
         """
@@ -58,19 +59,33 @@ class Dataset:
     def load_intent(self, emb_processor: BaseProcessor) -> tuple:
         """
         인텐트 프로세서 학습용 데이터를 생성합니다.
+        데이터와 임베딩 모델이 바뀌지 않았으면 캐시된 feature 파일을 memory map으로 읽습니다.
 
         :param emb_processor: 임베딩 과정이 들어가므로 임베딩 프로세서를 입력해야합니다.
         :return: 인텐트 프로세서 학습용 데이터셋입니다.
         """
 
-        intent_dataset = pd.read_csv(self.intent_data_dir)
-        intent_train, intent_test = self.__make_intent(intent_dataset, emb_processor)
-        intent_train, intent_test = self.__mini_batch(intent_train), self.__mini_batch(intent_test)
+        cache = FeatureCache('intent')
+        data_files = [self.intent_data_dir] + (self.__ood_files() if self.ood else [])
+        key = cache.make_key(data_files, emb_processor)
+
+        if not cache.exists(key):
+            intent_dataset = pd.read_csv(self.intent_data_dir)
+            intent_train, intent_test = self.__make_intent(intent_dataset, emb_processor)
+            splits = {'train': intent_train, 'test': intent_test}
+
+            if self.ood:
+                ood_dataset = self.__load_ood()
+                splits['ood_train'], splits['ood_test'] = self.__make_intent(ood_dataset, emb_processor)
+
+            cache.save(key, splits)
+
+        intent_train = self.__mini_batch(cache.load(key, 'train'))
+        intent_test = self.__mini_batch(cache.load(key, 'test'))
 
         if self.ood:
-            ood_dataset = self.__load_ood()
-            ood_train, ood_test = self.__make_intent(ood_dataset, emb_processor)
-            ood_train, ood_test = self.__mini_batch(ood_train), self.__mini_batch(ood_test)
+            ood_train = self.__mini_batch(cache.load(key, 'ood_train'))
+            ood_test = self.__mini_batch(cache.load(key, 'ood_test'))
             return intent_train, intent_test, ood_train, ood_test
 
         else:
@@ -79,14 +94,21 @@ class Dataset:
     def load_entity(self, emb_processor: BaseProcessor) -> tuple:
         """
         엔티티 프로세서 학습용 데이터를 생성합니다.
+        데이터와 임베딩 모델이 바뀌지 않았으면 캐시된 feature 파일을 memory map으로 읽습니다.
 
         :param emb_processor: 임베딩 과정이 들어가므로 임베딩 프로세서를 입력해야합니다.
         :return: 엔티티 프로세서 학습용 데이터셋입니다.
         """
 
-        entity_dataset = pd.read_csv(self.entity_data_dir)
-        entity_train, entity_test = self.__make_entity(entity_dataset, emb_processor)
-        return self.__mini_batch(entity_train), self.__mini_batch(entity_test)
+        cache = FeatureCache('entity')
+        key = cache.make_key([self.entity_data_dir], emb_processor)
+
+        if not cache.exists(key):
+            entity_dataset = pd.read_csv(self.entity_data_dir)
+            entity_train, entity_test = self.__make_entity(entity_dataset, emb_processor)
+            cache.save(key, {'train': entity_train, 'test': entity_test})
+
+        return self.__mini_batch(cache.load(key, 'train')), self.__mini_batch(cache.load(key, 'test'))
 
     def load_predict(self, text: str, emb_processor: BaseProcessor) -> Tensor:
         """
@@ -107,6 +129,24 @@ class Dataset:
         text, _ = self.prep.pad_sequencing(text)  # 패드 시퀀싱
         return text.unsqueeze(0).to(self.device)  # 차원 증가 (batch_size = 1)
 
+    def load_predict_batch(self, texts: list, emb_processor: BaseProcessor) -> tuple:
+        """
+        여러 사용자 입력을 한 번에 토큰화, 임베딩, 패드 시퀀싱합니다.
+
+        :param texts: 사용자의 텍스트 입력 리스트입니다.
+        :param emb_processor: 임베딩 과정이 들어가므로 임베딩 프로세서를 입력해야합니다.
+        :return: (N, max_len, vector_size) 입력 텐서와 입력별 길이 텐서
+        """
+
+        texts = self.prep.tokenize_batch(texts)  # 토크나이징
+
+        if any(len(text) == 0 for text in texts):
+            raise Exception("문장 길이가 0입니다.")
+
+        texts = emb_processor.predict_batch(texts)  # 임베딩
+        texts, lengths = self.prep.pad_sequencing_batch(texts)  # 패드 시퀀싱
+        return texts.to(self.device), lengths
+
     def __load_ood(self) -> DataFrame:
         """
         메모리에서 OOD 데이터를 로드합니다.
@@ -116,14 +156,16 @@ class Dataset:
         :return: 여러개의 OOD 데이터를 한 파일로 모아서 반환합니다.
         """
 
-        ood_dataset = []
+        ood_dataset = [pd.read_csv(ood) for ood in self.__ood_files()]
+        return pd.concat(ood_dataset)
 
-        for ood in os.listdir(self.ood_data_dir):
-            if ood != '__init__.py':  # __init__ 파일 제외
-                ood = pd.read_csv(self.ood_data_dir + ood)
-                ood_dataset.append(ood)
+    def __ood_files(self) -> list:
+        """
+        :return: OOD 데이터 파일 경로 리스트 (__init__ 파일 제외)
+        """
 
-        return pd.concat(ood_dataset)
+        return [self.ood_data_dir + ood for ood in sorted(os.listdir(self.ood_data_dir))
+                if ood != '__init__.py']
 
     def __make_intent(self, intent_dataset: DataFrame, emb_processor: BaseProcessor) -> tuple:
         """
@@ -133,7 +175,7 @@ class Dataset:
         - 데이터를 토큰화 합니다 (네이버 맞춤법 검사기 + Konlpy 사용)
         - 데이터를 학습 / 검증용으로 나눕니다.
         - 데이터의 길이를 맞추기 위해 패드시퀀싱 후 임베딩합니다.
-        - 리스트로 출력된 데이터들을 concatenation하여 텐서로 변환합니다.
+        - 데이터들을 (학습/검증 데이터, 라벨, 길이) 텐서로 묶습니다.
 
         :param intent_dataset: 저장공간에서 로드한 인텐트 데이터 파일입니다.
         :param emb_processor: 임베딩을 위한 임베딩 프로세서를 입력해야합니다.
@@ -147,8 +189,8 @@ class Dataset:
         train_question, train_label, train_length = self.__embedding(train, emb_processor)
         test_question, test_label, test_length = self.__embedding(test, emb_processor)
 
-        train_tensors = self.__list2tensor(train_question, train_label, train_length)
-        test_tensors = self.__list2tensor(test_question, test_label, test_length)
+        train_tensors = [train_question, torch.cat(train_label, dim=0), train_length]
+        test_tensors = [test_question, torch.cat(test_label, dim=0), test_length]
         return train_tensors, test_tensors
 
     def __make_entity(self, entity_dataset: DataFrame, emb_processor: BaseProcessor) -> tuple:
@@ -160,7 +202,7 @@ class Dataset:
         - 데이터를 학습 / 검증용으로 나눕니다.
         - 데이터의 길이를 맞추기 위해 패드시퀀싱 후 임베딩합니다.
         - 엔티티 데이터는 라벨도 각각 길이가 달라서 패드시퀀싱 해야합니다.
-        - 리스트로 출력된 데이터들을 concatenation하여 텐서로 변환합니다.
+        - 데이터들을 (학습/검증 데이터, 라벨, 길이) 텐서로 묶습니다.
 
         :param entity_dataset: 저장공간에서 로드한 엔티티 데이터 파일입니다.
         :param emb_processor: 임베딩을 위한 임베딩 프로세서를 입력해야합니다.
@@ -174,12 +216,12 @@ class Dataset:
         train_question, train_label, train_length = self.__embedding(train, emb_processor)
         test_question, test_label, test_length = self.__embedding(train, emb_processor)
 
-        train_label = [self.prep.label_sequencing(label, self.entity_dict) for label in train_label]
-        test_label = [self.prep.label_sequencing(label, self.entity_dict) for label in test_label]
-        # 1차원 라벨 리스트들을 하나하나 꺼내서 패드 시퀀싱한 뒤 다시 리스트에 넣어 2차원으로 만듬
+        train_label = self.prep.label_sequencing_batch(train_label, self.entity_dict)
+        test_label = self.prep.label_sequencing_batch(test_label, self.entity_dict)
+        # 1차원 라벨 리스트들을 하나의 2차원 텐서에 한 번에 패드 시퀀싱함
 
-        train_tensors = self.__list2tensor(train_question, train_label, train_length)
-        test_tensors = self.__list2tensor(test_question, test_label, test_length)
+        train_tensors = [train_question, train_label, train_length]
+        test_tensors = [test_question, test_label, test_length]
         return train_tensors, test_tensors
 
     def __map_label(self, dataset: DataFrame, kinds: str) -> list:
@@ -250,43 +292,32 @@ class Dataset:
 
         :param dataset: 이전단계에서 학습/검증용으로 나뉜 데이터 중 하나
         :param emb_processor: 임베딩을 위한 임베딩 프로세서
-        :return: 임베딩된 자연어 데이터, 라벨 데이터, 길이 데이터
+        :return: 임베딩된 자연어 데이터 텐서, 라벨 데이터 리스트, 길이 데이터 텐서
         """
 
-        question_list, label_list, length_list = [], [], []
-
-        for i, (question, label) in enumerate(dataset):
-            question = emb_processor.predict(question)
-            question, length = self.prep.pad_sequencing(question)
+        questions = emb_processor.predict_batch([question for question, _ in dataset])
+        # 데이터셋 전체를 한 번에 임베딩
 
-            question_list.append(question.unsqueeze(0))
-            label_list.append(torch.tensor(label))
-            length_list.append(torch.tensor(length).unsqueeze(0))
+        questions, lengths = self.prep.pad_sequencing_batch(questions)
+        # 하나의 (N, max_len, vector_size) 텐서에 한 번에 패드 시퀀싱
 
-        return question_list, label_list, length_list
+        labels = [torch.tensor(label) for _, label in dataset]
+        return questions, labels, lengths
 
-    def __list2tensor(self, *lists: list) -> list:
-        """
-        리스트 데이터들을 Pytorch의 Tensor 형태로 변환하여 병합(concatenation)합니다.
-        각 리스트는 0번 Axis로 모두 Unsqueeze 되어 있어야 합니다.
-
-        :param lists: 텐서로 만들 리스트 데이터셋들 (shape = [1, XXX, XXX])
-        :return: 텐서 데이터들이 담긴 리스트 (타입은 list지만 텐서로 unpacking 됩니다)
-        """
-
-        return [torch.cat(a_list, dim=0) for a_list in lists]  # 리스트를 받아서 concat함
-
-    def __mini_batch(self, tensors: tuple) -> DataLoader:
+    def __mini_batch(self, dataset) -> DataLoader:
         """
         데이터를 미니배치 형태로 쪼개서 로딩할 수 있게 하는
         Pytorch DataLoader로 만듭니다.
 
-        :param tensors: 텐서로 병합한 데이터셋들
+        :param dataset: 텐서로 병합한 데이터셋들 (tuple) 또는 캐시에서 연 데이터셋
         :return: 미니배치 트레이닝용 데이터로더 객체
         """
 
+        if isinstance(dataset, (tuple, list)):
+            dataset = TensorDataset(*dataset)
+
         return DataLoader(
-            dataset=TensorDataset(*tensors),
+            dataset=dataset,
             batch_size=self.batch_size,
             shuffle=True,
             pin_memory=True
@@ -0,0 +1,128 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset as TorchDataset
+
+from decorators.decorators import data
+
+FEATURE_CACHE_VERSION = 2  # 저장 형식이 바뀌면 올려서 이전 캐시를 무효화
+
+
+class MappedDataset(TorchDataset):
+
+    def __init__(self, *arrays: np.ndarray):
+        """
+        memory map으로 연 numpy 배열들을 샘플 단위로 꺼내서 텐서로 돌려주는 데이터셋입니다.
+        전체 배열을 메모리에 올리지 않고 DataLoader가 요청한 샘플만 읽습니다.
+
+        :param arrays: 첫 번째 축(샘플 수)이 같은 배열들 (e.g. 문장, 라벨, 길이)
+        """
+
+        self.arrays = arrays
+
+    def __len__(self) -> int:
+        return len(self.arrays[0])
+
+    def __getitem__(self, idx: int) -> tuple:
+        return tuple(torch.from_numpy(np.array(array[idx])) for array in self.arrays)
+
+
+@data
+class FeatureCache:
+
+    names = ('question', 'label', 'length')
+
+    def __init__(self, kind: str):
+        """
+        임베딩, 패드 시퀀싱까지 끝난 학습 데이터를 .npy 파일로 저장해두는 캐시입니다.
+        원본 데이터와 임베딩 모델이 같으면 다시 토큰화/임베딩하지 않고 저장된 파일을 memory map으로 엽니다.
+
+        :param kind: 데이터 종류 (intent or entity)
+        """
+
+        self.kind = kind
+
+    def make_key(self, data_files: list, emb_processor) -> str:
+        """
+        데이터 파일 내용, 임베딩 모델 파일, 관련 설정으로 캐시 key를 만듭니다.
+
+        :param data_files: 학습에 사용되는 데이터 파일 경로 리스트
+        :param emb_processor: 임베딩 프로세서 (저장된 모델 파일들의 내용을 key에 넣음)
+        :return: sha256 hex 문자열 앞 16자리
+        """
+
+        sha = hashlib.sha256()
+        sha.update(json.dumps([FEATURE_CACHE_VERSION, self.kind, self.max_len,
+                               self.vector_size, self.data_ratio]).encode('utf-8'))
+
+        for data_file in data_files:
+            self.__update(sha, data_file)
+
+        # gensim은 큰 배열을 model_file.gensim.*.npy로 따로 저장하므로 함께 해시
+        # (수정 시간/크기만 보면 다시 학습한 같은 크기의 모델을 구분할 수 없음)
+        emb_file = emb_processor.model_file + '.gensim'
+        for path in sorted(glob.glob(glob.escape(emb_file) + '*')):
+            sha.update(os.path.basename(path).encode('utf-8'))
+            self.__update(sha, path)
+
+        return sha.hexdigest()[:16]
+
+    @staticmethod
+    def __update(sha, path: str):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                sha.update(chunk)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.feature_cache_dir, '{}-{}'.format(self.kind, key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.path(key), 'done'))
+
+    def save(self, key: str, splits: dict):
+        """
+        (문장, 라벨, 길이) 텐서들을 split별 .npy 파일로 저장합니다.
+        임시 폴더에 다 쓴 뒤 이름을 바꾸고, 같은 종류의 이전 캐시는 지웁니다.
+
+        :param key: 캐시 key
+        :param splits: {split 이름: [문장, 라벨, 길이] 텐서} 딕셔너리
+        """
+
+        path = self.path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        os.makedirs(tmp_path, exist_ok=True)
+
+        for split, tensors in splits.items():
+            for name, tensor in zip(self.names, tensors):
+                np.save(os.path.join(tmp_path, '{}_{}.npy'.format(split, name)), tensor.cpu().numpy())
+
+        open(os.path.join(tmp_path, 'done'), 'w').close()
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            # 다른 워커가 먼저 같은 캐시를 만들었으면 그쪽을 사용
+
+        for other in os.listdir(self.feature_cache_dir):
+            if other.startswith(self.kind + '-') and other != os.path.basename(path) \
+                    and not other.endswith('.tmp'):
+                shutil.rmtree(os.path.join(self.feature_cache_dir, other), ignore_errors=True)
+
+    def load(self, key: str, split: str) -> MappedDataset:
+        """
+        저장된 split을 memory map으로 엽니다.
+
+        :param key: 캐시 key
+        :param split: split 이름 (train, test, ood_train, ood_test)
+        :return: memory map 배열을 읽는 데이터셋
+        """
+
+        return MappedDataset(*[np.load(os.path.join(self.path(key), '{}_{}.npy'.format(split, name)),
+                                       mmap_mode='r')
+                               for name in self.names])
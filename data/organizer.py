@@ -1,3 +1,5 @@
+import hashlib
+import json
 import os
 
 import pandas as pd
@@ -15,6 +17,49 @@ class Organizer:
         학습시 필요한 라벨 딕셔너리를 생성하여 반환하는 클래스입니다.
         """
 
+    def organize(self) -> tuple:
+        """
+        원본 데이터 폴더(raw_data_dir)의 내용 해시(manifest)가 캐시와 같으면
+        통합 파일을 다시 만들지 않고 캐시된 라벨 딕셔너리를 그대로 불러옵니다.
+        원본 데이터가 바뀌었거나 캐시/통합 파일이 없을 때만 다시 만듭니다.
+
+        :return: (인텐트 딕셔너리, 엔티티 딕셔너리)
+        """
+
+        manifest = self.make_manifest()
+        cache = self.__load_cache()
+
+        if cache is not None and cache.get('manifest') == manifest \
+                and os.path.exists(self.intent_data_dir) \
+                and os.path.exists(self.entity_data_dir):
+            return cache['intent_dict'], cache['entity_dict']
+
+        intent_dict = self.organize_intent()
+        entity_dict = self.organize_entity()
+        self.__atomic_write(self.organizer_cache_dir, lambda path: self.__dump_cache(
+            path, {'manifest': manifest, 'intent_dict': intent_dict, 'entity_dict': entity_dict}))
+        return intent_dict, entity_dict
+
+    def make_manifest(self) -> str:
+        """
+        원본 데이터 파일들(이름 + 내용)과 라벨 검증 설정의 해시를 만듭니다.
+
+        :return: sha256 hex 문자열
+        """
+
+        sha = hashlib.sha256()
+        sha.update(json.dumps([self.NER_categories, self.NER_tagging, self.NER_outside],
+                              ensure_ascii=False).encode('utf-8'))
+
+        for file_name in sorted(os.listdir(self.raw_data_dir)):
+            sha.update(file_name.encode('utf-8') + b'\0')
+            with open(self.raw_data_dir + file_name, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    sha.update(chunk)
+            sha.update(b'\0')
+
+        return sha.hexdigest()
+
     def organize_intent(self) -> dict:
         """
         여러 파일을 모아서 하나의 인텐트 데이터 파일로 만듭니다.
@@ -36,7 +81,7 @@ class Organizer:
             # 개별 파일 단위 프로세싱 이후 하나의 파일로 통합
 
         intent_df = DataFrame(integrated_file, columns=['question', 'label'])
-        intent_df.to_csv(self.intent_data_dir, index=False)
+        self.__atomic_write(self.intent_data_dir, lambda path: intent_df.to_csv(path, index=False))
         intent_dict = self.__make_intent_dict(intent_df['label'])
         return intent_dict
 
@@ -65,10 +110,47 @@ class Organizer:
 
         self.__check_label_kinds(label_set)  # 라벨 종류 체크
         entity_df = DataFrame([[' '.join(q), ' '.join(l)] for q, l in integrated_file])
-        entity_df.to_csv(self.entity_data_dir, index=False, header=['question', 'label'])
+        self.__atomic_write(self.entity_data_dir,
+                            lambda path: entity_df.to_csv(path, index=False, header=['question', 'label']))
         entity_dict = self.__make_entity_dict(label_set)
         return entity_dict
 
+    def __load_cache(self):
+        """
+        캐시된 manifest와 라벨 딕셔너리를 불러옵니다.
+
+        :return: 캐시 딕셔너리 (없거나 깨져있으면 None)
+        """
+
+        try:
+            with open(self.organizer_cache_dir, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def __dump_cache(path: str, cache: dict):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+
+    @staticmethod
+    def __atomic_write(path: str, write):
+        """
+        임시 파일에 쓴 뒤 os.replace로 교체해서, 여러 워커가 동시에 시작해도
+        반쯤 쓰인 파일을 읽는 일이 없도록 합니다.
+
+        :param path: 최종 파일 경로
+        :param write: 경로를 받아서 파일을 쓰는 함수
+        """
+
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
     def __process_intent_file(self, file_name: str) -> list:
         """
         개별 인텐트 파일 단위의 프로세싱입니다.
@@ -3,14 +3,11 @@
 @since {6/23/2020}
 @see : https://github.com/gusdnd852
 """
-import json
-import re
-
 import torch
 from torch import Tensor
-from konlpy.tag import Okt
-from requests import Session
 
+from data.spell_checker import SpellCheckerFactory
+from data.tagger import tagger
 from decorators.decorators import data
 
 
@@ -22,11 +19,13 @@ class Preprocessor:
         데이터를 전처리하는 여러가지 기능읃 가진 클래스입니다.
         패드시퀀싱, 토큰화, 맞춤법 교정등의 기능을 제공합니다.
 
-        :param naver_fix: 네이버 맞춤법 검사기 사용 여부 (상업적 이용시 꺼주세요)
+        :param naver_fix: 맞춤법 교정 사용 여부 (교정기 종류는 config의 spell_checker로 설정)
         """
 
-        self.okt = Okt()
+        self.tagger = tagger  # Okt는 프로세스 전역 풀에서 빌려 씀
         self.naver_fix = naver_fix
+        self.__pad = None
+        self.spell_checker = SpellCheckerFactory().build() if naver_fix else None
 
     def pad_sequencing(self, sequence: Tensor) -> tuple:
         """
@@ -46,16 +45,32 @@ class Preprocessor:
             # 문장이 max_len보다 길면 뒷부분을 자릅니다.
 
         else:
-            pad = torch.ones(self.max_len, self.vector_size) * self.PAD
-
-            for i in range(length):
-                pad[i] = sequence[i]
+            pad = self.__pad_buffer().clone()
+            pad[:length] = sequence
             sequence = pad
-            # 문장이 max_len보다 짧으면 길이가 max_len인 0벡터를 만들고
-            # 데이터가 있던 인덱스에는 원래 데이터를 복사합니다
+            # 문장이 max_len보다 짧으면 미리 만들어둔 패딩 버퍼를 복사하고
+            # 데이터가 있던 구간에는 원래 데이터를 한 번에 복사합니다
 
         return sequence, length
 
+    def pad_sequencing_batch(self, sequences: list) -> tuple:
+        """
+        여러 문장을 하나의 (N, max_len, vector_size) 텐서에 한 번에 패드 시퀀싱합니다.
+
+        :param sequences: 패드 시퀀싱할 문장(임베딩된 tensor) 리스트
+        :return: 패드시퀀싱된 문장 텐서와 각 문장의 원래 길이 텐서 (max_len을 넘으면 max_len)
+        """
+
+        padded = torch.full((len(sequences), self.max_len, self.vector_size), float(self.PAD))
+        lengths = torch.empty(len(sequences), dtype=torch.int64)
+
+        for i, sequence in enumerate(sequences):
+            length = min(sequence.size()[0], self.max_len)
+            padded[i, :length] = sequence[:length]
+            lengths[i] = length
+
+        return padded, lengths
+
     def label_sequencing(self, entity_label: Tensor, entity_dict: dict) -> Tensor:
         """
         엔티티 라벨의 경우에는 라벨도 각각 길이가 다르게 됩니다.
@@ -67,25 +82,37 @@ class Preprocessor:
         :return: 패드시퀀싱 된 엔티티 라벨
         """
 
-        length = entity_label.size()[0]
+        return self.label_sequencing_batch([entity_label], entity_dict)
 
-        if length > self.max_len:
-            entity_label = entity_label[:self.max_len]
-            # 길이가 max_len보다 길면 뒷부분을 자릅니다.
+    def label_sequencing_batch(self, entity_labels: list, entity_dict: dict) -> Tensor:
+        """
+        여러 문장의 엔티티 라벨을 하나의 (N, max_len) 텐서에 한 번에 패드 시퀀싱합니다.
+        빈 부분은 outside 태그로 채웁니다.
 
-        else:
-            pad = torch.ones(self.max_len, dtype=torch.int64)
-            outside_tag = entity_dict[self.NER_outside]
-            pad = pad * outside_tag  # 'O' 태그가 맵핑된 숫자
-            # [1, 1, ..., 1] * 'O' => ['O', 'O', ... , 'O']
+        :param entity_labels: 문장별 엔티티 라벨 (1차원) 리스트
+        :param entity_dict: 딕셔너리를 이용해 빈부분에 outside 태그를 넣습니다.
+        :return: 패드시퀀싱 된 엔티티 라벨 텐서
+        """
+
+        outside_tag = entity_dict[self.NER_outside]  # 'O' 태그가 맵핑된 숫자
+        padded = torch.full((len(entity_labels), self.max_len), outside_tag, dtype=torch.int64)
 
-            for i in range(length):
-                pad[i] = entity_label[i]
-            entity_label = pad
-            # 문장이 max_len보다 짧으면 길이가 max_len인 'O'벡터를 만들고
-            # 데이터가 있던 인덱스에는 원래 데이터를 복사합니다
+        for i, entity_label in enumerate(entity_labels):
+            length = min(entity_label.size()[0], self.max_len)
+            padded[i, :length] = entity_label[:length]
 
-        return entity_label.unsqueeze(0)
+        return padded
+
+    def __pad_buffer(self) -> Tensor:
+        """
+        한 문장용 패딩 버퍼(PAD로 채워진 max_len x vector_size 텐서)를 한 번만 만들어 재사용합니다.
+        버퍼 자체는 수정하지 않고 복사해서 사용해야 합니다.
+        """
+
+        if self.__pad is None:
+            self.__pad = torch.full((self.max_len, self.vector_size), float(self.PAD))
+
+        return self.__pad
 
     def tokenize(self, sentence: str, train: bool = False) -> list:
         """
@@ -94,7 +121,6 @@ class Preprocessor:
         학습/테스트 데이터는 띄어쓰기 기준으로 자릅니다.
 
         :param sentence: 토큰화할 문장
-        :param naver_fix: 네이버 맞춤법 검사기 사용 여부 (상업적 이용시 꺼주세요)
         :param train: 학습모드 여부 (True이면 맞춤법 교정 X)
         :return: 토큰화된 문장
         """
@@ -103,45 +129,25 @@ class Preprocessor:
             return sentence.split()
 
         else:  # 사용자 데이터는 전처리를 과정을 거침 (fix → tok → fix)
-            if self.naver_fix:
-                sentence = self.__naver_fix(sentence)
-
-            out = [word for word, pos in self.okt.pos(sentence)
-                   if pos not in ['Josa', 'Punctuation']]
-
-            if self.naver_fix:
-                return self.__naver_fix(' '.join(out)).split()
-
-            return out
+            return self.tokenize_batch([sentence])[0]
 
-    def __naver_fix(self, text: str) -> str:
+    def tokenize_batch(self, sentences: list) -> list:
         """
-        ajax 크롤링을 이용하여 네이버 맞춤법 검사기 API를 사용합니다.
+        여러 사용자 문장을 한 번에 교정하고 토큰화 합니다.
+        형태소 분석은 tagger 하나를 빌려서 연속으로 수행합니다.
 
-        :param text: 맞춤법을 수정할 문장
-        :return: 맞춤법이 수정된 문장
+        :param sentences: 토큰화할 문장 리스트
+        :return: 문장별 토큰화된 문장 리스트
         """
 
-        if len(text) > 500:
-            raise Exception('500글자 이상 넘을 수 없음!')
+        if self.spell_checker is not None:
+            sentences = [self.spell_checker.fix(sentence) for sentence in sentences]
 
-        sess = Session()
+        outs = [[word for word, pos in tagged
+                 if pos not in ['Josa', 'Punctuation']]
+                for tagged in self.tagger.pos_batch(sentences)]
 
-        # ajax 크롤링을 이용합니다 (네이버 맞춤법 검사기)
-        data = sess.get(
-            url='https://m.search.naver.com/p/csearch/ocontent/spellchecker.nhn',
-            params={
-                '_callback':
-                    'window.__jindo2_callback._spellingCheck_0',
-                'q': text},
-            headers={
-                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/57.0.2987.133 Safari/537.36',
-                'referer': 'https://search.naver.com/'
-            },
-            verify=False
-        )
+        if self.spell_checker is not None:
+            return [self.spell_checker.fix(' '.join(out)).split() for out in outs]
 
-        data = json.loads(data.text[42:-2])  # json 파싱
-        html = data['message']['result']['html']  # 원하는부분 가져오기
-        out = re.sub(re.compile('<.*?>'), '', html)  # tag 잘라내기
-        return out
+        return outs
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from functools import lru_cache
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from decorators.decorators import data
+
+
+def normalize_text(text: str) -> str:
+    """
+    캐시 key로 쓰기 위해 문장을 정규화합니다.
+    (유니코드 NFC 정규화 + 연속 공백 제거)
+
+    :param text: 정규화할 문장
+    :return: 정규화된 문장
+    """
+
+    text = unicodedata.normalize('NFC', text)
+    return ' '.join(text.split())
+
+
+class BaseSpellChecker:
+    """
+    맞춤법 교정기의 기본 클래스입니다.
+    fix()는 교정할 수 없는 경우에도 예외 대신 입력 문장을 그대로 반환해야 합니다.
+    """
+
+    @property
+    def cache_key(self) -> str:
+        """
+        디스크 캐시에서 이 교정기의 결과를 구분하는 key (교정 결과가 바뀌는 설정이 있으면 함께 넣어야 함)
+        """
+
+        return type(self).__name__
+
+    def fix(self, text: str) -> str:
+        raise NotImplementedError
+
+    def try_fix(self, text: str) -> str:
+        """
+        교정 결과를 반환합니다. 교정에 실패해서 캐시하면 안 되는 경우 None을 반환합니다.
+        """
+
+        return self.fix(text)
+
+    def close(self):
+        pass
+
+
+@data
+class LocalSpellChecker(BaseSpellChecker):
+
+    def __init__(self, dict_path: str = None, cache_size: int = 4096):
+        """
+        네트워크 없이 동작하는 규칙/사전 기반 맞춤법 교정기입니다.
+        공백, 반복 문자를 정리하고 사전(틀린 표현\t맞는 표현)에 있는 표현을 치환합니다.
+        사전의 표현은 어절의 시작에서만 치환하고, '~'를 붙인 표현(ex. ~됬)만 어절 중간에서도 치환합니다.
+        ('금새'가 '지금새로운'을 바꾸는 것처럼 올바른 어절 안의 글자를 잘못 고치지 않도록)
+        교정 비용이 작으므로 디스크 캐시 대신 메모리 LRU 캐시만 사용합니다.
+
+        :param dict_path: 교정 사전 파일 경로 (없으면 config의 spell_dict_path)
+        :param cache_size: 메모리 LRU 캐시에 보관할 문장 수
+        """
+
+        self.dict_path = dict_path if dict_path is not None else self.spell_dict_path
+        self.rules = self.load_dict(self.dict_path)
+        self.dict_hash = hashlib.sha256(json.dumps(sorted(self.rules.items()), ensure_ascii=False)
+                                        .encode('utf-8')).hexdigest()[:16]
+
+        # '~' 표시를 뗀 틀린 표현 → 맞는 표현
+        self.replacements = {wrong.lstrip('~'): right for wrong, right in self.rules.items()}
+
+        # 긴 표현부터 치환해야 짧은 표현이 먼저 먹어버리지 않음
+        wrongs = sorted(self.rules.keys(), key=lambda wrong: len(wrong.lstrip('~')), reverse=True)
+        self.pattern = re.compile('|'.join(map(self.rule_pattern, wrongs))) if wrongs else None
+        self.repeat = re.compile(r'([ㄱ-ㅎㅏ-ㅣ?!~])\1{2,}')
+        self.fix = lru_cache(maxsize=cache_size)(self._fix)
+
+    @property
+    def cache_key(self) -> str:
+        # 사전이 바뀌면 이전에 저장된 교정 결과를 쓰지 않도록 사전 내용의 해시를 key에 넣음
+        return '{}:{}'.format(type(self).__name__, self.dict_hash)
+
+    @staticmethod
+    def rule_pattern(wrong: str) -> str:
+        """
+        사전의 틀린 표현 하나를 정규식으로 바꿉니다.
+
+        :param wrong: 틀린 표현 ('~'로 시작하면 어절 중간에서도 치환)
+        :return: 어절 시작(문장 시작 또는 공백 뒤)에 고정된 정규식, '~' 표현은 위치 제한 없는 정규식
+        """
+
+        if wrong.startswith('~'):
+            return re.escape(wrong[1:])
+        return r'(?<!\S)' + re.escape(wrong)
+
+    @staticmethod
+    def load_dict(path: str) -> dict:
+        """
+        탭으로 구분된 교정 사전을 불러옵니다. ('#'으로 시작하는 줄은 주석)
+
+        :param path: 교정 사전 파일 경로
+        :return: {틀린 표현('~' 표시 포함): 맞는 표현} 딕셔너리 (파일이 없으면 빈 딕셔너리)
+        """
+
+        rules = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    if not line.strip() or line.startswith('#') or '\t' not in line:
+                        continue
+
+                    wrong, right = line.split('\t', 1)
+                    rules[wrong] = right
+        except FileNotFoundError:
+            pass
+
+        return rules
+
+    def _fix(self, text: str) -> str:
+        text = normalize_text(text)
+        text = self.repeat.sub(r'\1\1', text)
+        # ㅋㅋㅋㅋㅋ → ㅋㅋ, ????? → ??
+
+        if self.pattern is not None:
+            text = self.pattern.sub(lambda m: self.replacements[m.group(0)], text)
+
+        return text
+
+
+@data
+class NaverSpellChecker(BaseSpellChecker):
+
+    url = 'https://m.search.naver.com/p/csearch/ocontent/spellchecker.nhn'
+    headers = {
+        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/57.0.2987.133 Safari/537.36',
+        'referer': 'https://search.naver.com/'
+    }
+
+    def __init__(self, fallback: BaseSpellChecker = None):
+        """
+        ajax 크롤링을 이용하여 네이버 맞춤법 검사기 API를 사용합니다. (상업적 이용시 꺼주세요)
+        요청마다 세션을 새로 열지 않고 connection pool을 가진 세션 하나를 재사용하며,
+        타임아웃이나 오류가 나면 fallback 교정기의 결과를 반환합니다.
+
+        :param fallback: 네이버 요청 실패시 사용할 교정기 (없으면 원문 반환)
+        """
+
+        self.fallback = fallback
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.naver_pool_size)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+
+    def fix(self, text: str) -> str:
+        fixed = self.try_fix(text)
+        return fixed if fixed is not None else self.fallback_fix(text)
+
+    def fallback_fix(self, text: str) -> str:
+        if self.fallback is not None:
+            return self.fallback.fix(text)
+        return text
+
+    def try_fix(self, text: str) -> str:
+        if len(text) > 500:
+            raise Exception('500글자 이상 넘을 수 없음!')
+
+        try:
+            # ajax 크롤링을 이용합니다 (네이버 맞춤법 검사기)
+            res = self.session.get(
+                url=self.url,
+                params={
+                    '_callback':
+                        'window.__jindo2_callback._spellingCheck_0',
+                    'q': text},
+                timeout=self.naver_timeout
+            )
+            res.raise_for_status()
+
+            data = json.loads(res.text[42:-2])  # json 파싱
+            html = data['message']['result']['html']  # 원하는부분 가져오기
+            return re.sub(re.compile('<.*?>'), '', html)  # tag 잘라내기
+
+        except Exception:
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+@data
+class CachedSpellChecker(BaseSpellChecker):
+
+    def __init__(self, checker: BaseSpellChecker, cache_path: str = None):
+        """
+        교정 결과를 정규화된 문장을 key로 디스크(sqlite)에 저장하는 교정기입니다.
+        같은 문장은 다시 교정하지 않고 캐시에서 바로 꺼내옵니다.
+        backend나 설정이 다르면 결과도 다르므로 backend의 cache_key를 key에 함께 넣고,
+        교정에 실패한 결과(fallback)는 저장하지 않습니다.
+
+        :param checker: 실제 교정을 수행할 교정기
+        :param cache_path: 캐시 파일 경로 (없으면 config의 spell_cache_path)
+        """
+
+        self.checker = checker
+        self.backend_name = checker.cache_key
+        self.cache_path = cache_path if cache_path is not None else self.spell_cache_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS spell_cache ('
+                           'backend TEXT NOT NULL, source TEXT NOT NULL, fixed TEXT NOT NULL, '
+                           'PRIMARY KEY (backend, source))')
+        self._conn.commit()
+
+    def fix(self, text: str) -> str:
+        key = normalize_text(text)
+        if not key:
+            return key
+
+        with self._lock:
+            row = self._conn.execute('SELECT fixed FROM spell_cache WHERE backend = ? AND source = ?',
+                                     (self.backend_name, key)).fetchone()
+        if row is not None:
+            return row[0]
+
+        fixed = self.checker.try_fix(key)
+        if fixed is None:
+            return self.checker.fallback_fix(key)
+
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO spell_cache (backend, source, fixed) VALUES (?, ?, ?)',
+                               (self.backend_name, key, fixed))
+            self._conn.commit()
+
+        return fixed
+
+    def close(self):
+        self.checker.close()
+        with self._lock:
+            self._conn.close()
+
+
+@data
+class SpellCheckerFactory:
+
+    def __init__(self):
+        """
+        config의 spell_checker 설정에 맞는 맞춤법 교정기를 만드는 클래스입니다.
+        """
+
+    def build(self) -> BaseSpellChecker:
+        """
+        :return: 설정된 backend 교정기 (네트워크를 쓰는 naver는 spell_cache_path가 있으면 디스크 캐시를 씌움),
+                 spell_checker가 None이면 None
+        """
+
+        if self.spell_checker is None:
+            return None
+
+        local = LocalSpellChecker()
+        if self.spell_checker == 'local':
+            return local  # 로컬 교정기는 메모리 LRU 캐시만 사용
+        elif self.spell_checker == 'naver':
+            checker = NaverSpellChecker(fallback=local)
+        else:
+            raise Exception('지원하지 않는 맞춤법 교정기입니다. : {}'.format(self.spell_checker))
+
+        if self.spell_cache_path:
+            checker = CachedSpellChecker(checker)
+
+        return checker
@@ -0,0 +1,98 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from konlpy.tag import Okt
+
+from decorators.decorators import data
+
+
+@data
+class TaggerPool:
+
+    def __init__(self):
+        """
+        프로세스 전체에서 공유하는 형태소 분석기(Okt) 풀입니다.
+        Okt는 JVM을 띄우므로 처음 사용할 때 만들고(lazy init),
+        여러 쓰레드가 동시에 쓸 수 있도록 최대 tagger_pool_size개까지 만들어서 빌려줍니다.
+        """
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _attach_thread():
+        """
+        JPype는 JVM에 붙지 않은 쓰레드에서 Java 객체를 호출하면 오류가 나므로
+        현재 쓰레드를 JVM에 붙여둡니다. (JPype 버전에 따라 자동으로 붙으면 아무것도 안함)
+        """
+
+        try:
+            import jpype
+        except ImportError:
+            return
+
+        if jpype.isJVMStarted() and hasattr(jpype, 'isThreadAttachedToJVM') \
+                and not jpype.isThreadAttachedToJVM():
+            jpype.attachThreadToJVM()
+
+    @contextmanager
+    def acquire(self):
+        """
+        쉬고 있는 tagger를 빌려옵니다.
+        쉬는 tagger가 없고 풀이 덜 찼으면 새로 만들고, 꽉 찼으면 반납될 때까지 기다립니다.
+        """
+
+        try:
+            okt = self._idle.get_nowait()
+        except queue.Empty:
+            okt = None
+            with self._lock:
+                if self._created < self.tagger_pool_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+
+            if create:
+                try:
+                    okt = Okt()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                okt = self._idle.get()
+
+        self._attach_thread()
+        try:
+            yield okt
+        finally:
+            self._idle.put(okt)
+
+    def pos(self, sentence: str) -> list:
+        """
+        문장 하나를 형태소 분석합니다.
+
+        :param sentence: 분석할 문장
+        :return: (단어, 품사) 튜플 리스트
+        """
+
+        with self.acquire() as okt:
+            return okt.pos(sentence)
+
+    def pos_batch(self, sentences: list) -> list:
+        """
+        여러 문장을 tagger 하나를 한 번만 빌려서 연속으로 분석합니다.
+
+        :param sentences: 분석할 문장 리스트
+        :return: 문장별 (단어, 품사) 튜플 리스트의 리스트
+        """
+
+        with self.acquire() as okt:
+            return [okt.pos(sentence) for sentence in sentences]
+
+
+# 프로세스 전역 tagger 풀
+tagger = TaggerPool()
@@ -54,6 +54,14 @@ DATA = {
     'ood_data_dir': BASE['root_dir'] + "data{_}data{_}ood{_}".format(_=_),  # out of distribution 데이터셋
     'intent_data_dir': BASE['root_dir'] + "data{_}data{_}intent_data.csv".format(_=_),  # 생성된 인텐트 데이터 파일 경로
     'entity_data_dir': BASE['root_dir'] + "data{_}data{_}entity_data.csv".format(_=_),  # 생성된 엔티티 데이터 파일 경로
+    'organizer_cache_dir': BASE['root_dir'] + "data{_}data{_}organizer_cache.json".format(_=_),  # 원본 데이터 해시와 라벨 딕셔너리 캐시 경로
+    'feature_cache_dir': BASE['root_dir'] + "data{_}data{_}feature_cache{_}".format(_=_),  # 임베딩/패드 시퀀싱된 학습 데이터(.npy) 캐시 경로
+    'spell_checker': 'naver',  # 맞춤법 교정기 ('naver' : 네이버 맞춤법 검사기 (실패하면 local로 교정), 'local' : 사전 기반(오프라인), None : 사용 안함)
+    'spell_dict_path': BASE['root_dir'] + "data{_}data{_}spell_dict.txt".format(_=_),  # 로컬 교정 사전 경로
+    'spell_cache_path': BASE['root_dir'] + "data{_}data{_}spell_cache.sqlite3".format(_=_),  # naver 교정 결과 캐시 경로 (None이면 캐시 안함, local은 메모리 캐시만 사용)
+    'naver_timeout': 2.0,  # 네이버 맞춤법 검사기 요청 타임아웃 (초)
+    'naver_pool_size': 4,  # 네이버 맞춤법 검사기 connection pool 크기
+    'tagger_pool_size': 4,  # 프로세스 전체에서 공유하는 형태소 분석기(Okt) 최대 개수
 
     'NER_categories': ['DATE', 'LOCATION', 'PLACE', 'RESTAURANT',
                        'BODY', 'SYMPTOM', 'FOOD',
@@ -67,9 +75,15 @@ DATA = {
 
 API = {
     'request_chat_url_pattern': 'request_chat',  # request_chat 기능 url pattern
+    'request_chat_stream_url_pattern': 'request_chat_stream',  # 음성을 streaming으로 받는 request_chat 기능 url pattern
     'fill_slot_url_pattern': 'fill_slot',  # fill_slot 기능 url pattern
     'get_intent_url_pattern': 'get_intent',  # get_intent 기능 url pattern
-    'get_entity_url_pattern': 'get_entity'  # get_entity 기능 url pattern
+    'get_entity_url_pattern': 'get_entity',  # get_entity 기능 url pattern
+    'host': '0.0.0.0',  # 채팅 서버 host
+    'port': 8080,  # 채팅 서버 port
+    'max_workers': 8,  # 모델 추론을 실행할 executor 쓰레드 수
+    'session_ttl': 1800,  # 마지막 요청 이후 세션을 유지하는 시간 (초)
+    'max_sessions': 10000,  # 동시에 유지하는 최대 세션 수 (넘으면 가장 오래된 세션부터 삭제)
 }
 
 ANSWER = {
@@ -252,4 +266,34 @@ ENTITY = {
     'lr_scheduler_patience': 10,  # 러닝레이트 스케줄러 감소 에폭
     'lr_scheduler_min_lr': 1e-12,  # 최소 러닝레이트
     'lr_scheduler_warm_up': 100  # 러닝레이트 감소 시작시점
-}
\ No newline at end of file
+}
+
+DEVICE = {
+    'use_gpu': False,  # GPU 사용 여부 (기본은 CPU, GPU는 opt-in)
+    'gpu_id': 0,  # use_gpu가 True일 때 사용할 GPU 번호
+    'num_threads': 0,  # torch intra-op 쓰레드 수 (0이면 torch 기본값 사용)
+    'num_interop_threads': 0,  # torch inter-op 쓰레드 수 (0이면 torch 기본값 사용)
+    'bf16': False,  # 추론시 bfloat16 autocast 사용 여부 (CPU는 AVX512-BF16 지원 장비에서 권장)
+}
+
+PIPELINE = {
+    'concurrent': True,  # True면 인텐트/엔티티, 감정, 주제 인식을 쓰레드 풀에서 동시에 실행
+    'max_workers': 3,  # 턴 단위 stage를 실행할 쓰레드 수
+    'timeout': {  # stage별 대기 시간 (초)
+        'intent_entity': 5.0,
+        'emotion': 10.0,
+        'topic': 5.0,
+    },
+}
+
+BATCHING = {
+    'enabled': False,  # True면 여러 세션의 동시 요청을 모아 모델별로 한 번에 batch 추론
+    'max_batch': 16,  # 한 번에 묶을 최대 요청 수
+    'max_wait_ms': 5,  # 첫 요청 이후 batch를 모으기 위해 기다리는 최대 시간 (ms)
+}
+
+SESSION = {
+    'max_history': 100,  # 세션별로 유지하는 감정/주제 기록의 최대 턴 수 (넘으면 오래된 기록부터 버림)
+    'max_input_tokens': 1000,  # 세션별로 유지하는 input 토큰의 최대 개수
+    'decay': 0.8,  # 감정/주제 누적 점수의 턴당 감쇠율 (최근 턴일수록 가중치가 큼)
+}
@@ -1,9 +1,12 @@
+from collections import Counter
 from scenarios.scenario_manager import ScenarioManager
 import emotionchat_config as config
 from model.emotion.predict import IAI_EMOTION
 from model.topic.predict import IAI_TOPIC
 from model.intent_entity.intent_entity import JointIntEnt
-from model.textgeneration.predict import DialogKoGPT2
+from model.device import DevicePolicy
+from model.stage_executor import StageExecutor
+from model.batching import MicroBatcher
 from scenarios.default_scenario import dust, weather, physicalDiscomfort, sleepProblem, moveHelp, changePosture, \
     higieneAct, otherAct, environmentalDiscomfort, expressDesire, foodDiscomfort, sentimentDiscomfort
 from answerer.emotion_answerer import EmotionAnswerer
@@ -13,6 +16,8 @@ from model import curious_intent, embed, curious_entity
 from model.loss import CenterLoss, CRFLoss
 
 from scenarios.scenario import Scenario
+from emotionchat_session import merge_history, history_limit, emotion_stats, topic_stats
+from emotionchat_phase import phase_graph
 
 class EmotionChat:
 
@@ -43,14 +48,37 @@ class EmotionChat:
 
         self.dataset = Dataset(ood=True)
 
-        self.intent_entity_classifier = JointIntEnt("./model/intent_entity/jointbert_demo_model", no_cuda=True)
-        self.emotion_recognizer = IAI_EMOTION
-        self.topic_recognizer = IAI_TOPIC("./model/topic/model", no_cuda=True)
-        self.response_generator = DialogKoGPT2()
+        # 디바이스/쓰레드/dtype 정책은 config.DEVICE 하나로 정하고 모든 모델이 공유
+        self.policy = DevicePolicy.from_config()
+
+        self.intent_entity_classifier = JointIntEnt("./model/intent_entity/jointbert_demo_model", no_cuda=True,
+                                                   policy=self.policy)
+
+        # 감정 인식기는 엔진 생성 시 한 번만 로드하고 워밍업해서 매 턴 재사용
+        self.emotion_recognizer = IAI_EMOTION(policy=self.policy)
+        if not self.emotion_recognizer.warm_up():
+            # 감정 인식기가 준비되지 않은 채로 턴을 받지 않도록 엔진 생성을 중단
+            raise Exception('감정 인식기 워밍업 실패 : {}'.format(self.emotion_recognizer.error))
+        self.topic_recognizer = IAI_TOPIC("./model/topic/model", no_cuda=True, policy=self.policy)
+        # 턴 단위 모델 stage(인텐트/엔티티, 감정, 주제)를 동시에 실행하는 쓰레드 풀
+        self.stages = StageExecutor()
+
+        # batching 모드면 여러 세션의 동시 요청을 모델별 batcher가 모아서 한 번에 추론
+        self.batchers = None
+        if config.BATCHING['enabled']:
+            self.batchers = {
+                'intent_entity': MicroBatcher(self.intent_entity_classifier.predict_batch, name='intent_entity'),
+                'emotion': MicroBatcher(lambda items: self.emotion_recognizer.predict_batch(*zip(*items)),
+                                        name='emotion'),
+                'topic': MicroBatcher(self.topic_recognizer.predict_batch, name='topic'),
+            }
+        # KoGPT2는 레지스트리를 통해 default_scenario의 answerer와 같은 가중치를 공유
+        self.emotion_answerer = EmotionAnswerer(policy=self.policy)
+        self.response_generator = self.emotion_answerer.model
         #self.curious_intent_classifier = DistanceClassifier(model=curious_intent.CNN(self.dataset.intent_dict),
         #                                                    loss=CenterLoss(self.dataset.intent_dict))
 
-        dataset = Dataset(ood=True)
+        dataset = self.dataset  # 라벨 딕셔너리는 엔진과 시나리오 매니저가 같은 Dataset을 공유
         emb = GensimEmbedder(model=embed.FastText())
 
         clf = DistanceClassifier(
@@ -65,7 +93,8 @@ class EmotionChat:
 
         self.scenario_manager = ScenarioManager(embed_processor=(emb, False),
                                                   intent_classifier=(clf, False),
-                                                  entity_recognizer=(rcn, False))
+                                                  entity_recognizer=(rcn, False),
+                                                  dataset=dataset)
 
         self.scenarios = [weather, dust,
                           physicalDiscomfort, sleepProblem, moveHelp,
@@ -75,6 +104,40 @@ class EmotionChat:
         for scenario in self.scenarios:
             self.scenario_manager.add_scenario(scenario)
 
+    def health(self) -> dict:
+        """
+        엔진이 소유한 모델들의 준비 상태를 반환하는 함수
+        :return: 모델 이름이 key, 상태 딕셔너리가 value인 딕셔너리
+        """
+        return {'emotion_recognizer': self.emotion_recognizer.health()}
+
+    @staticmethod
+    def __needs_emotion_topic(text: str, intent: str, pre_phase: str) -> bool:
+        """
+        이번 턴에서 감정/주제 인식 결과를 사용하는지 확인하는 함수
+        (만남인사, 작별인사 턴은 run()에서 감정/주제 인식 없이 처리됨)
+        :param text: 사용자 input text
+        :param intent: 이번 턴의 인텐트
+        :param pre_phase: 이전 단계
+        :return: bool(True, False)
+        """
+        if intent in ['만남인사', '작별인사']:
+            return False
+        if "안녕" in text and pre_phase == '':
+            return False
+        return not ("잘있어" in text or "다음에" in text or "잘가" in text)
+
+    def __submit_emotion_topic(self, text: str, wav_file) -> tuple:
+        """
+        감정, 주제 인식 stage를 실행하는 함수
+        :return: (감정 Future, 주제 Future)
+        """
+        if self.batchers is not None:
+            return self.batchers['emotion'].submit((text, wav_file)), self.batchers['topic'].submit(text)
+
+        return (self.stages.submit('emotion', self.emotion_recognizer.predict, text, wav_file),
+                self.stages.submit('topic', self.topic_recognizer.predict, text))
+
     def run(self, text: str, wav_file, pre_result_dict: dict, turn_cnts: dict) -> dict:
         """
         인텐트 인식 후 단계 확인 후 시나리오에 적용해주는 함수
@@ -87,15 +150,16 @@ class EmotionChat:
         """
 
         # 0. 이전 result_dict value들을 클래스 인스턴스 변수에 저장
-        pre_tokens = pre_result_dict['input']  # 이전 input들의 누적된 token 리스트
+        # 누적 기록은 최대 길이까지만 사용해서 턴마다 복사 비용이 일정하게 유지되도록 함
+        pre_tokens = pre_result_dict['input'][:history_limit('input')]  # 이전 input들의 누적된 token 리스트
         pre_phase = pre_result_dict['current_phase']   # 문자열 형태의 이전 단계
         pre_pred_phases = pre_result_dict['next_phase']    # 이전 단계에서 예상한 다음 단계 리스트
         pre_intent = pre_result_dict['intent'] # 이전 단계 인텐트
-        pre_emotion_prob = pre_result_dict['emotion_prob'] # 이전 단계까지의 누적 감정 확률 리스트
-        pre_topic_prob = pre_result_dict['topic_prob'] # 이전 단계까지의 누적 주제 확률 리스트
+        pre_emotion_prob = pre_result_dict['emotion_prob'][:history_limit('emotion_prob') - 1] # 이전 단계까지의 누적 감정 확률 리스트
+        pre_topic_prob = pre_result_dict['topic_prob'][:history_limit('topic_prob') - 1] # 이전 단계까지의 누적 주제 확률 리스트
         pre_emotion = pre_result_dict['emotion']   # 문자열 형태의 이전 단계까지의 확실한 감정
-        pre_emotions = pre_result_dict['emotions'] # 이전 단계까지의 누적 감정 리스트
-        pre_topics = pre_result_dict['topics'] # 이전 단계까지의 누적 주제 리스트
+        pre_emotions = pre_result_dict['emotions'][:history_limit('emotions') - 1] # 이전 단계까지의 누적 감정 리스트
+        pre_topics = pre_result_dict['topics'][:history_limit('topics') - 1] # 이전 단계까지의 누적 주제 리스트
         intent_turn_cnt = pre_result_dict['intent_turn_cnt']   # 이전 단계까지 이전 단계와 같은 인텐트 턴 횟수
         pre_entity = pre_result_dict['entity'] # 이전 entity 누적 리스트
         pre_state = pre_result_dict['state']    # 이전 상태
@@ -103,32 +167,52 @@ class EmotionChat:
 
 
 
+        if self.batchers is not None:
+            intent_future = self.batchers['intent_entity'].submit(text)
+        else:
+            intent_future = self.stages.submit('intent_entity', self.intent_entity_classifier, text)
+
+        # 감정/주제 인식은 만남인사, 작별인사 턴에서는 쓰지 않으므로 인텐트가 정해진 뒤에만 실행
+        # 이전 인텐트를 그대로 쓰는 턴은 인텐트를 미리 알 수 있으므로 인텐트/엔티티 인식과 동시에 실행
+        use_pred_intent = (pre_phase == '' and pre_intent not in (
+                config.SORT_INTENT['PHISICALDISCOMFORTnQURIOUS'] + config.SORT_INTENT['SENTIMENTDISCOMFORT'])) or \
+            ('REQUIRE_' not in pre_state and (phase_graph.check(pre_pred_phases, '/check_ucs') or pre_phase == ''))
+        emotion_future, topic_future = None, None
+        if not use_pred_intent and self.__needs_emotion_topic(text, pre_intent, pre_phase):
+            emotion_future, topic_future = self.__submit_emotion_topic(text, wav_file)
+
+        pred_intent, pred_entity = self.stages.result('intent_entity', intent_future)
+
         # 1. 불편함/궁금함 인식 ,감정인식/주제인식 일 경우 intent 인식하지 않음
         c_ucs = True    # 이전 단계에서 불,궁,감 대화에 들어왔는가?
         if pre_phase == '' and pre_intent not in (
                 config.SORT_INTENT['PHISICALDISCOMFORTnQURIOUS'] + config.SORT_INTENT['SENTIMENTDISCOMFORT']):
             # 이전 단계가 불편함, 마음상태호소, 궁금함 X -> 인텐트 인식
-            intent, entity_ = self.intent_entity_classifier(text)
+            intent, entity_ = pred_intent, pred_entity
         elif 'REQUIRE_' in pre_state:
-            _, entity_ = self.intent_entity_classifier(text)
+            entity_ = pred_entity
             intent = pre_intent
-        elif '/check_ucs' in pre_pred_phases:
+        elif phase_graph.check(pre_pred_phases, '/check_ucs'):
             # 이전 단계의 예상 단계에 /check_ucs (재질의) 가 있을 경우 = 현재 예상 단계가 재질의일 경우
-            intent, entity_ = self.intent_entity_classifier(text)
+            intent, entity_ = pred_intent, pred_entity
             # c_ucs = False  # 이미 인식했기 때문. 재질의 필요 x => c_ucs == False
             c_ucs = False
         elif pre_phase == '':
             # 만남인사
-            intent, _ = self.intent_entity_classifier(text)
+            intent = pred_intent
             c_ucs = False
         else:
             # 이전 단계가 불편함, 마음상태호소, 궁금함 O -> 인텐트 인식 X
-            _, entity_ = self.intent_entity_classifier(text)
+            entity_ = pred_entity
             intent = pre_intent
             # 인텐트 인식 안해서 정확한 오류 확인할 수 없는 단점은 엔티티가 안채워진걸로 판단하면 됨
             # 감정은 감정확률이나 emotion의 유무
 
 
+        if emotion_future is None and self.__needs_emotion_topic(text, intent, pre_phase):
+            emotion_future, topic_future = self.__submit_emotion_topic(text, wav_file)
+
+
         # 2. intent_turn_cnt 기록
 
         # 이전 대화의 intent와 현재 대화의 intent가 같으면 intent_turn_cnt 기록
@@ -216,13 +300,12 @@ class EmotionChat:
 
         # 6. 감정, 주제 라벨 & 확률값 받기
         if intent not in ['만남인사','작별인사']:
-            emotion_label, emotion_probs_array, max_emotion_prob_array = self.emotion_recognizer().predict(text,
-                                                                                                           wav_file)
+            emotion_label, emotion_probs_array, max_emotion_prob_array = self.stages.result('emotion', emotion_future)
             print('(system msg) emotion_probs_array: ' + str(emotion_probs_array[0]))
             print('(system msg) max_emotion: ' + str(max_emotion_prob_array))
 
             max_emotion_prob = float(max_emotion_prob_array)
-            topic_label, topic_probs_array, max_topic_prob_array = self.topic_recognizer.predict(text)
+            topic_label, topic_probs_array, max_topic_prob_array = self.stages.result('topic', topic_future)
             print('(system msg) topic_probs_array: ' + str(topic_probs_array[0]))
             print('(system msg) max_topic: ' + str(max_topic_prob_array))
             max_topic_prob = float(max_topic_prob_array)
@@ -384,7 +467,7 @@ class EmotionChat:
                             #'topic': '',
                             'topics': [topic] + pre_topics,
                             'topic_prob': [max_topic_prob] + pre_topic_prob,
-                            'answer': EmotionAnswerer().generate_answer_under5(text),
+                            'answer': self.emotion_answerer.generate_answer_under5(text),
                             'previous_phase': ['/recognize_emotion_chat', '/other_user'],
                             'current_phase': '/generate_emotion_chat',
                             'next_phase': ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
@@ -468,7 +551,7 @@ class EmotionChat:
                         #'topic': topic,
                         'topics': [topic] + pre_topics,
                         'topic_prob': [max_topic_prob] + pre_topic_prob,
-                        'answer': EmotionAnswerer().generate_answer_under5(text),
+                        'answer': self.emotion_answerer.generate_answer_under5(text),
                         'previous_phase': ['/recognize_emotion_chat'],
                         'current_phase': '/generate_emotion_chat',
                         'next_phase': ['/generate_emotion_chat', '/recognize_emotion_chat', '/recommend_contents',
@@ -565,9 +648,8 @@ class EmotionChat:
         :param current_phase: 현재 단계(str)
         :return: bool(True, False)
         """
-        if current_phase in pre_pred_phases:
-            return True
-        return False
+        # 단계 이름 리스트를 훑지 않고 컴파일된 단계 그래프의 bitset으로 검사
+        return phase_graph.check(pre_pred_phases, current_phase)
 
         # 다음 단계가 종료면 서버측에서 종료
 
@@ -577,13 +659,8 @@ class EmotionChat:
         :return: 다 채운 dictionary
         """
 
-        intent_turn_cnt = result_dict['intent_turn_cnt'] + 1
-        if len(result_dict['input']) != intent_turn_cnt:
-            result_dict['input'] = result_dict['input'] + pre_result_dict['input']
-        result_dict['emotions'] = result_dict['emotions'] + pre_result_dict['emotions']
-        result_dict['emotion_prob'] = result_dict['emotion_prob'] + pre_result_dict['emotion_prob']
-        result_dict['topics'] = result_dict['topics'] + pre_result_dict['topics']
-        result_dict['topic_prob'] = result_dict['topic_prob'] + pre_result_dict['topic_prob']
+        # 시나리오에서 이미 합쳐진 기록은 다시 합치지 않음
+        merge_history(pre_result_dict, result_dict)
 
         if turn_cnt > 5:
             # 전체 turn 횟수가 6회가 넘으면 종료
@@ -593,7 +670,7 @@ class EmotionChat:
             result_dict['answer'] = config.ANSWER['goodbyemsg_chat']
             result_dict['previous_phase'] = pre_result_dict['current_phase']
             result_dict['current_phase'] = '/end_phase'
-            result_dict['next_phase'] = ['/end_phase']
+            result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
             '''
             return {
@@ -662,7 +739,7 @@ class EmotionChat:
                 result_dict['answer'] = config.ANSWER['goodbyemsg_chat']
                 result_dict['previous_phase'] = pre_result_dict['current_phase']
                 result_dict['current_phase'] = '/end_phase'
-                result_dict['next_phase'] = ['/end_phase']
+                result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                 '''
                 return {
@@ -693,11 +770,10 @@ class EmotionChat:
                     result_dict['intent'] = '마음상태호소'
                     result_dict['emotion'] = pre_result_dict['emotion']
                     result_dict['state'] = 'REQUIRE_EMOTION'
-                    result_dict['answer'] = EmotionAnswerer().generate_answer_under5(text)
+                    result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text)
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/generate_emotion_chat'
-                    result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                                 '/recommend_contents', '/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
 
                     '''
                     return {
@@ -711,7 +787,7 @@ class EmotionChat:
                         # 'topic': '',
                         'topics': [topic] + pre_topics,
                         'topic_prob': [max_topic_prob] + pre_topic_prob,
-                        'answer': EmotionAnswerer().generate_answer_under5(text,
+                        'answer': self.emotion_answerer.generate_answer_under5(text,
                                                                             result_dict['emotion'],
                                                                             result_dict['topics'][0])
 ,
@@ -728,13 +804,12 @@ class EmotionChat:
 
                     result_dict['emotion'] = pre_result_dict['emotion']
                     result_dict['state'] = 'REQUIRE_CERTAIN_EMOTION'
-                    result_dict['answer'] = EmotionAnswerer().generate_answer_under5(text,
+                    result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text,
                                                                                      result_dict['emotion'],
                                                                                      result_dict['topics'][0])
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/generate_emotion_chat'
-                    result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                                 '/recommend_contents', '/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
 
                     '''
                     return {
@@ -767,7 +842,7 @@ class EmotionChat:
                     result_dict['answer'] = config.ANSWER['default_error_end']
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/end_phase'
-                    result_dict['next_phase'] = ['/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                     '''
                     return {
@@ -828,13 +903,12 @@ class EmotionChat:
 
                 result_dict['emotion'] = result_dict['emotions'][0]
                 result_dict['state'] = 'REQUIRE_CERTAIN_EMOTION'
-                result_dict['answer'] = EmotionAnswerer().generate_answer_under5(text,
+                result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text,
                                                                                  result_dict['emotion'],
                                                                                  result_dict['topics'][0])
                 result_dict['previous_phase'] = pre_result_dict['current_phase']
                 result_dict['current_phase'] = '/generate_emotion_chat'
-                result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                             '/recommend_contents', '/end_phase']
+                result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
 
                 '''
                 return {
@@ -848,7 +922,7 @@ class EmotionChat:
                     # 'topic': topic,
                     'topics': [topic] + pre_topics,
                     'topic_prob': [max_topic_prob] + pre_topic_prob,
-                    'answer': EmotionAnswerer().generate_answer_under5(text),
+                    'answer': self.emotion_answerer.generate_answer_under5(text),
                     'previous_phase': ['/recognize_emotion_chat'],
                     'current_phase': '/generate_emotion_chat',
                     'next_phase': ['/generate_emotion_chat', '/recognize_emotion_chat', '/recommend_contents',
@@ -929,50 +1003,31 @@ class EmotionChat:
 def final_emotion(dict_: dict) -> dict:
     """
     컨텐츠 추천을 위한 최종 감정-주제와, 그 확률들을 리턴하는 함수
-    :param dict_: 마지막 turn의 return dictionary
+    세션 집계기(emotion_stats, topic_stats)가 있으면 기록을 다시 훑지 않고 바로 조회함
+    :param dict_: 마지막 turn의 return dictionary (또는 SessionState.to_result_dict())
     :return: 감정과 주제가 key, 그에 대응하는 확률이 value인 딕셔너리
     """
-    emotions = dict_['emotions']
-    emotion_prob = dict_['emotion_prob']
-    topics = dict_['topics']
-    topic_prob = dict_['topic_prob']
-
-    # emotion
-    max_emotion = most_freq(emotions)
-    pos = [i for i in range(len(emotions)) if emotions[i] == max_emotion]
-    max_emotion_prob = emotion_prob[pos[0]]
-    for idx in pos:
-        if emotion_prob[idx] > max_emotion_prob:
-            max_emotion_prob = emotion_prob[idx]
-
-    # topic
-    max_topic = most_freq(topics)
-    pos = [i for i in range(len(topics)) if topics[i] == max_topic]
-    max_topic_prob = topic_prob[pos[0]]
-    for idx in pos:
-        if topic_prob[idx] > max_topic_prob:
-            max_topic_prob = topic_prob[idx]
-
-    return {max_emotion: max_emotion_prob, max_topic: max_topic_prob}
+
+    emotions = emotion_stats(dict_)
+    topics = topic_stats(dict_)
+
+    # 최빈 감정(주제)과 그 감정(주제)의 최대 확률
+    max_emotion = emotions.mode()
+    max_topic = topics.mode()
+
+    return {max_emotion: emotions.max_prob[max_emotion], max_topic: topics.max_prob[max_topic]}
 
 
 def most_freq(list_: list):
     """
     리스트에서 최빈 값 리턴하는 함수
+    횟수가 같으면 리스트 앞쪽(최신순 기록에서는 가장 최근)에 있는 값을 리턴함
     :param list_: 감정(주제) 리스트
     :return: 리스트 최빈값
     """
 
-    length = len(list_)
-    arr = [0 for i in range(length)]
-    for i in range(length):
-        for j in range(i + 1, length):
-            if list_[i] == list_[j]:
-                arr[i] += 1
-    max_idx = 0
-    for i in range(length):
-        for j in range(i + 1, length):
-            if arr[i] < arr[j]:
-                max_idx = j
-
-    return list_[max_idx]
+    counts = Counter(list_)
+    max_count = max(counts.values())
+    for value in list_:
+        if counts[value] == max_count:
+            return value
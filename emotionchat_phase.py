@@ -0,0 +1,156 @@
+import threading
+
+import emotionchat_config as config
+
+START_PHASE = '/welcomemsg_chat'  # 대화 시작 단계
+
+
+class PhaseGraph:
+
+    def __init__(self, pred_phase: dict, phases: list = ()):
+        """
+        대화 단계(phase) 전이 그래프입니다.
+        단계 이름을 정수 id로 바꾸고, 단계별로 허용되는 다음 단계 집합을 bitset(int)으로 만들어둡니다.
+        단계 검사는 문자열 리스트를 훑지 않고 bit 연산 한 번으로 합니다.
+
+        :param pred_phase: {단계: 예상되는 다음 단계 리스트} (config.PRED_PHASE)
+        :param phases: 전이가 정의되지 않았지만 알려진 단계 이름들 (config.PHASE_INTENT의 key 등)
+        """
+
+        self.pred_phase = {phase: tuple(nexts) for phase, nexts in pred_phase.items()}
+        self.ids = {}
+        self._lock = threading.Lock()
+
+        for phase in list(phases) + list(self.pred_phase):
+            self.id_of(phase)
+        for nexts in self.pred_phase.values():
+            for phase in nexts:
+                self.id_of(phase)
+
+        self.defined = frozenset(self.ids)  # config에 정의된 단계 (이후에 본 단계는 verify에서 경고)
+        self.transitions = {phase: self.mask(nexts) for phase, nexts in self.pred_phase.items()}
+        self._masks = {}  # 다음 단계 리스트(tuple) → bitset 캐시
+
+    def id_of(self, phase: str) -> int:
+        """
+        단계 이름의 정수 id를 반환합니다. 처음 보는 단계면 새 id를 부여합니다.
+        """
+
+        phase_id = self.ids.get(phase)
+        if phase_id is None:
+            with self._lock:
+                phase_id = self.ids.setdefault(phase, len(self.ids))
+
+        return phase_id
+
+    def mask(self, phases) -> int:
+        """
+        단계 리스트를 bitset으로 바꿉니다.
+
+        :param phases: 단계 이름 리스트
+        :return: 각 단계 id 위치의 bit가 켜진 정수
+        """
+
+        bits = 0
+        for phase in phases:
+            bits |= 1 << self.id_of(phase)
+
+        return bits
+
+    def allowed_mask(self, next_phases) -> int:
+        """
+        이전 단계에서 예상한 다음 단계 리스트의 bitset을 반환합니다. (같은 리스트는 한 번만 계산)
+        """
+
+        if isinstance(next_phases, str):
+            next_phases = [next_phases]
+
+        key = tuple(next_phases)
+        bits = self._masks.get(key)
+        if bits is None:
+            bits = self._masks[key] = self.mask(key)
+
+        return bits
+
+    def check(self, pre_pred_phases, current_phase: str) -> bool:
+        """
+        현재 단계가 이전 단계에서 예상한 단계에 포함되는지 검사합니다.
+
+        :param pre_pred_phases: 이전 단계에서 예상한 단계(list)
+        :param current_phase: 현재 단계(str)
+        :return: bool(True, False)
+        """
+
+        if isinstance(pre_pred_phases, str) or not isinstance(current_phase, str):
+            # 문자열(부분 문자열 검사)이나 단계 이름이 아닌 값은 기존 in 검사와 똑같이 처리
+            return current_phase in pre_pred_phases
+
+        try:
+            # mask를 먼저 만들어야 config에 없는 단계 이름도 id가 생김
+            bits = self.allowed_mask(pre_pred_phases)
+        except TypeError:
+            # 리스트 안에 리스트가 들어있는 경우 등 (hash 불가)
+            return current_phase in pre_pred_phases
+
+        phase_id = self.ids.get(current_phase)
+        return phase_id is not None and bool(bits >> phase_id & 1)
+
+    def can_follow(self, phase: str, next_phase: str) -> bool:
+        """
+        config.PRED_PHASE 기준으로 phase 다음에 next_phase가 올 수 있는지 검사합니다.
+        """
+
+        phase_id = self.ids.get(next_phase)
+        return phase_id is not None and bool(self.transitions.get(phase, 0) >> phase_id & 1)
+
+    def next_phases(self, phase: str) -> list:
+        """
+        config.PRED_PHASE에 정의된 phase의 예상 다음 단계 리스트를 반환합니다.
+        (result_dict에 넣고 수정해도 되도록 새 리스트로 반환)
+        """
+
+        return list(self.pred_phase[phase])
+
+    def verify(self, start: str = START_PHASE) -> list:
+        """
+        전이 그래프를 오프라인으로 검사합니다.
+
+        - 전이가 정의되지 않은 단계로 가는 전이 (오타 등)
+        - 시작 단계에서 도달할 수 없는 단계
+        - config에 정의되지 않았는데 실행 중에 사용된 단계
+
+        :param start: 시작 단계
+        :return: 문제 설명 문자열 리스트 (문제가 없으면 빈 리스트)
+        """
+
+        problems = []
+
+        for phase, nexts in self.pred_phase.items():
+            for next_phase in nexts:
+                if next_phase not in self.pred_phase:
+                    problems.append('{0} → {1} : {1}의 다음 단계가 정의되지 않았습니다.'.format(phase, next_phase))
+
+        reached, stack = {start}, [start]
+        while stack:
+            for next_phase in self.pred_phase.get(stack.pop(), ()):
+                if next_phase not in reached:
+                    reached.add(next_phase)
+                    stack.append(next_phase)
+
+        for phase in self.pred_phase:
+            if phase not in reached:
+                problems.append('{0} : {1}에서 도달할 수 없는 단계입니다.'.format(phase, start))
+
+        for phase in sorted(set(self.ids) - self.defined):
+            problems.append('{0} : config에 정의되지 않은 단계가 사용되었습니다.'.format(phase))
+
+        return problems
+
+
+# 프로세스 전역 단계 그래프 (config에서 한 번만 컴파일)
+phase_graph = PhaseGraph(config.PRED_PHASE, list(config.PHASE_INTENT))
+
+
+if __name__ == '__main__':
+    for problem in phase_graph.verify():
+        print(problem)
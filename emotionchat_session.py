@@ -0,0 +1,366 @@
+from array import array
+from itertools import islice
+
+import emotionchat_config as config
+
+# 턴마다 최신순으로 앞에 쌓이는 result_dict의 기록 key
+HISTORY_KEYS = ('input', 'emotions', 'emotion_prob', 'topics', 'topic_prob')
+
+
+def history_limit(key: str) -> int:
+    """
+    기록 key별 최대 길이를 반환합니다. (input은 토큰 수, 나머지는 턴 수 기준)
+    """
+
+    return config.SESSION['max_input_tokens'] if key == 'input' else config.SESSION['max_history']
+
+
+class History(list):
+    """
+    이전 기록과 이미 합쳐진 (최신순, 최대 길이로 잘린) 기록 리스트입니다.
+    일반 list와 똑같이 동작하고, merge_history가 같은 result_dict를 두 번 합치지 않도록 표시하는 용도입니다.
+    added는 이번 턴에 새로 추가된 (앞쪽) 값의 개수입니다.
+    """
+
+    __slots__ = ('added',)
+
+    def __init__(self, values=(), added: int = 0):
+        super().__init__(values)
+        self.added = added
+
+
+def merge_history(pre_result_dict: dict, result_dict: dict) -> dict:
+    """
+    현재 턴의 기록 앞에 이전 턴까지의 기록을 이어붙입니다. (최신순)
+    기록은 SESSION 설정의 최대 길이까지만 유지하고, 이미 합쳐진 result_dict는 다시 합치지 않습니다.
+
+    :param pre_result_dict: 이전 단계 result_dict
+    :param result_dict: 현재 단계 result_dict
+    :return: 기록이 합쳐진 result_dict (같은 객체)
+    """
+
+    for key in HISTORY_KEYS:
+        current = result_dict[key]
+        if isinstance(current, History):
+            continue
+
+        limit = history_limit(key)
+        merged = History(current[:limit])
+        merged.added = len(merged)
+        merged.extend(islice(pre_result_dict[key], max(limit - len(merged), 0)))
+        result_dict[key] = merged
+
+    return result_dict
+
+
+class RingBuffer:
+    __slots__ = ('capacity', '_data', '_head', '_size')
+
+    def __init__(self, capacity: int, typecode: str = None):
+        """
+        최대 길이가 고정된 기록 버퍼입니다. push는 O(1)이고, 가득 차면 가장 오래된 값을 덮어씁니다.
+        인덱스 0이 가장 최근 값이며 (result_dict 기록과 같은 최신순), typecode를 주면 array로 저장합니다.
+
+        :param capacity: 최대 길이
+        :param typecode: array typecode (ex. 'd'), None이면 파이썬 객체 리스트로 저장
+        """
+
+        self.capacity = capacity
+        self._data = array(typecode, [0]) * capacity if typecode else [None] * capacity
+        self._head = -1
+        self._size = 0
+
+    def push(self, value):
+        self._head = (self._head + 1) % self.capacity
+        self._data[self._head] = value
+        self._size = min(self._size + 1, self.capacity)
+
+    def assign(self, values):
+        """
+        최신순 값들로 버퍼를 다시 채웁니다. (최대 capacity개만 사용)
+        """
+
+        values = list(islice(values, self.capacity))
+        self._head, self._size = -1, 0
+        for value in reversed(values):
+            self.push(value)
+
+    def tolist(self) -> list:
+        return list(self)
+
+    def __getitem__(self, idx: int):
+        if idx < 0:
+            idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError('RingBuffer index out of range')
+        return self._data[(self._head - idx) % self.capacity]
+
+    def __iter__(self):
+        for idx in range(self._size):
+            yield self._data[(self._head - idx) % self.capacity]
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return 'RingBuffer({})'.format(self.tolist())
+
+
+class LabelAggregator:
+    __slots__ = ('decay', 'counts', 'max_prob', 'last_seen', 'scores', 'step')
+
+    # 감쇠 점수의 scale이 이 값을 넘으면 한 번 정규화 (float overflow 방지)
+    RESCALE_LIMIT = 1e100
+
+    def __init__(self, decay: float = None):
+        """
+        감정(주제) 라벨 기록을 턴마다 O(1)로 누적하는 집계기입니다.
+        라벨별 등장 횟수, 최대 확률, 마지막 등장 턴, 감쇠 점수를 유지하고
+        최빈 라벨 등은 라벨 수에 비례하는 시간에 조회합니다.
+
+        :param decay: 턴당 감쇠율 (0~1, 최근 턴일수록 가중치가 큼)
+        """
+
+        self.decay = config.SESSION['decay'] if decay is None else decay
+        self.counts = {}
+        self.max_prob = {}
+        self.last_seen = {}
+        self.scores = {}
+        self.step = 0
+
+    @classmethod
+    def from_history(cls, labels: list, probs: list, decay: float = None) -> 'LabelAggregator':
+        """
+        최신순 기록 리스트로 집계기를 만듭니다. (저장된 대화 분석용, O(n))
+
+        :param labels: 최신순 라벨 리스트
+        :param probs: labels와 같은 순서의 확률 리스트
+        """
+
+        aggregator = cls(decay)
+        for label, prob in reversed(list(zip(labels, probs))):
+            aggregator.add(label, prob)
+        return aggregator
+
+    def add(self, label, prob: float):
+        """
+        한 턴의 라벨과 확률을 누적합니다.
+        감쇠 점수는 매 턴 모든 점수를 줄이는 대신 새 값의 가중치를 키우는 방식으로 O(1)에 갱신합니다.
+        """
+
+        prob = float(prob)
+        self.step += 1
+        weight = self.decay ** -self.step if self.decay > 0 else 1.0
+
+        self.counts[label] = self.counts.get(label, 0) + 1
+        self.max_prob[label] = max(self.max_prob.get(label, prob), prob)
+        self.last_seen[label] = self.step
+        self.scores[label] = self.scores.get(label, 0.0) + prob * weight
+
+        if weight > self.RESCALE_LIMIT:
+            self._rescale()
+
+    def mode(self):
+        """
+        가장 많이 등장한 라벨을 반환합니다. 횟수가 같으면 가장 최근에 등장한 라벨을 반환합니다.
+        """
+
+        if len(self.counts) == 0:
+            return None
+        return max(self.counts, key=lambda label: (self.counts[label], self.last_seen[label]))
+
+    def decayed(self) -> dict:
+        """
+        라벨별 감쇠 점수를 반환합니다. (마지막 턴의 가중치가 1)
+        """
+
+        if self.decay <= 0:
+            return dict(self.scores)
+        scale = self.decay ** self.step
+        return {label: score * scale for label, score in self.scores.items()}
+
+    def top_decayed(self):
+        """
+        감쇠 점수가 가장 높은 라벨을 반환합니다.
+        """
+
+        decayed = self.decayed()
+        return max(decayed, key=decayed.get) if len(decayed) > 0 else None
+
+    def _rescale(self):
+        scale = self.decay ** self.step
+        self.scores = {label: score * scale for label, score in self.scores.items()}
+        self.last_seen = {label: seen - self.step for label, seen in self.last_seen.items()}
+        self.step = 0
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def to_dict(self) -> dict:
+        return {'decay': self.decay, 'counts': dict(self.counts), 'max_prob': dict(self.max_prob),
+                'last_seen': dict(self.last_seen), 'scores': dict(self.scores), 'step': self.step}
+
+    @classmethod
+    def from_dict(cls, dict_: dict) -> 'LabelAggregator':
+        aggregator = cls(dict_['decay'])
+        aggregator.counts = dict(dict_['counts'])
+        aggregator.max_prob = dict(dict_['max_prob'])
+        aggregator.last_seen = dict(dict_['last_seen'])
+        aggregator.scores = dict(dict_['scores'])
+        aggregator.step = dict_['step']
+        return aggregator
+
+
+def emotion_stats(result_dict: dict) -> LabelAggregator:
+    """
+    result_dict의 감정 집계기를 반환합니다. 세션 집계기가 없으면 기록으로 새로 만듭니다.
+    """
+
+    stats = result_dict.get('emotion_stats')
+    if stats is None:
+        stats = LabelAggregator.from_history(result_dict['emotions'], result_dict['emotion_prob'])
+    return stats
+
+
+def topic_stats(result_dict: dict) -> LabelAggregator:
+    """
+    result_dict의 주제 집계기를 반환합니다. 세션 집계기가 없으면 기록으로 새로 만듭니다.
+    """
+
+    stats = result_dict.get('topic_stats')
+    if stats is None:
+        stats = LabelAggregator.from_history(result_dict['topics'], result_dict['topic_prob'])
+    return stats
+
+
+class SessionState:
+    __slots__ = ('input', 'intent', 'entity', 'state', 'emotion', 'emotions', 'emotion_prob', 'emotion_probs',
+                 'topics', 'topic_prob', 'answer', 'previous_phase', 'current_phase', 'next_phase',
+                 'intent_turn_cnt', 'turn_cnt', 'emotion_stats', 'topic_stats')
+
+    VERSION = 1
+
+    def __init__(self):
+        """
+        한 세션의 대화 상태입니다.
+        기록(input, emotions, emotion_prob, topics, topic_prob)은 고정 길이 RingBuffer에 저장해서
+        대화가 길어져도 세션 메모리가 일정하게 유지됩니다. 확률 기록은 float array로 저장합니다.
+        """
+
+        self.input = RingBuffer(history_limit('input'))
+        self.emotions = RingBuffer(history_limit('emotions'))
+        self.emotion_prob = RingBuffer(history_limit('emotion_prob'), 'd')
+        self.topics = RingBuffer(history_limit('topics'))
+        self.topic_prob = RingBuffer(history_limit('topic_prob'), 'd')
+        self.emotion_probs = array('d')
+        self.emotion_stats = LabelAggregator()
+        self.topic_stats = LabelAggregator()
+
+        self.intent = ''
+        self.entity = []
+        self.state = ''
+        self.emotion = ''
+        self.answer = ''
+        self.previous_phase = []
+        self.current_phase = ''
+        self.next_phase = []
+        self.intent_turn_cnt = 0
+        self.turn_cnt = 0
+
+    @property
+    def turn_cnts(self) -> dict:
+        """
+        EmotionChat.run에 넘길 turn_cnts 딕셔너리를 반환합니다.
+        """
+
+        return {'turn_cnt': self.turn_cnt, 'intent_turn_cnt': self.intent_turn_cnt}
+
+    def update(self, result_dict: dict):
+        """
+        EmotionChat.run이 반환한 result_dict로 세션 상태를 갱신하고 turn 수를 1 증가시킵니다.
+
+        :param result_dict: 현재 단계 result_dict
+        """
+
+        # 이번 턴에 새로 추가된 감정/주제만 집계기에 누적 (오래된 것부터)
+        self._aggregate(self.emotion_stats, result_dict['emotions'], result_dict['emotion_prob'])
+        self._aggregate(self.topic_stats, result_dict['topics'], result_dict['topic_prob'])
+
+        for key in HISTORY_KEYS:
+            getattr(self, key).assign(result_dict[key])
+
+        self.emotion_probs = array('d', (float(prob) for prob in result_dict['emotion_probs']))
+        self.intent = result_dict['intent']
+        self.entity = list(result_dict['entity'])
+        self.state = result_dict['state']
+        self.emotion = result_dict['emotion']
+        self.answer = result_dict['answer']
+        self.previous_phase = result_dict['previous_phase']
+        self.current_phase = result_dict['current_phase']
+        self.next_phase = list(result_dict['next_phase'])
+        self.intent_turn_cnt = result_dict['intent_turn_cnt']
+        self.turn_cnt += 1
+
+    @staticmethod
+    def _aggregate(stats: LabelAggregator, labels: list, probs: list):
+        added = getattr(labels, 'added', 0)
+        for idx in reversed(range(min(added, len(labels), len(probs)))):
+            stats.add(labels[idx], probs[idx])
+
+    def to_result_dict(self) -> dict:
+        """
+        EmotionChat.run에 pre_result_dict로 넘길 딕셔너리를 만듭니다.
+        감정/주제 집계기도 함께 넘겨서 최빈 감정 등을 기록 재탐색 없이 조회할 수 있게 합니다.
+        """
+
+        result_dict = self._to_dict()
+        result_dict['emotion_stats'] = self.emotion_stats
+        result_dict['topic_stats'] = self.topic_stats
+        return result_dict
+
+    def _to_dict(self) -> dict:
+        return {
+            'input': self.input.tolist(),
+            'intent': self.intent,
+            'entity': list(self.entity),
+            'state': self.state,
+            'emotion': self.emotion,
+            'emotions': self.emotions.tolist(),
+            'emotion_prob': self.emotion_prob.tolist(),
+            'emotion_probs': self.emotion_probs.tolist(),
+            'topics': self.topics.tolist(),
+            'topic_prob': self.topic_prob.tolist(),
+            'answer': self.answer,
+            'previous_phase': self.previous_phase,
+            'current_phase': self.current_phase,
+            'next_phase': list(self.next_phase),
+            'intent_turn_cnt': self.intent_turn_cnt
+        }
+
+    def to_dict(self) -> dict:
+        """
+        json으로 저장할 수 있는 고정된 형태로 세션 상태를 직렬화합니다.
+        """
+
+        dict_ = self._to_dict()
+        dict_['emotion_stats'] = self.emotion_stats.to_dict()
+        dict_['topic_stats'] = self.topic_stats.to_dict()
+        dict_['turn_cnt'] = self.turn_cnt
+        dict_['version'] = self.VERSION
+        return dict_
+
+    @classmethod
+    def from_dict(cls, dict_: dict) -> 'SessionState':
+        """
+        to_dict로 직렬화한 세션 상태를 복원합니다.
+        """
+
+        if dict_.get('version') != cls.VERSION:
+            raise ValueError('지원하지 않는 세션 버전입니다 : {}'.format(dict_.get('version')))
+
+        session = cls()
+        session.update(dict_)
+        session.turn_cnt = dict_['turn_cnt']
+        session.emotion_stats = LabelAggregator.from_dict(dict_['emotion_stats'])
+        session.topic_stats = LabelAggregator.from_dict(dict_['topic_stats'])
+        return session
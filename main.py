@@ -1,4 +1,5 @@
 from emotionchat_engine import EmotionChat, final_emotion
+from emotionchat_session import SessionState
 import torch
 import random
 import os
@@ -30,27 +31,9 @@ if __name__ == '__main__':
     # initialization
     seed_everything(1234)
     conversation_history = []
-    turn_cnt, intent_turn_cnt = 0, 0
-    turn_cnts = {'turn_cnt': turn_cnt,
-                 'intent_turn_cnt': intent_turn_cnt
-                 }
-    result_dict = {
-        'input': [],
-        'intent': '',
-        'entity': [],
-        'state': '',
-        'emotion': '',
-        'emotions': [],
-        'emotion_prob': [],
-        'emotion_probs': [],
-        'topics': [],
-        'topic_prob': [],
-        'answer': '',
-        'previous_phase': [],
-        'current_phase': '',
-        'next_phase': [],
-        'intent_turn_cnt': intent_turn_cnt
-    }
+    turn_cnt = 0
+    # 세션 상태(누적 기록은 최대 길이까지만 유지)
+    session = SessionState()
 
     #previous_phase = ['/welcomemsg_chat', '/end_chat']
     #previous_phase = None
@@ -59,7 +42,8 @@ if __name__ == '__main__':
         sent = input('User: ')
         # wav_file = './exdata/' + sent + '.wav' # 수정
         wav_file = './exdata/test1.wav'
-        result_dict = emotionchat.run(sent, wav_file, result_dict, turn_cnts)
+        result_dict = emotionchat.run(sent, wav_file, session.to_result_dict(), session.turn_cnts)
+        session.update(result_dict)
 
         '''
         tokens = list(sent.split(' '))
@@ -132,18 +116,14 @@ if __name__ == '__main__':
         pre_tokens = result_dict['input']
         '''
 
-        # turn_cnt 종류 turn_cnts에 저장
-        turn_cnts = {'turn_cnt': turn_cnt,
-                     'intent_turn_cnt': intent_turn_cnt
-                     }
-
         # 현재 단계명이 '/end_phase'이면 강제종료
         if result_dict['current_phase'] == '/end_phase':
             break
 
 
     # 최대 감정, 주제와 그에 대응하는 확률 출력
-    final_emo_topic = final_emotion(result_dict)
+    # 세션 집계기로 최빈 감정/주제 조회
+    final_emo_topic = final_emotion(session.to_result_dict())
 
     itemlist = final_emo_topic.items()
 
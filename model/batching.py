@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+import emotionchat_config as config
+
+
+class MicroBatcher:
+
+    def __init__(self, batch_fn: Callable[[list], list], max_batch: int = None,
+                 max_wait_ms: float = None, name: str = 'batcher'):
+        """
+        여러 세션에서 동시에 들어온 요청을 몇 ms 동안 모아 한 번의 batch 추론으로 처리하는 클래스입니다.
+        worker 쓰레드 하나가 큐에서 요청을 모아 batch_fn을 호출하고, 결과를 요청 순서대로 돌려줍니다.
+
+        :param batch_fn: 요청 리스트를 받아 같은 길이의 결과 리스트를 반환하는 함수
+        :param max_batch: 한 번에 묶을 최대 요청 수
+        :param max_wait_ms: 첫 요청 이후 batch를 모으기 위해 기다리는 최대 시간 (ms)
+        :param name: worker 쓰레드 이름
+        """
+
+        self.batch_fn = batch_fn
+        self.max_batch = config.BATCHING['max_batch'] if max_batch is None else max_batch
+        self.max_wait = (config.BATCHING['max_wait_ms'] if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        """
+        요청 하나를 큐에 넣습니다.
+
+        :param item: batch_fn에 넘길 요청 하나
+        :return: 결과를 담을 Future
+        """
+
+        self._start()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        """
+        요청 하나를 넣고 결과가 나올 때까지 기다립니다.
+        """
+
+        return self.submit(item).result(timeout=timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        """
+        첫 요청이 올 때까지 기다린 뒤, max_wait 동안 또는 max_batch개가 찰 때까지 요청을 모읍니다.
+        """
+
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # 대기 중에 취소된 요청은 batch에서 제외
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if len(batch) == 0:
+                continue
+
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError('{}: batch_fn returned {} results for {} requests'
+                                       .format(self.name, len(results), len(batch)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,115 @@
+import contextlib
+import threading
+
+import torch
+
+import emotionchat_config as config
+
+_threads_lock = threading.Lock()
+_threads_applied = False
+
+
+class DevicePolicy:
+
+    def __init__(self, use_gpu: bool = False, gpu_id: int = 0,
+                 num_threads: int = 0, num_interop_threads: int = 0, bf16: bool = False):
+        """
+        모델을 어떤 디바이스/dtype으로 추론할지 정하는 정책 객체입니다.
+        기본값은 CPU이고, GPU는 use_gpu=True일 때만 (그리고 사용 가능할 때만) 사용합니다.
+
+        :param use_gpu: GPU 사용 여부
+        :param gpu_id: 사용할 GPU 번호
+        :param num_threads: torch intra-op 쓰레드 수 (0이면 기본값)
+        :param num_interop_threads: torch inter-op 쓰레드 수 (0이면 기본값)
+        :param bf16: bfloat16 autocast 사용 여부
+        """
+
+        self.use_gpu = use_gpu and torch.cuda.is_available()
+        self.device = torch.device('cuda:{}'.format(gpu_id) if self.use_gpu else 'cpu')
+        self.bf16 = bf16
+        self.dtype = torch.bfloat16 if bf16 else torch.float32
+        self.num_threads = num_threads
+        self.num_interop_threads = num_interop_threads
+        self._apply_threads()
+
+    @classmethod
+    def from_config(cls, **kwargs) -> 'DevicePolicy':
+        """
+        emotionchat_config.DEVICE 값으로 정책을 만듭니다.
+        kwargs로 넘긴 값은 config 값을 덮어씁니다.
+        """
+
+        options = dict(config.DEVICE)
+        options.update(kwargs)
+        return cls(**options)
+
+    def cpu(self) -> 'DevicePolicy':
+        """
+        같은 쓰레드/dtype 설정으로 CPU를 사용하는 정책을 반환합니다. (이미 CPU면 자기 자신)
+        """
+
+        if not self.use_gpu:
+            return self
+        return DevicePolicy(use_gpu=False, num_threads=self.num_threads,
+                            num_interop_threads=self.num_interop_threads, bf16=self.bf16)
+
+    def to(self, module):
+        """
+        모듈(또는 텐서)을 정책 디바이스로 옮깁니다.
+        가중치는 float32로 유지하고, bf16은 inference()의 autocast로 적용합니다.
+        """
+
+        return module.to(self.device)
+
+    def map_location(self):
+        """
+        torch.load에 넘길 map_location 입니다.
+        """
+
+        return self.device
+
+    def inference(self):
+        """
+        추론용 컨텍스트 매니저입니다.
+        torch.inference_mode로 autograd 기록을 끄고, bf16이면 autocast를 함께 적용합니다.
+
+        :return: with 문에 사용할 컨텍스트 매니저
+        """
+
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+
+        if self.bf16:
+            if self.use_gpu:
+                stack.enter_context(torch.cuda.amp.autocast(dtype=torch.bfloat16))
+            else:
+                stack.enter_context(torch.cpu.amp.autocast(dtype=torch.bfloat16))
+
+        return stack
+
+    def _apply_threads(self):
+        """
+        torch 쓰레드 수는 프로세스 전역 설정이라 처음 한 번만 적용합니다.
+        """
+
+        global _threads_applied
+
+        with _threads_lock:
+            if _threads_applied:
+                return
+
+            if self.num_threads > 0:
+                torch.set_num_threads(self.num_threads)
+
+            if self.num_interop_threads > 0:
+                try:
+                    torch.set_num_interop_threads(self.num_interop_threads)
+                except RuntimeError:
+                    # 이미 병렬 작업이 시작된 뒤에는 inter-op 쓰레드 수를 바꿀 수 없음
+                    pass
+
+            _threads_applied = True
+
+    def __repr__(self):
+        return 'DevicePolicy(device={}, dtype={}, num_threads={})' \
+            .format(self.device, self.dtype, torch.get_num_threads())
@@ -0,0 +1,326 @@
+import math
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torchaudio.functional import amplitude_to_DB
+from torchaudio.transforms import MFCC, Resample
+
+
+class MFCCFeaturizer(nn.Module):
+
+    def __init__(self, sample_rate=48000, resample_rate=16000, n_mfcc=40, n_fft_size=400, max_len=400):
+        """
+        여러 음성 clip을 한 번에 resample → 앞뒤 무음 제거 → MFCC → 정규화하는 feature 추출기입니다.
+        clip마다 CPU에서 librosa로 resample하지 않고, 한 batch를 padding해서 torch 연산 한 번으로 처리합니다.
+
+        :param sample_rate: 입력 음성의 sample rate
+        :param resample_rate: MFCC를 계산할 sample rate
+        :param n_mfcc: MFCC 계수 개수
+        :param n_fft_size: STFT window 크기
+        :param max_len: 최대 frame 수 (넘으면 잘라냄)
+        """
+
+        super(MFCCFeaturizer, self).__init__()
+        self.n_mfcc = n_mfcc
+        self.max_len = max_len
+        self.n_fft = n_fft_size
+        self.pad = n_fft_size // 2
+        self.hop_length = n_fft_size // 2
+
+        # librosa(resampy) kaiser_best와 같은 필터, kernel은 생성할 때 한 번만 계산됨
+        self.resample = Resample(
+            orig_freq=sample_rate,
+            new_freq=resample_rate,
+            lowpass_filter_width=64,
+            rolloff=0.9475937167399596,
+            resampling_method='kaiser_window',
+            beta=14.769656459379492
+        )
+        self.gcd = math.gcd(sample_rate, resample_rate)
+        self.orig_freq, self.new_freq = sample_rate // self.gcd, resample_rate // self.gcd
+
+        # clip마다 길이가 달라서 reflect padding은 아래 _center()에서 직접 함
+        self.mfcc = MFCC(
+            sample_rate=resample_rate,
+            n_mfcc=n_mfcc,
+            log_mels=False,
+            melkwargs={'n_fft': n_fft_size, 'hop_length': self.hop_length, 'center': False}
+        )
+
+    @property
+    def device(self):
+        return self.mfcc.dct_mat.device
+
+    @staticmethod
+    def _reflect(positions, length):
+        """
+        [0, length) 밖의 위치를 STFT(center=True)의 reflect padding처럼 안쪽으로 접습니다.
+
+        :param positions: 위치 (B, N)
+        :param length: 신호 길이 (B, 1)
+        :return: [0, length - 1] 범위의 위치 (B, N)
+        """
+
+        last = (length - 1).clamp(min=0)
+        positions = positions.abs()  # 왼쪽 reflect
+        positions = torch.where(positions > last, 2 * last - positions, positions)  # 오른쪽 reflect
+        return torch.minimum(positions.clamp(min=0), last)
+
+    def _center(self, audio, start, length):
+        """
+        clip마다 무음을 잘라낸 구간을 왼쪽으로 당기고 앞뒤를 reflect padding 합니다.
+        (clip 하나씩 STFT(center=True)를 했을 때와 같은 입력을 gather 한 번으로 만듦)
+
+        :param audio: resample된 음성 (B, T)
+        :param start: clip별 무음 제거 시작 위치 (B,)
+        :param length: clip별 무음 제거 후 길이 (B,)
+        :return: (B, max(length) + 2 * pad), 단 max_len개 frame에 필요한 길이까지만
+        """
+
+        size = min(int(length.max()) + 2 * self.pad, (self.max_len - 1) * self.hop_length + self.n_fft)
+        positions = torch.arange(size, device=audio.device) - self.pad
+        positions = positions.unsqueeze(0).expand(len(audio), -1)
+        positions = self._reflect(positions, length.unsqueeze(1)) + start.unsqueeze(1)
+        return audio.gather(1, positions)
+
+    def compute_frames(self, audio, first, count):
+        """
+        무음을 잘라낸 신호 하나에서 first번째부터 count개의 mel power frame을 계산합니다.
+        mel frame은 서로 독립이므로 신호가 들어오는 대로 나눠서 계산해도 한 번에 계산한 것과 같습니다.
+        (dB 변환의 top_db 기준은 전체 frame에 따라 달라지므로 mel_to_mfcc()로 마지막에 한 번에 계산)
+
+        :param audio: 무음을 잘라낸 resample된 신호 (T,), 신호 끝을 넘는 위치는 reflect 됨
+        :param first: 시작 frame 번호
+        :param count: 계산할 frame 수
+        :return: (n_mels, count)
+        """
+
+        begin = first * self.hop_length - self.pad
+        positions = torch.arange(begin, begin + (count - 1) * self.hop_length + self.n_fft, device=audio.device)
+        length = torch.tensor([[len(audio)]], device=audio.device)
+        return self.mfcc.MelSpectrogram(audio[self._reflect(positions.unsqueeze(0), length)])[0]
+
+    def mel_to_mfcc(self, mel, frames):
+        """
+        mel power spectrogram을 dB로 바꾸고 DCT 해서 MFCC를 계산합니다. (torchaudio MFCC와 같은 연산)
+        MFCC는 입력 전체의 최댓값 - top_db 아래를 잘라내므로, batch로 계산할 때는
+        clip마다 자기 유효 frame 안의 최댓값을 기준으로 잘라야 clip 하나씩 계산한 것과 같습니다.
+        모델이 쓰는 앞의 max_len개 frame만 기준으로 삼아서, 그만큼만 받고 멈추는 streaming 결과와도 같게 합니다.
+
+        :param mel: mel power spectrogram (B, n_mels, frames)
+        :param frames: clip별 유효 frame 수 (B,)
+        :return: (B, n_mfcc, min(frames, max_len))
+        """
+
+        mel = mel[:, :, :self.max_len]
+        to_db = self.mfcc.amplitude_to_DB
+        mel_db = amplitude_to_DB(mel, to_db.multiplier, to_db.amin, to_db.db_multiplier, top_db=None)
+
+        if to_db.top_db is not None:
+            valid = torch.arange(mel.shape[2], device=mel.device).unsqueeze(0) < frames.unsqueeze(1)
+            peak = mel_db.masked_fill(~valid.unsqueeze(1), -math.inf).amax(dim=(1, 2), keepdim=True)
+            mel_db = torch.maximum(mel_db, peak - to_db.top_db)
+
+        return torch.matmul(mel_db.transpose(1, 2), self.mfcc.dct_mat).transpose(1, 2)
+
+    @staticmethod
+    def normalize(mfcc):
+        # frame별로 MFCC 계수에 대해 정규화 (..., n_mfcc, frames)
+        return (mfcc - mfcc.mean(dim=-2, keepdim=True)) / mfcc.std(dim=-2, keepdim=True)
+
+    def pad_frames(self, mfcc, frames):
+        """
+        :param mfcc: (B, n_mfcc, frames)
+        :param frames: clip별 유효 frame 수 (B,)
+        :return: (B, max_len, n_mfcc), 유효 frame 밖은 0
+        """
+
+        mfcc = mfcc[:, :, :self.max_len].transpose(1, 2)
+        mfcc = F.pad(mfcc, (0, 0, 0, self.max_len - mfcc.shape[1]))
+        valid = torch.arange(self.max_len, device=mfcc.device).unsqueeze(0) < frames.unsqueeze(1)
+        return mfcc.masked_fill(~valid.unsqueeze(2), 0.)
+
+    def stream(self) -> 'StreamingMFCC':
+        """
+        음성을 chunk 단위로 받으면서 MFCC를 미리 계산하는 streaming 추출기를 만듭니다.
+        """
+
+        return StreamingMFCC(self)
+
+    def forward(self, audios: list) -> tuple:
+        """
+        :param audios: 입력 sample rate의 mono 음성 배열(numpy or tensor) 리스트
+        :return: padding된 MFCC (B, max_len, n_mfcc), clip별 frame 수 (B,)
+                 (소리가 없는 clip은 0으로 채운 frame 1개로 취급해서 attention mask가 전부 막히지 않게 함)
+        """
+
+        with torch.autocast(self.device.type, enabled=False):
+            lengths = torch.tensor([len(audio) for audio in audios], device=self.device)
+            audio = torch.zeros(len(audios), max(int(lengths.max()), 1), device=self.device)
+            for idx, clip in enumerate(audios):
+                audio[idx, :len(clip)] = torch.as_tensor(clip, dtype=torch.float32)
+
+            # resample (B, T) → (B, T'), padding된 0은 뒤쪽 결과에만 영향
+            audio = self.resample(audio)
+            lengths = torch.ceil(lengths * self.new_freq / self.orig_freq).long()
+
+            # 앞뒤 무음(0) 위치를 batch 단위로 찾음
+            in_range = torch.arange(audio.shape[1], device=self.device).unsqueeze(0) < lengths.unsqueeze(1)
+            nonzero = (audio != 0) & in_range
+            has_sound = nonzero.any(dim=1)
+            start = nonzero.float().argmax(dim=1)
+            end = audio.shape[1] - nonzero.flip(1).float().argmax(dim=1)
+            length = torch.where(has_sound, end - start, torch.zeros_like(start))
+
+            frames = torch.div(length, self.hop_length, rounding_mode='floor') + 1
+            frames = torch.where(has_sound, frames, torch.zeros_like(frames))
+
+            mel = self.mfcc.MelSpectrogram(self._center(audio, start, length))
+            mfcc = self.normalize(self.mel_to_mfcc(mel, frames))
+
+            frames = frames.clamp(max=self.max_len)
+            return self.pad_frames(mfcc, frames), frames.clamp(min=1)
+
+
+class StreamingMFCC:
+
+    def __init__(self, featurizer: MFCCFeaturizer):
+        """
+        음성을 chunk 단위로 받으면서 resample과 mel spectrogram을 미리 계산해두는 streaming feature 추출기입니다.
+        감정 모델은 앞의 max_len개 frame만 사용하므로, 그만큼 계산되면 더 이상 입력을 받지 않습니다.
+        dB 변환(top_db), DCT, 정규화는 모든 frame이 모인 finish()에서 한 번에 계산합니다.
+        계산 결과는 전체 음성을 MFCCFeaturizer에 한 번에 넣었을 때와 같습니다.
+
+        :param featurizer: resample kernel과 MFCC 설정을 가진 feature 추출기
+        """
+
+        self.featurizer = featurizer
+        self.orig_freq, self.new_freq = featurizer.orig_freq, featurizer.new_freq
+        self.width = getattr(featurizer.resample, 'width', 0)  # resample kernel의 한쪽 폭 (입력 샘플 수)
+        self.context = math.ceil(self.width / self.orig_freq)  # 앞쪽 문맥으로 남겨둘 resample 단계 수
+
+        self.raw = np.zeros(0, dtype=np.float32)  # 아직 resample에 필요한 입력 샘플
+        self.raw_offset = 0  # raw[0]의 전체 입력에서의 위치
+        self.n_input = 0  # 지금까지 받은 입력 샘플 수
+        self.n_steps = 0  # resample이 끝난 단계 수 (단계마다 입력 orig_freq개 → 출력 new_freq개)
+
+        self.signal = None  # 앞쪽 무음을 잘라낸 resample된 신호
+        self.end = 0  # signal에서 마지막으로 0이 아닌 샘플 다음 위치
+        self.mel = []  # 계산이 끝난 mel power frame들 (n_mels, k)
+        self.n_frames = 0
+        self.done = False
+
+    def feed(self, chunk) -> bool:
+        """
+        입력 sample rate의 음성 chunk를 추가하고, 확정된 부분까지 resample, mel spectrogram을 계산합니다.
+
+        :param chunk: mono 음성 샘플 배열
+        :return: max_len개 frame이 모두 계산되었는지 여부 (True면 이후 입력은 무시)
+        """
+
+        if self.done or len(chunk) == 0:
+            return self.done
+
+        self.raw = np.concatenate([self.raw, np.asarray(chunk, dtype=np.float32)])
+        self.n_input += len(chunk)
+
+        with torch.autocast(self.featurizer.device.type, enabled=False):
+            # 출력 단계 t는 입력 [t * orig - width, t * orig + width + orig)를 사용하므로 그만큼 들어온 단계까지만 확정
+            self._resample((self.n_input - self.width - self.orig_freq) // self.orig_freq + 1)
+
+            # frame k는 신호 [k * hop - pad, k * hop + pad)를 사용하므로
+            # 마지막 소리 위치까지 들어온 frame은 뒤에 무음이 오더라도 바뀌지 않음
+            hop, pad = self.featurizer.hop_length, self.featurizer.pad
+            self._compute_frames((self.end - pad) // hop + 1 if self.end > pad else 0)
+
+        return self.done
+
+    def finish(self) -> tuple:
+        """
+        입력이 끝났을 때 남은 부분을 계산하고 padding된 feature를 반환합니다.
+
+        :return: MFCC (1, max_len, n_mfcc), frame 수 (1,) (소리가 없으면 0으로 채운 frame 1개)
+        """
+
+        with torch.autocast(self.featurizer.device.type, enabled=False):
+            if not self.done:
+                self._resample(math.ceil(self.n_input / self.orig_freq), final=True)
+
+                # 뒤쪽 무음을 잘라내고, 끝에 걸친 frame은 reflect padding으로 다시 계산
+                hop, pad = self.featurizer.hop_length, self.featurizer.pad
+                if self.end > 0:
+                    self.signal = self.signal[:self.end]
+                    keep = min(self.n_frames, (self.end - pad) // hop + 1 if self.end > pad else 0)
+                    self._truncate(keep)
+                    self._compute_frames(self.end // hop + 1)
+
+            device = self.featurizer.device
+            frames = torch.tensor([max(self.n_frames, 1)], device=device)
+            if self.n_frames == 0:
+                return torch.zeros(1, self.featurizer.max_len, self.featurizer.n_mfcc, device=device), frames
+
+            mel = torch.cat(self.mel, dim=1).unsqueeze(0)
+            mfcc = self.featurizer.normalize(self.featurizer.mel_to_mfcc(mel, frames))
+            return self.featurizer.pad_frames(mfcc, frames), frames
+
+    def _resample(self, steps: int, final: bool = False):
+        """
+        resample 단계 [n_steps, steps)를 계산해서 signal 뒤에 붙입니다.
+        앞쪽 context 단계만큼 입력을 겹쳐서 resample한 뒤 겹친 출력은 버립니다.
+        """
+
+        if steps <= self.n_steps:
+            return
+
+        first = max(self.n_steps - self.context, 0)
+        begin = first * self.orig_freq - self.raw_offset
+        stop = steps * self.orig_freq + self.width + self.orig_freq - self.raw_offset
+
+        audio = torch.as_tensor(self.raw[begin:stop], device=self.featurizer.device).unsqueeze(0)
+        output = self.featurizer.resample(audio)[0]
+        output = output[(self.n_steps - first) * self.new_freq:(steps - first) * self.new_freq]
+        if final:
+            # 마지막 단계는 실제 출력 길이(ceil(n_input * new / orig))까지만
+            total = math.ceil(self.n_input * self.new_freq / self.orig_freq)
+            output = output[:total - self.n_steps * self.new_freq]
+
+        # 다음 계산에 필요한 context 이전의 입력은 버림
+        drop = max(steps - self.context, 0) * self.orig_freq - self.raw_offset
+        if drop > 0:
+            self.raw = self.raw[drop:]
+            self.raw_offset += drop
+
+        self.n_steps = steps
+        self._append(output)
+
+    def _append(self, output):
+        if self.signal is None:
+            # 아직 소리가 시작되지 않았으면 앞쪽 무음은 버림
+            nonzero = torch.nonzero(output).flatten()
+            if len(nonzero) == 0:
+                return
+            output = output[int(nonzero[0]):]
+            self.signal = output[:0]
+
+        nonzero = torch.nonzero(output).flatten()
+        if len(nonzero) > 0:
+            self.end = len(self.signal) + int(nonzero[-1]) + 1
+        self.signal = torch.cat([self.signal, output])
+
+    def _compute_frames(self, count: int):
+        count = min(count, self.featurizer.max_len)
+        if count > self.n_frames:
+            self.mel.append(self.featurizer.compute_frames(self.signal, self.n_frames, count - self.n_frames))
+            self.n_frames = count
+
+        if self.n_frames == self.featurizer.max_len:
+            # 필요한 frame이 모두 나왔으므로 입력 버퍼를 비우고 이후 입력은 받지 않음
+            self.done = True
+            self.raw, self.signal = self.raw[:0], None
+
+    def _truncate(self, count: int):
+        mel = torch.cat(self.mel, dim=1)[:, :count] if self.mel else None
+        self.mel = [mel] if mel is not None and count > 0 else []
+        self.n_frames = count
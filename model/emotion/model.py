@@ -1,6 +1,7 @@
 import os
 import math
 import copy
+import functools
 import torch
 import torch.nn as nn
 from torch.nn.modules.container import ModuleList
@@ -62,6 +63,9 @@ class TransformerBlock(nn.Module, ABC):
             attn_mask=mask)[0]
         return query + self.dropout(x)
 
+    # (query 길이, key 길이, device) → future mask, 모든 layer/stack이 공유
+    _future_masks = {}
+
     @staticmethod
     def get_future_mask(query, key=None):
         """
@@ -73,9 +77,14 @@ class TransformerBlock(nn.Module, ABC):
         dim_query = query.shape[0]
         dim_key = dim_query if key is None else key.shape[0]
 
-        future_mask = torch.ones(dim_query, dim_key, device=query.device)
-        future_mask = torch.triu(future_mask, diagonal=1).float()
-        future_mask = future_mask.masked_fill(future_mask == float(1), float('-inf'))
+        cache_key = (dim_query, dim_key, str(query.device))
+        future_mask = TransformerBlock._future_masks.get(cache_key)
+        if future_mask is None:
+            # inference_mode 안에서 처음 만들어져도 이후 학습에 쓸 수 있도록 일반 tensor로 생성
+            with torch.inference_mode(False):
+                future_mask = torch.full((dim_query, dim_key), float('-inf'), device=query.device)
+                future_mask = torch.triu(future_mask, diagonal=1)
+            TransformerBlock._future_masks[cache_key] = future_mask
         return future_mask
 
 
@@ -147,6 +156,20 @@ class TransformerEncoderBlock(nn.Module, ABC):
         return x
 
 
+@functools.lru_cache(maxsize=None)
+def _sinusoidal_table(max_len, d_model, padding_idx):
+    with torch.inference_mode(False):
+        return SinusoidalPositionalEmbedding.get_embedding(max_len + padding_idx + 1, d_model, padding_idx)
+
+
+def sinusoidal_table(max_len, d_model, padding_idx=0):
+    """
+    길이 max_len까지의 sinusoidal 위치 임베딩 table (max_len + padding_idx + 1, d_model)
+    같은 크기의 table은 한 번만 계산해서 모든 crossmodal/self-attention stack이 같이 씀
+    """
+    return _sinusoidal_table(max_len, d_model, padding_idx)
+
+
 class CrossmodalTransformer(nn.Module, ABC):
     def __init__(self,
                  n_layers,
@@ -157,11 +180,14 @@ class CrossmodalTransformer(nn.Module, ABC):
                  emb_dropout,
                  res_dropout,
                  attn_mask,
+                 max_len=400,
                  scale_embedding=True):
         super(CrossmodalTransformer, self).__init__()
         self.attn_mask = attn_mask
         self.emb_scale = math.sqrt(d_model) if scale_embedding else 1.0
-        self.pos_emb = SinusoidalPositionalEmbedding(d_model, 0, init_size=128)
+        self.padding_idx = 0
+        # 위치 임베딩 table은 max_len 크기로 미리 만들어두고 forward에서는 index만 함
+        self.register_buffer('pos_table', sinusoidal_table(max_len, d_model, self.padding_idx), persistent=False)
         self.dropout = nn.Dropout(emb_dropout)
 
         layer = TransformerEncoderBlock(
@@ -174,6 +200,25 @@ class CrossmodalTransformer(nn.Module, ABC):
         )
         self.layers = _get_clones(layer, n_layers)
 
+    def pos_emb(self, x):
+        """
+        fairseq SinusoidalPositionalEmbedding과 같은 위치 임베딩을 미리 만든 table에서 가져옵니다.
+        값이 padding_idx인 위치는 position이 padding_idx가 되어 0 벡터가 됩니다.
+
+        :param x: (B, L)
+        :return: (B, L, d_model)
+        """
+        mask = x.ne(self.padding_idx).int()
+        positions = (torch.cumsum(mask, dim=1).type_as(mask) * mask).long() + self.padding_idx
+
+        if self.padding_idx + 1 + x.shape[1] > self.pos_table.shape[0]:
+            # 미리 만든 길이보다 긴 입력이면 table을 늘림
+            with torch.inference_mode(False):
+                self.pos_table = sinusoidal_table(x.shape[1], self.pos_table.shape[1],
+                                                  self.padding_idx).to(self.pos_table.device)
+
+        return self.pos_table.index_select(0, positions.view(-1)).view(x.shape[0], x.shape[1], -1).detach()
+
     def forward(self, x_query, x_key=None, key_mask=None):
 
         # query settings
@@ -211,7 +256,8 @@ class MultimodalTransformer(nn.Module, ABC):
                  emb_dropout=.3,
                  res_dropout=.0,
                  out_dropout=.1,
-                 attn_mask=True):
+                 attn_mask=True,
+                 max_len=400):
         super(MultimodalTransformer, self).__init__()
         self.only_audio = only_audio
         self.only_text = only_text
@@ -237,7 +283,8 @@ class MultimodalTransformer(nn.Module, ABC):
             'relu_dropout': relu_dropout,
             'emb_dropout': emb_dropout,
             'res_dropout': res_dropout,
-            'attn_mask': attn_mask
+            'attn_mask': attn_mask,
+            'max_len': max_len
         }
 
         # crossmodal transformers
@@ -281,12 +328,9 @@ class MultimodalTransformer(nn.Module, ABC):
             x_text = self.text_layers(x_text, key_mask=t_mask)       # (L_t, B, D)
 
             # aggregation & prediction
-            features = []
-            for idx, (cur_a_mask, cur_t_mask) in enumerate(zip(a_mask, t_mask)):
-                cur_x_audio = x_audio[~cur_a_mask, idx, :].mean(dim=0).unsqueeze(0)
-                cur_x_text = x_text[~cur_t_mask, idx, :].mean(dim=0).unsqueeze(0)
-                features.append(torch.cat([cur_x_audio, cur_x_text], dim=1))
-            features = torch.cat(features, dim=0)
+            # padding을 제외한 위치의 평균을 batch 전체에 대해 한 번에 계산
+            features = torch.cat([self.masked_mean(x_audio, a_mask),
+                                  self.masked_mean(x_text, t_mask)], dim=1)
             out = features + self.fc2(self.dropout(F.relu(self.fc1(features))))
 
         elif self.only_audio:
@@ -299,6 +343,16 @@ class MultimodalTransformer(nn.Module, ABC):
 
         return self.out_layer(out), features
 
+    @staticmethod
+    def masked_mean(x, key_mask):
+        """
+        :param x: (L, B, D)
+        :param key_mask: (B, L), padding 위치가 True
+        :return: padding이 아닌 위치들의 평균 (B, D)
+        """
+        valid = (~key_mask).t().unsqueeze(-1).to(x.dtype)   # (L, B, 1)
+        return (x * valid).sum(dim=0) / valid.sum(dim=0)
+
     @staticmethod
     def get_network(**kwargs):
         return CrossmodalTransformer(
@@ -310,6 +364,7 @@ class MultimodalTransformer(nn.Module, ABC):
             emb_dropout=kwargs['emb_dropout'],
             res_dropout=kwargs['res_dropout'],
             attn_mask=kwargs['attn_mask'],
+            max_len=kwargs['max_len'],
             scale_embedding=True
         )
 
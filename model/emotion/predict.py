@@ -1,8 +1,8 @@
+import logging
+import threading
 import torch
-from pydub import AudioSegment
 import model.emotion.config as config
 import numpy as np
-import librosa
 import os
 import html
 import re
@@ -10,11 +10,17 @@ import json
 from transformers import BertConfig, BertModel
 import torch.nn as nn
 from model.emotion.model import MultimodalTransformer
-from torchaudio.transforms import MFCC
+from model.emotion.wav import read_wav
+from model.emotion.features import MFCCFeaturizer, StreamingMFCC
 from model.emotion.KoBERT.tokenization import BertTokenizer
+from model.device import DevicePolicy
+
+logger = logging.getLogger(__name__)
 
 class IAI_EMOTION:
-    def __init__(self):
+    def __init__(self, policy: DevicePolicy = None):
+        self.policy = policy if policy is not None else DevicePolicy.from_config()
+        self.device = self.policy.device
         self.only_audio = False
         self.only_text = False
         self.n_classes = 6
@@ -58,70 +64,110 @@ class IAI_EMOTION:
                 d_audio_orig=self.n_mfcc,
                 d_text_orig=768,  # BERT hidden size
                 d_model=self.d_model,
-                attn_mask=self.attn_mask
-            ).cuda()
-        self.model.load_state_dict(torch.load(config.model_path, map_location=torch.device("cuda:0")), strict=False)
+                attn_mask=self.attn_mask,
+                max_len=max(self.max_len_audio, self.max_len_bert)
+            )
+        self.model.load_state_dict(torch.load(config.model_path, map_location=self.policy.map_location()), strict=False)
+        self.model = self.policy.to(self.model)
         self.model.eval()
         self.model.zero_grad()
         self.bert_config_path = os.path.join(config.bert_path, 'config.json')
-        self.bert = BertModel(BertConfig(vocab_size=30797, **self.load_json(self.bert_config_path))).cuda()
+        self.bert = BertModel(BertConfig(vocab_size=30797, **self.load_json(self.bert_config_path)))
         self.bert_model_path = os.path.join(config.bert_path, 'model.bin')
-        self.bert.load_state_dict(self.clean_state_dict(torch.load(self.bert_model_path)), strict=False)
+        self.bert.load_state_dict(self.clean_state_dict(
+            torch.load(self.bert_model_path, map_location=self.policy.map_location())), strict=False)
+        self.bert = self.policy.to(self.bert)
         self.bert.eval()
         self.bert.zero_grad()
-        self.audio2mfcc = MFCC(
-            sample_rate = self.resample_rate,
-            n_mfcc = self.n_mfcc,
-            log_mels = False,
-            melkwargs = {'n_fft': self.n_fft_size}
-        ).cuda()
-    # noinspection PyMethodMayBeStatic
+        self.audio2mfcc = self.policy.to(MFCCFeaturizer(
+            sample_rate=self.sample_rate,
+            resample_rate=self.resample_rate,
+            n_mfcc=self.n_mfcc,
+            n_fft_size=self.n_fft_size,
+            max_len=self.max_len_audio
+        ))
+
+        # warm_up()이 끝나야 ready가 True가 됩니다.
+        self.ready = False
+        self.error = None
+        self._lock = threading.Lock()
+
+    def warm_up(self, text='안녕하세요', wav_file=config.wav_file):
+        """
+        샘플 입력으로 한 번 추론해서 CUDA 커널, 메모리 할당 등을 미리 끝내둡니다.
+        엔진 생성 시 한 번만 호출하면 이후 턴에서는 forward 연산만 수행합니다.
+
+        :param text: 워밍업용 텍스트
+        :param wav_file: 워밍업용 음성 파일
+        :return: 준비 완료 여부
+        """
+        with self._lock:
+            try:
+                self.predict(text, wav_file)
+                self.ready, self.error = True, None
+            except Exception as e:
+                logger.exception('감정 인식기 워밍업 실패')
+                self.ready, self.error = False, repr(e)
+        return self.ready
+
+    def health(self) -> dict:
+        """
+        감정 인식기의 상태(준비 여부, 마지막 에러)를 반환합니다.
+        """
+        return {'ready': self.ready, 'error': self.error}
+
     def extract_audio_array(self, wav_file):
-        audio = AudioSegment.from_wav(wav_file)
-        audio = audio.set_channels(1)
-        audio = audio.get_array_of_samples()
+        """
+        wav 파일 경로 또는 메모리 버퍼(bytes, BytesIO)를 mono float32 배열로 읽습니다.
+        stream()으로 미리 feature를 계산 중인 StreamingMFCC는 그대로 반환합니다.
+        MFCC 추출기는 sample_rate(48kHz) 입력 기준으로 resample하므로 다른 sample rate의 wav는 받지 않습니다.
+        """
+        if isinstance(wav_file, StreamingMFCC):
+            return wav_file
 
-        return np.array(audio).astype(np.float32)
+        audio, sample_rate = read_wav(wav_file)
+        self.check_sample_rate(sample_rate)
+        return audio
 
-    # noinspection PyMethodMayBeStatic
-    def _trim(self, audio):
-        left, right = None, None
-        for idx in range(len(audio)):
-            if np.float32(0) != np.float32(audio[idx]):
-                left = idx
-                break
-        for idx in reversed(range(len(audio))):
-            if np.float32(0) != np.float32(audio[idx]):
-                right = idx
-                break
-        return audio[left:right + 1]
+    def check_sample_rate(self, sample_rate: int):
+        """
+        :param sample_rate: 입력 wav의 sample rate (다르면 예외)
+        """
+        if sample_rate != self.sample_rate:
+            raise Exception('감정 인식기는 {}Hz wav만 지원합니다. : {}Hz'.format(self.sample_rate, sample_rate))
 
-    def pad_with_mfcc(self, wav_file):
-        max_len = self.max_len_audio
-        audio_array = torch.zeros(len([wav_file]), self.n_mfcc, max_len).fill_(float('-inf'))
-        for idx, audio in enumerate([wav_file]):
-            # resample and extract mfcc
-            audio = librosa.core.resample(audio, self.sample_rate, self.resample_rate)
-            mfcc = self.audio2mfcc(torch.tensor(self._trim(audio)).cuda())
+    def stream(self) -> StreamingMFCC:
+        """
+        음성 chunk를 받는 대로 MFCC를 계산해두는 streaming 추출기를 만듭니다.
+        chunk를 feed()로 넣고, 다 넣은 추출기를 wav_file 대신 predict/predict_batch에 넘기면 됩니다.
+        """
+        return self.audio2mfcc.stream()
 
-            # normalize
-            cur_mean, cur_std = mfcc.mean(dim=0), mfcc.std(dim=0)
-            mfcc = (mfcc - cur_mean) / cur_std
+    def pad_with_mfcc(self, wav_file):
+        """
+        음성 배열 하나 또는 리스트(batch)를 한 번에 resample, MFCC 추출해서 padding 합니다.
 
-            # save the extracted mfcc
-            cur_len = min(mfcc.shape[1], max_len)
-            audio_array[idx, :, :cur_len] = mfcc[:, :cur_len]
+        :param wav_file: extract_audio_array로 읽은 음성 배열(또는 StreamingMFCC) 또는 그 리스트
+        :return: MFCC (batch_size, max_len_audio, n_mfcc), key mask (padding 위치가 True)
+        """
+        audios = wav_file if isinstance(wav_file, list) else [wav_file]
+        streams = {idx: audio for idx, audio in enumerate(audios) if isinstance(audio, StreamingMFCC)}
 
-        # (batch_size, n_mfcc, seq_len) -> (batch_size, seq_len, n_mfcc)
-        padded = audio_array.transpose(2, 1)
+        if len(streams) == 0:
+            padded, lengths = self.audio2mfcc(audios)
+        else:
+            # streaming으로 미리 계산된 feature는 finish()로 받고, 나머지 음성만 batch로 계산
+            padded = torch.zeros(len(audios), self.max_len_audio, self.n_mfcc, device=self.device)
+            lengths = torch.zeros(len(audios), dtype=torch.long, device=self.device)
+            clips = [idx for idx in range(len(audios)) if idx not in streams]
+            if len(clips) > 0:
+                padded[clips], lengths[clips] = self.audio2mfcc([audios[idx] for idx in clips])
+            for idx, stream in streams.items():
+                feature, frames = stream.finish()
+                padded[idx], lengths[idx] = feature[0], frames[0]
 
         # get key mask
-        key_mask = padded[:, :, 0]
-        key_mask = key_mask.masked_fill(key_mask != float('-inf'), 0)
-        key_mask = key_mask.masked_fill(key_mask == float('-inf'), 1).bool()
-
-        # -inf -> 0.0
-        padded = padded.masked_fill(padded == float('-inf'), 0.)
+        key_mask = torch.arange(self.max_len_audio, device=lengths.device).unsqueeze(0) >= lengths.unsqueeze(1)
         return padded, key_mask
 
     # noinspection PyMethodMayBeStatic
@@ -170,28 +216,42 @@ class IAI_EMOTION:
         return self.tokenizer.tokenize(tokens)
 
     def predict(self, text, wav_file):
-        audio = self.extract_audio_array(wav_file)
-        with torch.no_grad():
+        return self.predict_batch([text], [wav_file])[0]
+
+    def predict_batch(self, texts: list, wav_files: list) -> list:
+        """
+        여러 (문장, 음성) 쌍을 하나의 padded batch로 묶어 한 번의 forward로 예측합니다.
+        텍스트는 max_len_bert, 음성 MFCC는 max_len_audio로 padding됩니다.
+
+        :param texts: 사용자 input text 리스트
+        :param wav_files: 사용자 음성 파일 리스트
+        :return: (emotion_pred, emotion_prob, max_emotion_prob) 튜플의 리스트
+        """
+
+        audios = [self.extract_audio_array(wav_file) for wav_file in wav_files]
+        with self.policy.inference():
             max_len = self.max_len_bert
             tokenize_text = []
 
-            tokens = self.normalize_string(text)
-            tokens = self.tokenize(tokens)
-            tokenize_text.append(self.tokenizer.convert_tokens_to_ids(tokens))
-            input_ids = torch.tensor([self.pad_with_text(sent, max_len) for sent in tokenize_text]).cuda()
-            text_masks = torch.ones_like(input_ids).masked_fill(input_ids == self.pad_idx, 0).bool().cuda()
+            for text in texts:
+                tokens = self.normalize_string(text)
+                tokens = self.tokenize(tokens)
+                tokenize_text.append(self.tokenizer.convert_tokens_to_ids(tokens))
+            input_ids = torch.tensor([self.pad_with_text(sent, max_len) for sent in tokenize_text]).to(self.device)
+            text_masks = torch.ones_like(input_ids).masked_fill(input_ids == self.pad_idx, 0).bool()
             text_emb = self.bert(input_ids, text_masks)['last_hidden_state']
-            audio_emb, audio_mask = self.pad_with_mfcc(audio)
-            audio_emb = audio_emb.cuda()
-            audio_mask = audio_mask.cuda()
+            audio_emb, audio_mask = self.pad_with_mfcc(audios)
+            audio_emb = audio_emb.to(self.device)
+            audio_mask = audio_mask.to(self.device)
             logit, hidden = self.model(audio_emb, text_emb, audio_mask, torch.logical_not(text_masks))
-            softmax_layer = nn.Softmax(-1)
-            softmax_result = softmax_layer(logit)
-            max_emotion = max(t[0] for t in softmax_result)
-            y_pred = logit.max(dim=1)[1]
-            emotion_pred = y_pred.detach().cpu().numpy()[0]
-            emotion_prob = softmax_result.detach().cpu().numpy()
-            #max_emotion_prob = max_emotion.detach().cpu().numpy()
-            max_emotion_prob = emotion_prob[0].max()
-
-        return emotion_pred, emotion_prob, max_emotion_prob
+            return self._decode(logit)
+
+    # noinspection PyMethodMayBeStatic
+    def _decode(self, logit) -> list:
+        softmax_layer = nn.Softmax(-1)
+        softmax_result = softmax_layer(logit)
+        y_pred = logit.max(dim=1)[1].detach().cpu().numpy()
+        emotion_prob = softmax_result.detach().float().cpu().numpy()
+
+        # 문장별로 (1, n_classes) 모양의 확률을 유지해서 기존 predict 반환값과 맞춤
+        return [(y_pred[i], emotion_prob[i:i + 1], emotion_prob[i].max()) for i in range(len(y_pred))]
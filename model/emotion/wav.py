@@ -0,0 +1,191 @@
+import io
+import struct
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _parse_header(buffer, partial: bool = False):
+    """
+    RIFF/WAVE 헤더를 읽어서 fmt 정보와 data chunk 위치를 찾습니다.
+
+    :param buffer: wav 파일 전체 또는 앞부분 (bytes-like)
+    :param partial: 파일 앞부분만 받은 상태인지 여부 (True면 헤더가 덜 왔을 때 예외 대신 None 반환)
+    :return: (format_tag, channels, sample_rate, sample_width, data_offset, data_size)
+    """
+
+    if partial and len(buffer) < 12:
+        return None
+    if len(buffer) < 12 or bytes(buffer[:4]) != b'RIFF' or bytes(buffer[8:12]) != b'WAVE':
+        raise Exception('wav(RIFF/WAVE) 파일이 아닙니다.')
+
+    fmt, offset = None, 12
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', buffer, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id != b'data' and partial and body + chunk_size > len(buffer):
+            return None
+
+        if chunk_id == b'fmt ':
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', buffer, body)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                format_tag = struct.unpack_from('<H', buffer, body + 24)[0]  # SubFormat GUID 앞 2바이트
+            fmt = (format_tag, channels, sample_rate, (bits + 7) // 8)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise Exception('wav 파일에 fmt chunk가 data chunk보다 앞에 없습니다.')
+            if partial:
+                return fmt + (body, chunk_size)
+            # 녹음 중 끊긴 파일은 chunk 크기가 실제보다 클 수 있으므로 남은 길이로 자름
+            return fmt + (body, min(chunk_size, len(buffer) - body))
+
+        offset = body + chunk_size + (chunk_size & 1)  # chunk는 2바이트 단위로 정렬
+
+    if partial:
+        return None
+    raise Exception('wav 파일에 data chunk가 없습니다.')
+
+
+def _to_samples(raw: np.ndarray, channels: int, sample_width: int) -> np.ndarray:
+    """
+    PCM 바이트를 (frames, channels) 정수 샘플로 바꿉니다. (pydub get_array_of_samples와 같은 값)
+    """
+
+    frame_bytes = channels * sample_width
+    raw = raw[:len(raw) - len(raw) % frame_bytes]
+
+    if sample_width == 1:
+        samples = raw.astype(np.int16) - 128  # 8bit wav는 unsigned
+    elif sample_width == 2:
+        samples = raw.view('<i2')
+    elif sample_width == 3:
+        # 24bit는 하위 바이트를 0으로 채워 32bit로 (pydub과 동일하게 << 8 된 값)
+        padded = np.zeros((len(raw) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = raw.reshape(-1, 3)
+        samples = padded.reshape(-1).view('<i4')
+    elif sample_width == 4:
+        samples = raw.view('<i4')
+    else:
+        raise Exception('지원하지 않는 sample width입니다. : {}'.format(sample_width))
+
+    return samples.reshape(-1, channels)
+
+
+def _from_pydub(source) -> tuple:
+    """
+    PCM이 아닌 wav(float, ADPCM 등)는 pydub으로 읽습니다.
+    """
+
+    from pydub import AudioSegment
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(bytes(source))
+    elif hasattr(source, 'seek'):
+        source.seek(0)
+
+    audio = AudioSegment.from_wav(source).set_channels(1)
+    return np.array(audio.get_array_of_samples()).astype(np.float32), audio.frame_rate
+
+
+def read_wav(source) -> tuple:
+    """
+    wav를 읽어서 mono float32 샘플 배열로 반환합니다.
+    파일 경로는 memory map으로 열어서 PCM 데이터를 바로 변환하고,
+    HTTP 요청에서 받은 bytes나 BytesIO 같은 메모리 버퍼는 복사 없이 그대로 읽습니다.
+
+    :param source: wav 파일 경로, bytes-like 또는 파일 객체
+    :return: (샘플 배열 (frames,), sample rate)
+    """
+
+    if isinstance(source, str) or hasattr(source, '__fspath__'):
+        buffer = np.memmap(source, dtype=np.uint8, mode='r')
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = np.frombuffer(source, dtype=np.uint8)
+    elif isinstance(source, io.BytesIO):
+        buffer = np.frombuffer(source.getbuffer(), dtype=np.uint8)
+    else:
+        buffer = np.frombuffer(source.read(), dtype=np.uint8)
+
+    format_tag, channels, sample_rate, sample_width, data_offset, data_size = _parse_header(buffer)
+    if format_tag != WAVE_FORMAT_PCM:
+        return _from_pydub(source)
+
+    samples = _to_samples(buffer[data_offset:data_offset + data_size], channels, sample_width)
+    return _to_mono(samples), sample_rate
+
+
+def _to_mono(samples: np.ndarray) -> np.ndarray:
+    if samples.shape[1] == 1:
+        return samples[:, 0].astype(np.float32)
+
+    # 여러 채널은 평균내서 mono로 (pydub set_channels(1)과 같이 내림해서 정수로)
+    # 32bit 샘플은 float32로 더하면 정밀도가 모자라므로 float64로 평균
+    mono = samples.astype(np.float64).mean(axis=1)
+    return np.floor(mono).astype(np.float32)
+
+
+class WavStream:
+
+    def __init__(self):
+        """
+        조각조각 도착하는 wav 바이트를 받는 대로 mono float32 샘플로 바꿔주는 reader입니다.
+        헤더가 다 올 때까지 모아두었다가, 이후에는 frame 단위로 끊어서 샘플을 돌려줍니다.
+        """
+
+        self.buffer = bytearray()
+        self.header = None  # (format_tag, channels, sample_rate, sample_width, data_offset, data_size)
+        self.remaining = 0  # data chunk에서 아직 받지 않은 바이트 수
+
+    @property
+    def sample_rate(self):
+        return self.header[2] if self.header is not None else None
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """
+        :param data: 새로 도착한 wav 바이트
+        :return: 이번에 완성된 frame들의 mono 샘플 배열 (헤더가 덜 왔으면 빈 배열)
+        """
+
+        self.buffer += data
+
+        if self.header is None:
+            header = _parse_header(self.buffer, partial=True)
+            if header is None:
+                return np.zeros(0, dtype=np.float32)
+            if header[0] != WAVE_FORMAT_PCM:
+                raise Exception('streaming은 PCM wav만 지원합니다. : format {}'.format(header[0]))
+
+            self.header = header
+            self.remaining = header[5]
+            del self.buffer[:header[4]]
+
+        channels, sample_width = self.header[1], self.header[3]
+        frame_bytes = channels * sample_width
+        size = min(len(self.buffer), self.remaining)
+        size -= size % frame_bytes
+        if size == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        samples = _to_samples(np.frombuffer(bytes(self.buffer[:size]), dtype=np.uint8), channels, sample_width)
+        del self.buffer[:size]
+        self.remaining -= size
+        return _to_mono(samples)
+
+
+def trim_silence(audio: np.ndarray) -> np.ndarray:
+    """
+    앞뒤의 값이 0인 샘플을 잘라냅니다.
+
+    :param audio: 샘플 배열
+    :return: 처음과 마지막 0이 아닌 샘플 사이의 배열 (전부 0이면 빈 배열)
+    """
+
+    nonzero = np.flatnonzero(audio)
+    if len(nonzero) == 0:
+        return audio[:0]
+
+    return audio[nonzero[0]:nonzero[-1] + 1]
@@ -3,13 +3,18 @@ import numpy as np
 
 import torch
 
+from model.device import DevicePolicy
 from model.intent_entity.utils import MODEL_CLASSES, get_intent_labels, get_slot_labels, load_tokenizer
 
 
 class JointIntEnt:
-    def __init__(self, model_dir, no_cuda=False):
-        self.args = torch.load(os.path.join(model_dir, 'training_args.bin'), map_location=torch.device("cuda:0"))
-        self.device = "cuda" if torch.cuda.is_available() and not no_cuda else "cpu"
+    def __init__(self, model_dir, no_cuda=False, policy: DevicePolicy = None):
+        if policy is None:
+            policy = DevicePolicy.from_config()
+        # no_cuda=True면 넘겨받은 정책이 GPU여도 CPU에서 실행
+        self.policy = policy.cpu() if no_cuda else policy
+        self.args = torch.load(os.path.join(model_dir, 'training_args.bin'), map_location='cpu')
+        self.device = self.policy.device
 
         self.intent_label_lst = get_intent_labels(self.args)
         self.slot_label_lst = get_slot_labels(self.args)
@@ -19,7 +24,8 @@ class JointIntEnt:
             intent_label_lst=self.intent_label_lst,
             slot_label_lst=self.slot_label_lst
         )
-        self.model.to(self.device)
+        self.model = self.policy.to(self.model)
+        self.model.eval()
         self.tokenizer = load_tokenizer(self.args)
 
     def _tokenize(self, text: str):
@@ -72,49 +78,50 @@ class JointIntEnt:
         return ret
 
     def __call__(self, inp):
-        self.model.eval()
+        return self.predict_batch([inp])[0]
+
+    def predict_batch(self, inps: list) -> list:
+        """
+        여러 문장을 하나의 padded batch로 묶어 한 번의 forward로 예측합니다.
+        (모든 문장이 max_seq_len으로 padding되므로 그대로 이어붙일 수 있음)
 
-        slot_preds = None
-        all_slot_label_mask = None
-        with torch.no_grad():
-            inputs = self._tokenize(inp)
+        :param inps: 사용자 input text 리스트
+        :return: (intent, slot 리스트) 튜플의 리스트
+        """
+
+        with self.policy.inference():
+            features = [self._tokenize(inp) for inp in inps]
+            inputs = {key: torch.cat([feature[key] for feature in features], dim=0) for key in features[0]}
             slot_label_mask = inputs.pop("slot_label_mask")
             inputs.update({"intent_label_ids": None, "slot_labels_ids": None})
             outputs = self.model(**inputs)
             _, (intent_logits, slot_logits) = outputs[:2]
+            return self._decode(intent_logits, slot_logits, slot_label_mask)
+
+    def _decode(self, intent_logits, slot_logits, slot_label_mask) -> list:
+        # Intent Prediction
+        intent_preds = intent_logits.detach().float().cpu().numpy()
+        intent_preds = np.argmax(intent_preds, axis=1)
 
-            # Intent Prediction
-            intent_preds = intent_logits.detach().cpu().numpy()
-            intent_preds = np.argmax(intent_preds, axis=1)[0]
-
-            # Slot Prediction
-            if slot_preds is None:
-                if self.args.use_crf:
-                    # decode() in `torchcrf` returns list with best index directly
-                    slot_preds = np.array(self.model.crf.decode(slot_logits))
-                else:
-                    slot_preds = slot_logits.detach().cpu().numpy()
-                all_slot_label_mask = slot_label_mask.detach().cpu().numpy()
-            else:
-                if self.args.use_crf:
-                    slot_preds = np.append(slot_preds, np.array(self.model.crf.decode(slot_logits)), axis=0)
-                else:
-                    slot_preds = np.append(slot_preds, slot_logits.detach().cpu().numpy(), axis=0)
-                all_slot_label_mask = np.append(all_slot_label_mask, slot_label_mask.detach().cpu().numpy(), axis=0)
-
-        if not self.args.use_crf:
-            slot_preds = np.argmax(slot_preds, axis=2)
+        # Slot Prediction
+        if self.args.use_crf:
+            # decode() in `torchcrf` returns list with best index directly
+            slot_preds = np.array(self.model.crf.decode(slot_logits))
+        else:
+            slot_preds = np.argmax(slot_logits.detach().float().cpu().numpy(), axis=2)
+        all_slot_label_mask = slot_label_mask.detach().cpu().numpy()
 
         slot_label_map = {i: label for i, label in enumerate(self.slot_label_lst)}
 
-        slot_preds_list = []
+        results = []
         for i in range(slot_preds.shape[0]):
+            slot_preds_list = []
             for j in range(slot_preds.shape[1]):
                 if all_slot_label_mask[i, j] != self.args.ignore_index:
                     slot_preds_list.append(slot_label_map[slot_preds[i][j]])
+            results.append((self.intent_label_lst[intent_preds[i]], slot_preds_list))
 
-        #return self.intent_label_lst[intent_preds], slot_preds_list
-        return self.intent_label_lst[intent_preds], slot_preds_list
+        return results
 
 
 if __name__ == '__main__':
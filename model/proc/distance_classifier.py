@@ -50,30 +50,41 @@ class DistanceClassifier(IntentClassifier):
         """
         # scenariomanager에서 intent_classifier > predict 들어왔을 때 ㄱㅊ, but prep는 정의되지 않는다고 나옴
 
-        self._load_model()
-        self.model.eval()
+        return self.predict_batch(sequence, calibrate)[0]
+
+    def predict_batch(self, sequences: Tensor, calibrate: bool = False) -> list:
+        """
+        여러 입력 시퀀스를 한 번의 forward와 한 번의 KNN 검색으로 inference합니다.
+
+        :param sequences: 패드 시퀀싱된 입력 시퀀스들 (N, max_len, vector_size)
+        :param calibrate: Calibrate 모드 여부
+        :return: 입력별 분류 결과 (클래스, fallback이면 "FALLBACK") 리스트
+        """
+
+        self._prepare_inference()
+
+        with torch.no_grad():
+            _, feats = self._forward(sequences.to(self.device))
 
-        _, feats = self._forward(sequence)
         predict, distance = self.distance_estimator.predict(feats)
 
         if calibrate:
             self._calibrate_msg(distance)
 
         if self.distance_fallback_detection_criteria == 'auto':
-            if self.fallback_detector.predict(distance) == 0:
-                return list(self.label_dict)[predict[0]]
+            in_dist = np.asarray(self.fallback_detector.predict(distance)).ravel() == 0
 
         elif self.distance_fallback_detection_criteria == 'mean':
-            if distance.mean() < self.distance_fallback_detection_threshold:
-                return list(self.label_dict)[predict[0]]
+            in_dist = distance.mean(axis=1) < self.distance_fallback_detection_threshold
 
         elif self.distance_fallback_detection_criteria == 'min':
-            if distance.min() < self.distance_fallback_detection_threshold:
-                return list(self.label_dict)[predict[0]]
+            in_dist = distance.min(axis=1) < self.distance_fallback_detection_threshold
         else:
             raise Exception("잘못된 dist_criteria입니다. [auto, mean, min]중 선택하세요")
 
-        return "FALLBACK"
+        labels = list(self.label_dict)
+        return [labels[p] if ok else "FALLBACK"
+                for p, ok in zip(predict, in_dist)]
 
     def _train_epoch(self, epoch: int) -> tuple:
         """
@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 from sklearn.base import BaseEstimator
 from sklearn.model_selection import GridSearchCV
@@ -6,6 +8,7 @@ from sklearn.utils._testing import ignore_warnings
 from torch import Tensor
 
 from decorators.decorators import intent
+from model.proc.feature_index import FeatureIndex
 from model.proc.sklearn_processor import SklearnProcessor
 
 
@@ -22,6 +25,7 @@ class DistanceEstimator(SklearnProcessor):
 
         self.model = KNeighborsClassifier(n_neighbors=self.num_neighbors)
         self.grid_search = grid_search
+        self.index = None  # 추론용 KNN 인덱스 (학습된 모델의 feature 행렬)
         super().__init__(self.model)
 
     @ignore_warnings(category=Warning)
@@ -78,6 +82,7 @@ class DistanceEstimator(SklearnProcessor):
         else:
             self.model.fit(feats, label.ravel())
 
+        self.index = FeatureIndex.from_estimator(self.model)
         self._save_model()
 
     @ignore_warnings(category=Warning)
@@ -89,9 +94,39 @@ class DistanceEstimator(SklearnProcessor):
         :return: 분류결과와 가장 가까운 K개의 샘플과의 거리
         """
 
-        predict = self.model.predict(feats)
-        distance, _ = self.model.kneighbors(feats)
-        return predict, distance
+        if self.index is None:
+            self.index = FeatureIndex.from_estimator(self.model)
+
+        return self.index.search(feats)
+        # 분류결과와 K개 샘플과의 거리를 한 번의 검색으로 계산
+
+    @ignore_warnings(category=Warning)
+    def _load_model(self):
+        """
+        저장된 KNN 인덱스를 불러옵니다.
+        인덱스 파일이 없으면(이전 버전으로 학습한 경우) 저장된 sklearn 모델에서 만들어 저장합니다.
+        """
+
+        if self.model_loaded:
+            return
+
+        if os.path.exists(self.model_file + '.index'):
+            self.index = FeatureIndex.load(self.model_file + '.index')
+            self.model_loaded = True
+            return
+
+        super()._load_model()
+        self.index = FeatureIndex.from_estimator(self.model)
+        self.index.save(self.model_file + '.index')
+
+    @ignore_warnings(category=Warning)
+    def _save_model(self):
+        """
+        sklearn 모델과 추론용 KNN 인덱스를 함께 저장합니다.
+        """
+
+        super()._save_model()
+        self.index.save(self.model_file + '.index')
 
     @ignore_warnings(category=Warning)
     def _grid_search(self, feats: np.ndarray, label: np.ndarray) -> BaseEstimator:
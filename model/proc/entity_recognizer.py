@@ -47,21 +47,29 @@ class EntityRecognizer(TorchProcessor):
         :return: 분류 결과 (엔티티 시퀀스) 리턴
         """
 
-        self._load_model()
-        self.model.eval()
+        return self.predict_batch(sequence)[0]
+
+    def predict_batch(self, sequences: Tensor, lengths: Tensor = None) -> list:
+        """
+        여러 입력 시퀀스를 한 번의 forward로 inference합니다.
+
+        :param sequences: 패드 시퀀싱된 입력 시퀀스들 (N, max_len, vector_size)
+        :param lengths: 패딩을 제외한 입력의 길이 (없으면 PAD가 아닌 벡터 수로 계산)
+        :return: 입력별 분류 결과 (엔티티 시퀀스) 리스트
+        """
+
+        self._prepare_inference()
 
-        # 만약 i가 pad라면 i값에서 PAD를 빼면 전부 0이 되고
-        # 그 상태에서 입력 전체에 1을 더하면, pad토큰은 [1, 1, 1, ...]이 됩
-        # all()로 체크하면 pad만 True가 나옴. (모두 1이여야 True)
-        # 이 때 False 갯수를 세면 pad가 아닌 부분의 길이가 됨.
-        length = [all(map(int, (i - self.PAD + 1).tolist()))
-                  for i in sequence.squeeze()].count(False)
+        if lengths is None:
+            # 모든 원소가 PAD인 벡터가 pad이므로, pad가 아닌 벡터 수가 문장 길이
+            lengths = (sequences != self.PAD).any(dim=2).sum(dim=1)
 
-        predicts = self._forward(sequence).squeeze().t()
-        predicts = [list(self.label_dict.keys())[i.item()]  # 라벨 딕셔너리에서 i번째 원소를 담음
-                    for i in predicts]  # 분류 예측결과에서 i를 하나씩 꺼내서
+        with torch.no_grad():
+            predicts = self._forward(sequences.to(self.device)).cpu().tolist()
 
-        return predicts[:length]
+        labels = list(self.label_dict.keys())
+        return [[labels[i] for i in predict[:length]]  # 라벨 딕셔너리에서 i번째 원소를 담음
+                for predict, length in zip(predicts, lengths.tolist())]
 
     def _train_epoch(self, epoch: int) -> tuple:
         """
@@ -75,6 +75,17 @@ class FallbackDetector(SklearnProcessor):
         predicts = self._test_epoch(feats)
         return predicts
 
+    @ignore_warnings(category=Warning)
+    def predict_batch(self, feats) -> list:
+        """
+        여러 입력(입력별 K개 샘플과의 거리)에 한 번에 inference합니다.
+
+        :param feats: 입력별 피쳐 (N, K)
+        :return: 입력별 Fallback 여부 리스트 (1이면 fallback)
+        """
+
+        return np.asarray(self.predict(feats)).ravel().tolist()
+
     @ignore_warnings(category=Warning)
     def _train_epoch(self, feats: np.ndarray, label: np.ndarray):
         """
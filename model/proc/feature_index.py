@@ -0,0 +1,140 @@
+import json
+import os
+
+import numpy as np
+from sklearn.neighbors import KNeighborsClassifier
+
+
+class FeatureIndex:
+    magic = b'FIDX0001'
+
+    def __init__(self, feats: np.ndarray, labels: np.ndarray, classes: np.ndarray,
+                 n_neighbors: int, p: int = 2, weights: str = 'uniform'):
+        """
+        학습 데이터의 feature를 연속된 float32 행렬로 들고 있다가
+        행렬곱으로 거리를 한 번에 계산해서 가장 가까운 K개의 샘플을 찾는 정확한(exact) KNN 인덱스입니다.
+        KNeighborsClassifier의 predict + kneighbors(트리 검색 2번)를 한 번의 계산으로 대신합니다.
+
+        :param feats: 학습 데이터 features (n_samples, dim)
+        :param labels: 학습 데이터 라벨 (classes의 index, n_samples)
+        :param classes: 라벨 index → 실제 클래스 값
+        :param n_neighbors: 검색할 이웃 수 (K)
+        :param p: 거리 종류 (1 : 맨하튼, 2 : 유클리디언)
+        :param weights: 투표 가중치 (uniform or distance)
+        """
+
+        self.feats = np.ascontiguousarray(feats, dtype=np.float32)
+        self.labels = np.ascontiguousarray(labels, dtype=np.int64)
+        self.classes = np.asarray(classes)
+        self.n_neighbors = min(int(n_neighbors), len(self.feats))
+        self.p = int(p)
+        self.weights = weights
+        self.sq_norms = (self.feats ** 2).sum(axis=1)
+
+    @classmethod
+    def from_estimator(cls, model: KNeighborsClassifier) -> 'FeatureIndex':
+        """
+        학습된 KNeighborsClassifier로부터 인덱스를 만듭니다.
+
+        :param model: 학습된 sklearn KNN 모델
+        :return: 같은 학습 데이터, K, 거리, 가중치를 가진 인덱스
+        """
+
+        if model.metric != 'minkowski' or model.p not in [1, 2] or not isinstance(model.weights, str):
+            raise Exception('FeatureIndex는 minkowski(p=1, 2) 거리와 uniform/distance 가중치만 지원합니다.')
+
+        return cls(model._fit_X, model._y, model.classes_, model.n_neighbors, model.p, model.weights)
+
+    def search(self, queries: np.ndarray, batch_size: int = 1024) -> tuple:
+        """
+        입력 features마다 가장 가까운 K개의 샘플을 찾아서 분류결과와 거리를 함께 반환합니다.
+
+        :param queries: 입력 features (n_queries, dim)
+        :param batch_size: 한 번에 거리 행렬을 계산할 입력 수
+        :return: 분류결과 (n_queries,), 가장 가까운 K개의 샘플과의 거리 (n_queries, K, 오름차순)
+        """
+
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.feats.shape[1])
+        predicts, distances = [], []
+
+        for start in range(0, len(queries), batch_size):
+            dist = self._distance(queries[start:start + batch_size])
+
+            # 전체 정렬 대신 K개만 골라낸 뒤 그 안에서만 정렬
+            k = self.n_neighbors
+            top = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < dist.shape[1] \
+                else np.tile(np.arange(dist.shape[1]), (len(dist), 1))
+            top_dist = np.take_along_axis(dist, top, axis=1)
+            order = np.argsort(top_dist, axis=1, kind='stable')
+            top, top_dist = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_dist, order, axis=1)
+
+            predicts.append(self._vote(self.labels[top], top_dist))
+            distances.append(top_dist)
+
+        return np.concatenate(predicts), np.concatenate(distances)
+
+    def _distance(self, queries: np.ndarray) -> np.ndarray:
+        if self.p == 2:
+            # ||q - x||^2 = ||q||^2 - 2 q·x + ||x||^2
+            sq = (queries ** 2).sum(axis=1, keepdims=True) - 2. * queries @ self.feats.T + self.sq_norms
+            return np.sqrt(np.maximum(sq, 0.))
+
+        return np.abs(queries[:, None, :] - self.feats[None, :, :]).sum(axis=2)
+
+    def _vote(self, neighbor_labels: np.ndarray, neighbor_dist: np.ndarray) -> np.ndarray:
+        """
+        이웃들의 라벨로 투표합니다. (동점이면 index가 작은 클래스, sklearn과 동일)
+        """
+
+        if self.weights == 'distance':
+            with np.errstate(divide='ignore'):
+                weight = 1. / neighbor_dist
+            exact = np.isinf(weight)
+            weight[exact.any(axis=1)] = exact[exact.any(axis=1)]
+            # 거리가 0인 샘플이 있으면 그 샘플들만 투표
+        else:
+            weight = np.ones_like(neighbor_dist)
+
+        votes = np.zeros((len(neighbor_labels), len(self.classes)), dtype=np.float64)
+        np.add.at(votes, (np.arange(len(neighbor_labels))[:, None], neighbor_labels), weight)
+        return self.classes[votes.argmax(axis=1)]
+
+    def save(self, path: str):
+        """
+        인덱스를 하나의 binary 파일로 저장합니다.
+        [magic][header 길이(8바이트)][json header][features(float32)][labels(int64)]
+        """
+
+        header = json.dumps({
+            'n': int(self.feats.shape[0]), 'dim': int(self.feats.shape[1]),
+            'classes': self.classes.tolist(), 'n_neighbors': self.n_neighbors,
+            'p': self.p, 'weights': self.weights
+        }, ensure_ascii=False).encode('utf-8')
+
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(self.magic)
+            f.write(np.array([len(header)], dtype='<i8').tobytes())
+            f.write(header)
+            f.write(self.feats.astype('<f4').tobytes())
+            f.write(self.labels.astype('<i8').tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'FeatureIndex':
+        """
+        save로 저장한 binary 파일에서 인덱스를 불러옵니다.
+        """
+
+        with open(path, 'rb') as f:
+            if f.read(len(cls.magic)) != cls.magic:
+                raise Exception('FeatureIndex 파일이 아닙니다. : {}'.format(path))
+
+            header_len = int(np.frombuffer(f.read(8), dtype='<i8')[0])
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            n, dim = header['n'], header['dim']
+            feats = np.frombuffer(f.read(n * dim * 4), dtype='<f4').reshape(n, dim)
+            labels = np.frombuffer(f.read(n * 8), dtype='<i8')
+
+        return cls(feats, labels, np.array(header['classes']), header['n_neighbors'],
+                   header['p'], header['weights'])
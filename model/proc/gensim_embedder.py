@@ -32,6 +32,9 @@ class GensimEmbedder(BaseProcessor):
             logging=self._print
         )  # 학습 진행사항 출력 콜백
 
+        self.matrix, self.word2idx = None, None
+        # 단어 벡터를 모아둔 dense 행렬 (0번 행 : PAD, 1번 행 : OOV, 2번 행부터 vocab 순서)
+
     def fit(self, dataset: list):
         """
         데이터셋으로 Vocabulary를 생성하고
@@ -50,6 +53,7 @@ class GensimEmbedder(BaseProcessor):
         )
 
         self._save_model()
+        self.matrix, self.word2idx = None, None  # 새로 학습된 vocab으로 행렬을 다시 만듦
 
     def predict(self, sequence: str) -> Tensor:
         """
@@ -62,6 +66,31 @@ class GensimEmbedder(BaseProcessor):
         self._load_model()
         return self._forward(self.model, sequence)
 
+    def predict_batch(self, sequences: list) -> list:
+        """
+        여러 입력 시퀀스를 한 번의 index select로 임베딩합니다.
+
+        :param sequences: 입력 시퀀스 리스트
+        :return: 시퀀스별 임베딩 벡터 리스트
+        """
+
+        self._load_model()
+        flat = [word for sequence in sequences for word in sequence]
+        lengths = [len(sequence) for sequence in sequences]
+        return list(self._forward(self.model, flat).split(lengths, dim=0))
+
+    def lookup(self, sequence: list) -> list:
+        """
+        단어들을 dense 행렬의 행 번호로 바꿉니다. vocab에 없는 단어는 OOV 행(1)이 됩니다.
+
+        :param sequence: 입력 시퀀스
+        :return: 행 번호 리스트
+        """
+
+        self._load_model()
+        self._build_matrix(self.model)
+        return [self.word2idx.get(word, 1) for word in sequence]
+
     def _load_model(self):
         """
         저장된 모델을 불러옵니다.
@@ -84,18 +113,39 @@ class GensimEmbedder(BaseProcessor):
 
         self.model.save(self.model_file + '.gensim')
 
-    def _forward(self, model, sequence: str) -> Tensor:
-        sentence_vector = []
+    def _build_matrix(self, model):
+        """
+        gensim 모델의 단어 벡터들로 dense float32 행렬과 단어→행 번호 딕셔너리를 만듭니다.
+        0번 행은 PAD, 1번 행은 OOV로 예약되어 있습니다.
+
+        :param model: 학습된 gensim 모델
+        """
 
-        for word in sequence:
-            try:
-                word_vector = torch.tensor(model.wv[word])
-            except KeyError as _:
-                word_vector = torch.ones(self.vector_size) * self.OOV
+        if self.matrix is not None:
+            return
 
-            sentence_vector.append(word_vector.unsqueeze(dim=0))
+        words = model.wv.index2word if hasattr(model.wv, 'index2word') else model.wv.index_to_key
+        reserved = torch.stack([torch.ones(self.vector_size) * self.PAD,
+                                torch.ones(self.vector_size) * self.OOV])
 
-        return torch.cat(sentence_vector, dim=0)
+        vectors = torch.from_numpy(np.asarray(model.wv.vectors, dtype=np.float32))
+        self.matrix = torch.cat([reserved, vectors], dim=0)
+        self.word2idx = {word: i + 2 for i, word in enumerate(words)}
+
+    def _forward(self, model, sequence: str) -> Tensor:
+        self._build_matrix(model)
+        index = [self.word2idx.get(word, 1) for word in sequence]
+        sentence_vector = self.matrix.index_select(0, torch.tensor(index, dtype=torch.long))
+
+        for i, word in enumerate(sequence):
+            if index[i] == 1:
+                # vocab에 없는 단어도 FastText는 subword(n-gram)로 벡터를 만들 수 있음
+                try:
+                    sentence_vector[i] = torch.from_numpy(np.asarray(model.wv[word], dtype=np.float32))
+                except KeyError as _:
+                    pass  # 만들 수 없으면 OOV 벡터 유지
+
+        return sentence_vector
 
     class GensimLogger(CallbackAny2Vec):
 
@@ -120,6 +120,16 @@ class TorchProcessor(BaseProcessor):
 
         torch.save(self.model.state_dict(), self.model_file + '.pth')
 
+    def _prepare_inference(self):
+        """
+        추론 전에 저장된 모델을 불러오고 eval 모드로 바꿉니다.
+        이미 불러온 eval 모드 모델이면 아무것도 하지 않습니다.
+        """
+
+        if not self.model_loaded or self.model.training:
+            self._load_model()
+            self.model.eval()
+
     def __initialize_weights(self, model: nn.Module):
         """
         model의 가중치를 초기화합니다.
@@ -0,0 +1,140 @@
+import threading
+from typing import Any, Callable
+
+import torch
+
+
+class ModelRegistry:
+
+    def __init__(self):
+        """
+        프로세스 전체에서 무거운 모델(체크포인트)을 한 번만 로드해서 공유하는 레지스트리입니다.
+        (모델 경로, 디바이스, dtype)을 key로 모델 핸들을 보관하고,
+        acquire/release로 참조 횟수를 관리합니다.
+        """
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path: str, device: Any = 'cpu', dtype: Any = torch.float32) -> tuple:
+        """
+        레지스트리 key를 만듭니다.
+
+        :param path: 모델(체크포인트) 경로
+        :param device: 모델이 올라갈 디바이스
+        :param dtype: 모델 파라미터 dtype
+        :return: (path, device, dtype) 문자열 튜플
+        """
+
+        return str(path), str(device), str(dtype)
+
+    def acquire(self, path: str, loader: Callable[[], Any],
+                device: Any = 'cpu', dtype: Any = torch.float32) -> Any:
+        """
+        모델 핸들을 빌려옵니다. 처음 요청된 key라면 loader로 로드하고,
+        이미 로드된 key라면 같은 핸들을 그대로 반환합니다.
+
+        :param path: 모델(체크포인트) 경로
+        :param loader: 모델을 로드하는 함수 (인자 없음)
+        :param device: 모델이 올라갈 디바이스
+        :param dtype: 모델 파라미터 dtype
+        :return: 공유 모델 핸들 (읽기 전용으로만 사용해야 합니다)
+        """
+
+        key = self.make_key(path, device, dtype)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'handle': None, 'refs': 0, 'lock': threading.Lock()}
+                self._entries[key] = entry
+            entry['refs'] += 1
+
+        # 로드는 key별 lock으로만 직렬화해서 다른 모델 로드를 막지 않음
+        with entry['lock']:
+            if entry['handle'] is None:
+                try:
+                    entry['handle'] = self._freeze(loader())
+                except Exception:
+                    self.release(path, device, dtype)
+                    raise
+
+        return entry['handle']
+
+    def release(self, path: str, device: Any = 'cpu', dtype: Any = torch.float32) -> int:
+        """
+        빌려간 모델 핸들을 반납합니다.
+        참조 횟수가 0이 되어도 자동으로 내리지 않으며, 메모리 해제는 unload로 합니다.
+
+        :return: 남은 참조 횟수
+        """
+
+        key = self.make_key(path, device, dtype)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0
+
+            entry['refs'] = max(entry['refs'] - 1, 0)
+            return entry['refs']
+
+    def unload(self, path: str, device: Any = 'cpu', dtype: Any = torch.float32, force: bool = False) -> bool:
+        """
+        모델을 레지스트리에서 내립니다.
+
+        :param force: True면 참조 중이어도 내립니다.
+        :return: 내렸으면 True, 아직 참조 중이라 내리지 않았으면 False
+        """
+
+        key = self.make_key(path, device, dtype)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return True
+
+            if entry['refs'] > 0 and not force:
+                return False
+
+            del self._entries[key]
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+        return True
+
+    def refcount(self, path: str, device: Any = 'cpu', dtype: Any = torch.float32) -> int:
+        """
+        key의 현재 참조 횟수를 반환합니다. (로드되지 않았으면 0)
+        """
+
+        entry = self._entries.get(self.make_key(path, device, dtype))
+        return 0 if entry is None else entry['refs']
+
+    def loaded(self) -> list:
+        """
+        현재 로드되어 있는 key 리스트를 반환합니다.
+        """
+
+        with self._lock:
+            return [key for key, entry in self._entries.items()
+                    if entry['handle'] is not None]
+
+    @staticmethod
+    def _freeze(handle: Any) -> Any:
+        """
+        공유 모델이 실수로 학습 모드가 되거나 gradient를 쌓지 않도록 고정합니다.
+        """
+
+        if isinstance(handle, torch.nn.Module):
+            handle.eval()
+            for param in handle.parameters():
+                param.requires_grad_(False)
+
+        return handle
+
+
+# 프로세스 전역 레지스트리
+registry = ModelRegistry()
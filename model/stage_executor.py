@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError
+
+import emotionchat_config as config
+
+
+class StageExecutor:
+
+    def __init__(self, concurrent: bool = None, max_workers: int = None, timeout: dict = None):
+        """
+        한 턴 안에서 서로 의존하지 않는 모델 stage(인텐트/엔티티, 감정, 주제)를
+        쓰레드 풀에서 동시에 실행하고, stage별 timeout으로 결과를 기다리는 클래스입니다.
+        torch 연산은 커널 안에서 GIL을 놓기 때문에 멀티코어 CPU에서 턴 지연시간이
+        가장 느린 stage 하나의 시간에 가까워집니다.
+
+        :param concurrent: False면 submit 시점에 바로 실행 (기존 순차 실행과 동일)
+        :param max_workers: 쓰레드 풀 크기
+        :param timeout: stage 이름 -> 대기 시간(초) 딕셔너리
+        """
+
+        self.concurrent = config.PIPELINE['concurrent'] if concurrent is None else concurrent
+        self.max_workers = config.PIPELINE['max_workers'] if max_workers is None else max_workers
+        self.timeout = dict(config.PIPELINE['timeout'] if timeout is None else timeout)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage') \
+            if self.concurrent else None
+
+    def submit(self, name: str, fn, *args, **kwargs) -> Future:
+        """
+        stage를 실행합니다.
+
+        :param name: stage 이름 (timeout key)
+        :param fn: 실행할 함수
+        :return: stage 결과를 담은 Future
+        """
+
+        if self.pool is not None:
+            return self.pool.submit(fn, *args, **kwargs)
+
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def result(self, name: str, future: Future):
+        """
+        stage 결과를 기다립니다. timeout을 넘기면 stage 이름을 담은 TimeoutError를 발생시킵니다.
+
+        :param name: stage 이름 (timeout key)
+        :param future: submit이 반환한 Future
+        :return: stage 결과
+        """
+
+        try:
+            return future.result(timeout=self.timeout.get(name))
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError('stage "{}" timed out after {}s'.format(name, self.timeout.get(name)))
+
+    @staticmethod
+    def cancel(*futures: Future):
+        """
+        더 이상 필요 없는 stage를 취소합니다. (이미 실행 중인 stage는 끝날 때까지 실행됨)
+        """
+
+        for future in futures:
+            if future is not None:
+                future.cancel()
+
+    def shutdown(self):
+        """
+        쓰레드 풀을 종료합니다.
+        """
+
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
@@ -11,6 +11,8 @@ class DialogKoGPT2(nn.Module):
 
   def generate(self,
                input_ids,
+               attention_mask=None,
+               pad_token_id=None,
                do_sample=True,
                max_length= 50,
                top_p=0.92,
@@ -21,6 +23,8 @@ class DialogKoGPT2(nn.Module):
                early_stopping=False,
                ):
     return self.kogpt2.generate(input_ids,
+               attention_mask=attention_mask,
+               pad_token_id=pad_token_id,
                do_sample=do_sample,
                max_length=max_length,
                top_p = top_p,
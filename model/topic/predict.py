@@ -2,16 +2,21 @@ import os
 import torch
 import torch.nn as nn
 from transformers import AutoModelForSequenceClassification
+from model.device import DevicePolicy
 from model.topic.utils import load_tokenizer
 
 
 class IAI_TOPIC:
-    def __init__(self, model_dir, no_cuda):
-        self.args = torch.load(os.path.join(model_dir, 'training_args.bin'))
+    def __init__(self, model_dir, no_cuda, policy: DevicePolicy = None):
+        if policy is None:
+            policy = DevicePolicy.from_config()
+        # no_cuda=True면 넘겨받은 정책이 GPU여도 CPU에서 실행
+        self.policy = policy.cpu() if no_cuda else policy
+        self.args = torch.load(os.path.join(model_dir, 'training_args.bin'), map_location='cpu')
         self.tokenizer = load_tokenizer(self.args)
-        self.device = "cuda" if torch.cuda.is_available() and not no_cuda else "cpu"
+        self.device = self.policy.device
         self.model = AutoModelForSequenceClassification.from_pretrained(model_dir)  # Config will be automatically loaded from model_dir
-        self.model.to(self.device)
+        self.model = self.policy.to(self.model)
         self.model.eval()
 
     def convert_input_file_to_tensor_dataset(self,
@@ -71,12 +76,22 @@ class IAI_TOPIC:
 
 
     def predict(self, text):
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts: list) -> list:
+        """
+        여러 문장을 하나의 padded batch로 묶어 한 번의 forward로 예측합니다.
+
+        :param texts: 사용자 input text 리스트
+        :return: (topic_pred, topic_prob, max_topic_prob) 튜플의 리스트
+        """
+
         # Convert input file to TensorDataset
-        dataset = self.convert_input_file_to_tensor_dataset(text, self.args)
-        dataset = tuple(t.to(self.device) for t in dataset)
+        datasets = [self.convert_input_file_to_tensor_dataset(text, self.args) for text in texts]
+        dataset = tuple(torch.cat(parts, dim=0).to(self.device) for parts in zip(*datasets))
 
         # Predict
-        with torch.no_grad():
+        with self.policy.inference():
             inputs = {"input_ids": dataset[0],
                       "attention_mask": dataset[1],
                       "labels": None}
@@ -84,15 +99,14 @@ class IAI_TOPIC:
                 inputs["token_type_ids"] = dataset[2]
             outputs = self.model(**inputs)
             logits = outputs[0]
+            return self._decode(logits)
 
-            softmax_layer = nn.Softmax(-1)
-            softmax_result = softmax_layer(logits)
-            max_emotion = max(t[0] for t in softmax_result)
-            y_pred = logits.max(dim=1)[1]
-
-            topic_pred = int(y_pred.detach().cpu().numpy()[0])
-            topic_prod = softmax_result.detach().cpu().numpy()
-            #max_topic_prob = float(max_emotion.detach().cpu().numpy())
-            max_topic_prob = topic_prod[0].max()
+    # noinspection PyMethodMayBeStatic
+    def _decode(self, logits) -> list:
+        softmax_layer = nn.Softmax(-1)
+        softmax_result = softmax_layer(logits)
+        y_pred = logits.max(dim=1)[1].detach().cpu().numpy()
+        topic_prod = softmax_result.detach().float().cpu().numpy()
 
-        return topic_pred, topic_prod, max_topic_prob
+        # 문장별로 (1, num_labels) 모양의 확률을 유지해서 기존 predict 반환값과 맞춤
+        return [(int(y_pred[i]), topic_prod[i:i + 1], topic_prod[i].max()) for i in range(len(y_pred))]
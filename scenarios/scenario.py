@@ -14,15 +14,70 @@
 
 import inspect
 from collections import Callable
-from copy import deepcopy
 from random import randint
 import decorators.data as data
 import emotionchat_config as config
+from emotionchat_session import merge_history, emotion_stats
+from emotionchat_phase import phase_graph
 from answerer.emotion_answerer import EmotionAnswerer
 from answerer.discomfort_answerer import DiscomfortAnswerer
 import re
 
 
+class SlotSchema:
+    """
+    시나리오의 slot(엔티티) 구조를 미리 컴파일해둔 객체
+    엔티티 태그 → slot index 매핑과 조사 제거 정규식을 한 번만 만들어두고,
+    턴마다 deepcopy 없이 slot 값 리스트만 새로 만들어서 채운다.
+    """
+
+    particle = re.compile('[은는이가을를]')  # slot 값에서 지울 조사
+
+    def __init__(self, keys: list, default: dict):
+        self.keys = tuple(keys)
+        self.lower_keys = tuple(k.lower() for k in self.keys)
+        self.defaults = tuple(default[k] for k in self.keys)
+        self.tag_slots = {}  # 엔티티 태그 → 채워야 할 slot index 튜플 (처음 본 태그만 계산)
+
+    def slots_of(self, tag: str) -> tuple:
+        """
+        엔티티 태그(e.g. B-LOCATION)에 해당하는 slot index들을 반환합니다.
+        """
+
+        slots = self.tag_slots.get(tag)
+        if slots is None:
+            lower_tag = tag.lower()
+            slots = tuple(i for i, k in enumerate(self.lower_keys) if k in lower_tag)
+            self.tag_slots[tag] = slots
+
+        return slots
+
+    def fill(self, entity: list, tokens: list) -> dict:
+        """
+        엔티티 태그에 맞는 토큰으로 slot을 채우고, 빈 slot은 default 값 중 하나로 채웁니다.
+
+        :param entity: 토큰별 엔티티 태그 리스트
+        :param tokens: 입력문자열 토큰(단어) 리스트
+        :return: {엔티티: 공백으로 이어진 slot 값} 딕셔너리 (시나리오에 정의된 엔티티 순서)
+        """
+
+        values = [[] for _ in self.keys]
+
+        for t, e in zip(tokens, entity):
+            slots = self.slots_of(e)
+            if slots:
+                t = self.particle.sub('', t)
+                for i in slots:
+                    values[i].append(t)
+
+        for i, default in enumerate(self.defaults):
+            if len(values[i]) == 0 and len(default) != 0:
+                # 디폴트 값 중에서 랜덤으로 하나 골라서 넣음
+                values[i] = [default[randint(0, len(default) - 1)]]
+
+        return {k: ' '.join(v) for k, v in zip(self.keys, values)}
+
+
 # @data
 class Scenario:
     """
@@ -39,6 +94,8 @@ class Scenario:
         self.api, self.dict_keys, self.params = \
             self.__check_api(api)
 
+        self.slot_schema = SlotSchema(self.dict_keys, self.default)
+
         self.emotion_answerer = emotion_answerer
 
         # self.emotion_answerer = EmotionAnswerer()
@@ -118,24 +175,6 @@ class Scenario:
 
         return scenario, default
 
-    def __check_entity(self, entity: list, tokens: list, dict_: dict) -> dict:
-        """
-        문자열과 엔티티를 함께 체크해서
-        딕셔너리에 정의된 엔티티에 해당하는 단어 토큰만 추가합니다.
-
-        :param tokens: 입력문자열 토큰(단어) 리스트
-        :param entity: 엔티티 리스트(들어온 tokens을 entity recognizer로 인식한 토큰별 엔티티 리스트)
-        :param dict_: 필요한 엔티티가 무엇인지 정의된 딕셔너리
-        :return: 필요한 토큰들이 채워진 딕셔너리
-        """
-
-        for t, e in zip(tokens, entity):
-            for k, v in dict_.items():
-                if k.lower() in e.lower():
-                    v.append(re.sub('[은는이가을를]', '', t))
-
-        return dict_
-
     """
     def __check_emotion_topic(self, emotion: str, topic: str, tokens: list, dict_: dict) -> dict:
         for t, e in zip(tokens, emotion_topic):
@@ -147,22 +186,6 @@ class Scenario:
     """
 
 
-    def __set_default(self, result):
-        """
-        Scenario객체의 scenarios key의 엔티티들에게 default값이 여러 개 부여되었을 때,
-        이 중 하나만 선택해서 하기.
-        :param result:
-        :return:
-        """
-        for k, v in result.items():
-            if len(result[k]) == 0 and len(self.default[k]) != 0:
-                # 디폴트 값 중에서 랜덤으로 하나 골라서 넣음
-                result[k] = \
-                    [self.default[k][randint(0, len(self.default[k]) - 1)]]
-
-            result[k] = ' '.join(result[k])
-        return result
-
     def set_default_result_dict(self, pre_result_dict, result_dict) -> dict:
         """
         result_dict(다 채워진 시나리오)의 default form 설정 함수
@@ -170,11 +193,7 @@ class Scenario:
         :return: input ~ topic_prob까지 채운 result_dict
         """
 
-        result_dict['input'] = result_dict['input'] + pre_result_dict['input']
-        result_dict['emotions'] = result_dict['emotions'] + pre_result_dict['emotions']
-        result_dict['emotion_prob'] = result_dict['emotion_prob'] + pre_result_dict['emotion_prob']
-        result_dict['topics'] = result_dict['topics'] + pre_result_dict['topics']
-        result_dict['topic_prob'] = result_dict['topic_prob'] + pre_result_dict['topic_prob']
+        merge_history(pre_result_dict, result_dict)
 
     def apply(self, pre_result_dict: dict, result_dict: dict) -> dict:
         """
@@ -184,9 +203,7 @@ class Scenario:
         :return: 다 채워진 시나리오
         """
 
-        scenario = deepcopy(self.scenario)
-        result = self.__check_entity(result_dict['entity'], result_dict['input'], scenario)
-        result = self.__set_default(result)
+        result = self.slot_schema.fill(result_dict['entity'], result_dict['input'])
         required_entity = [k for k, v in result.items() if len(v) == 0]  # 필요한 엔티티 종류
 
         print("(system msg) pre_entity : " + str(pre_result_dict['entity']))
@@ -202,7 +219,7 @@ class Scenario:
             result_dict['answer'] = self.api(*result.values())
             result_dict['previous_phase'] = pre_result_dict['current_phase']
             result_dict['current_phase'] = '/check_ucs'
-            result_dict['next_phase'] = ['/check_ucs_positive', '/check_ucs_negative', '/check_ucs', '/end_phase']
+            result_dict['next_phase'] = phase_graph.next_phases('/check_ucs')
 
             return result_dict
 
@@ -236,7 +253,7 @@ class Scenario:
                     result_dict['answer'] = self.api(*result.values())
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/check_ucs'
-                    result_dict['next_phase'] = ['/check_ucs_positive', '/check_ucs_negative', '/check_ucs', '/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/check_ucs')
 
                     return result_dict
 
@@ -266,7 +283,7 @@ class Scenario:
                     result_dict['answer'] = DiscomfortAnswerer().fill_slot(required_entity)
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/fill_slot'
-                    result_dict['next_phase'] = ['/fill_slot', '/recognize_uc', '/check_ucs','/check_ucs_positive', '/check_ucs_negative']
+                    result_dict['next_phase'] = phase_graph.next_phases('/fill_slot')
 
                     return result_dict
 
@@ -297,8 +314,7 @@ class Scenario:
                     result_dict['answer'] = config.ANSWER['default_error_ucs']
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/recognize_uc'
-                    result_dict['next_phase'] = ['/check_ucs', '/fill_slot', '/recognize_uc', '/check_ucs_positive',
-                                                 '/check_ucs_negative','/check_ucs', '/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/recognize_uc')
 
                     return result_dict
 
@@ -368,9 +384,7 @@ class Scenario:
         result_dict['answer'] = config.ANSWER['default_error_welcomemsg']
         result_dict['previous_phase'] = pre_result_dict['current_phase']
         result_dict['current_phase'] = '/welcomemsg_chat'
-        result_dict['next_phase'] = ['/other_user', '/recognize_uc_chat', '/recognize_emotion_chat', '/recognize_uc',
-                               '/recognize_emotion', '/recognize_topic', '/generate_emotion_chat', '/check_ucs',
-                               '/fill_slot', '/end_phase']
+        result_dict['next_phase'] = phase_graph.next_phases('/welcomemsg_chat')
 
         return result_dict
 
@@ -410,7 +424,7 @@ class Scenario:
             result_dict['answer'] = config.ANSWER['default_error_end_n']
             result_dict['previous_phase'] = pre_result_dict['current_phase']
             result_dict['current_phase'] = '/end_phase'
-            result_dict['next_phase'] = ['/end_phase']
+            result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
             return result_dict
 
@@ -442,7 +456,7 @@ class Scenario:
                 result_dict['answer'] = config.ANSWER['default_contents']
                 result_dict['previous_phase'] = pre_result_dict['current_phase']
                 result_dict['current_phase'] = '/end_phase'
-                result_dict['next_phase'] = ['/end_phase']
+                result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                 return result_dict
 
@@ -472,7 +486,7 @@ class Scenario:
                 result_dict['answer'] = config.ANSWER['call_caregiver']
                 result_dict['previous_phase'] = pre_result_dict['current_phase']
                 result_dict['current_phase'] = '/end_phase'
-                result_dict['next_phase'] = ['/end_phase']
+                result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                 return result_dict
 
@@ -502,7 +516,7 @@ class Scenario:
                 result_dict['answer'] = ['그러시군요. '] + config.ANSWER['default_error_end']
                 result_dict['previous_phase'] = pre_result_dict['current_phase']
                 result_dict['current_phase'] = '/end_phase'
-                result_dict['next_phase'] = ['/end_phase']
+                result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                 return result_dict
 
@@ -553,8 +567,7 @@ class Scenario:
                         result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text)
                         result_dict['previous_phase'] = pre_result_dict['current_phase']
                         result_dict['current_phase'] = '/generate_emotion_chat'
-                        result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                                     '/recommend_contents', '/end_phase']
+                        result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
                         return result_dict
 
                         '''
@@ -585,8 +598,7 @@ class Scenario:
                         result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text)
                         result_dict['previous_phase'] = pre_result_dict['current_phase']
                         result_dict['current_phase'] = '/generate_emotion_chat'
-                        result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                                     '/recommend_contents', '/end_phase']
+                        result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
 
                         return result_dict
                         '''
@@ -617,8 +629,7 @@ class Scenario:
                     result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text)
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/generate_emotion_chat'
-                    result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                                 '/recommend_contents', '/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
 
                     return result_dict
                     '''
@@ -652,8 +663,7 @@ class Scenario:
                         result_dict['answer'] = self.emotion_answerer.generate_answer_under5(text)
                         result_dict['previous_phase'] = pre_result_dict['current_phase']
                         result_dict['current_phase'] = '/generate_emotion_chat'
-                        result_dict['next_phase'] = ['/generate_emotion_chat', '/end_chat', '/recognize_emotion_chat',
-                                                     '/recommend_contents', '/end_phase']
+                        result_dict['next_phase'] = phase_graph.next_phases('/generate_emotion_chat')
 
                         return result_dict
                         '''
@@ -687,7 +697,7 @@ class Scenario:
                                                                                   result_dict['topics'][0])
                         result_dict['previous_phase'] = pre_result_dict['current_phase']
                         result_dict['current_phase'] = '/end_phase'
-                        result_dict['next_phase'] = ['/end_phase']
+                        result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                         return result_dict
                         '''
@@ -722,7 +732,7 @@ class Scenario:
                                                                                   result_dict['topics'][0])
                         result_dict['previous_phase'] = pre_result_dict['current_phase']
                         result_dict['current_phase'] = '/end_phase'
-                        result_dict['next_phase'] = ['/end_phase']
+                        result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                         return result_dict
                         '''
@@ -755,7 +765,7 @@ class Scenario:
                                                                                   result_dict['topics'][0])
                         result_dict['previous_phase'] = pre_result_dict['current_phase']
                         result_dict['current_phase'] = '/end_phase'
-                        result_dict['next_phase'] = ['/end_phase']
+                        result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                         return result_dict
                         '''
@@ -785,10 +795,10 @@ class Scenario:
 
                     result_dict['emotion'] = pre_result_dict['emotion']
                     result_dict['state'] = 'FAIL'
-                    result_dict['answer'] = self.emotion_answerer.generate_answer_over5(pre_result_dict['emotions'])
+                    result_dict['answer'] = self.emotion_answerer.generate_answer_over5(emotion_stats(pre_result_dict))
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/end_phase'
-                    result_dict['next_phase'] = ['/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                     return result_dict
                     '''
@@ -821,7 +831,7 @@ class Scenario:
                                                                               result_dict['topics'][0])
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/end_phase'
-                    result_dict['next_phase'] = ['/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                     return result_dict
                     '''
@@ -858,7 +868,7 @@ class Scenario:
                                                                               result_dict['topics'][0])
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/end_phase'
-                    result_dict['next_phase'] = ['/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                     return result_dict
                     '''
@@ -886,10 +896,10 @@ class Scenario:
 
                     result_dict['emotion'] = pre_result_dict['emotion']
                     result_dict['state'] = 'FAIL'
-                    result_dict['answer'] = self.emotion_answerer.generate_answer_over5(pre_result_dict['emotions'])
+                    result_dict['answer'] = self.emotion_answerer.generate_answer_over5(emotion_stats(pre_result_dict))
                     result_dict['previous_phase'] = pre_result_dict['current_phase']
                     result_dict['current_phase'] = '/end_phase'
-                    result_dict['next_phase'] = ['/end_phase']
+                    result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                     return result_dict
                     '''
@@ -922,7 +932,7 @@ class Scenario:
                                                                           result_dict['topics'][0])
                 result_dict['previous_phase'] = pre_result_dict['current_phase']
                 result_dict['current_phase'] = '/end_phase'
-                result_dict['next_phase'] = ['/end_phase']
+                result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
                 return result_dict
                 '''
@@ -962,7 +972,7 @@ class Scenario:
             result_dict['answer'] = config.ANSWER['default_error_end']
             result_dict['previous_phase'] = pre_result_dict['current_phase']
             result_dict['current_phase'] = '/end_phase'
-            result_dict['next_phase'] = ['/end_phase']
+            result_dict['next_phase'] = phase_graph.next_phases('/end_phase')
 
 
 
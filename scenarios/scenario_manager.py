@@ -1,5 +1,6 @@
 from scenarios.scenario import Scenario
 import emotionchat_config as config
+from emotionchat_session import merge_history
 #from data.organizer import Organizer
 #from data.preprocessor import Preprocessor
 #from decorators import data
@@ -18,10 +19,14 @@ class ScenarioManager:
     def __init__(self,
                  embed_processor,
                  intent_classifier,
-                 entity_recognizer):
+                 entity_recognizer,
+                 dataset: Dataset = None):
 
         self.scenarios = []
-        self.dataset = Dataset(ood=True)
+        self.scenario_table = {}  # intent → 시나리오 (같은 intent면 먼저 등록된 시나리오)
+        self.intent_sets = {sort: frozenset(intents) for sort, intents in config.SORT_INTENT.items()}
+        # intent 분류(불편함, 궁금함, 감정)별 intent 집합을 미리 만들어둠
+        self.dataset = dataset if dataset is not None else Dataset(ood=True)
         self.intent_dict = {'날씨': 1, '미세먼지': 3}
 
         self.embed_processor = embed_processor[0] \
@@ -52,6 +57,7 @@ class ScenarioManager:
     def add_scenario(self, scen: Scenario):
         if isinstance(scen, Scenario):
             self.scenarios.append(scen)
+            self.scenario_table.setdefault(scen.intent, scen)
         else:
             raise Exception('시나리오 객체만 입력 가능합니다.')
 
@@ -68,74 +74,74 @@ class ScenarioManager:
             result_dict['entity'] = entity
 
 
-        for scenario in self.scenarios:
-            # default_scenario 에 있는 경우 default_scenario를 기본적으로 따르도록
-            if c_ucs:
-                # 이전 단계에서 불,궁,감 대화에 들어왔으면
-                if pre_result_dict['current_phase'] == '/check_ucs':
-                    # 이전 단계가 check_ucs 였을 경우
-                    #if result_dict['emotions'][0] in config.EMOTION['긍정']:
-                       ## 현재 감정이 긍정에 속하는 감정일 경우
-
-                    result_dict['input'] = result_dict['input']+ pre_result_dict['input']
-                    result_dict['emotion'] = pre_result_dict['emotion']
-                    result_dict['emotions'] = result_dict['emotions'] + pre_result_dict['emotions']
-                    result_dict['emotion_prob'] = result_dict['emotion_prob'] + pre_result_dict['emotion_prob']
-                    result_dict['topics'] = result_dict['topics'] + pre_result_dict['topics']
-                    result_dict['topic_prob'] = result_dict['topic_prob'] + pre_result_dict['topic_prob']
-                    result_dict['state'] = 'END'
-                    result_dict['answer'] = config.ANSWER['goodbyemsg_uc']
-                    result_dict['previous_phase'] = ['/welcomemsg_chat', '/other_user']
-                    result_dict['previous_phase'] = '/end_phase'
-                    result_dict['previous_phase'] = ['/end_phase']
-
-                    '''
+        # default_scenario 에 있는 경우 default_scenario를 기본적으로 따르도록
+        # (시나리오는 등록할 때 intent별로 색인되어 있으므로 한 번에 찾음)
+        if c_ucs:
+            # 이전 단계에서 불,궁,감 대화에 들어왔으면
+            if pre_result_dict['current_phase'] == '/check_ucs' and self.scenarios:
+                # 이전 단계가 check_ucs 였을 경우
+                #if result_dict['emotions'][0] in config.EMOTION['긍정']:
+                   ## 현재 감정이 긍정에 속하는 감정일 경우
+
+                merge_history(pre_result_dict, result_dict)
+                result_dict['emotion'] = pre_result_dict['emotion']
+                result_dict['state'] = 'END'
+                result_dict['answer'] = config.ANSWER['goodbyemsg_uc']
+                result_dict['previous_phase'] = ['/welcomemsg_chat', '/other_user']
+                result_dict['previous_phase'] = '/end_phase'
+                result_dict['previous_phase'] = ['/end_phase']
+
+                '''
+                return {
+                    # 수정
+                    'input': result_dict['input']+ pre_result_dict['input'],
+                    'intent': result_dict['intent'],
+                    'entity': result_dict['entity'],
+                    'emotion': pre_result_dict['emotion'],
+                    'emotions': result_dict['emotions'] + pre_result_dict['emotions'],  # 'emotions': [pre_emotion] + pre_emotions,
+                    'emotion_prob': result_dict['emotion_prob'] + pre_result_dict['emotion_prob'],
+                    'emotion_probs': result_dict['emotion_probs'],
+                    'topics': result_dict['topics'] + pre_result_dict['topics'],  # 'topics': [topic] + pre_topics,
+                    'topic_prob': result_dict['topic_prob'] + pre_result_dict['topic_prob'],  # 'topic_prob': [0] + pre_topic_prob,
+                    'state': 'END',
+                    'answer': config.ANSWER['goodbyemsg_uc'],
+                    'previous_phase': ['/welcomemsg_chat', '/other_user'],
+                    'current_phase': '/end_phase',
+                    'next_phase': ['/end_phase'],
+                    'intent_turn_cnt': result_dict['intent_turn_cnt']
+                }
+                '''
+
+                '''
+                else:
                     return {
-                        # 수정
                         'input': result_dict['input']+ pre_result_dict['input'],
-                        'intent': result_dict['intent'],
-                        'entity': result_dict['entity'],
-                        'emotion': pre_result_dict['emotion'],
-                        'emotions': result_dict['emotions'] + pre_result_dict['emotions'],  # 'emotions': [pre_emotion] + pre_emotions,
-                        'emotion_prob': result_dict['emotion_prob'] + pre_result_dict['emotion_prob'],
-                        'emotion_probs': result_dict['emotion_probs'],
-                        'topics': result_dict['topics'] + pre_result_dict['topics'],  # 'topics': [topic] + pre_topics,
-                        'topic_prob': result_dict['topic_prob'] + pre_result_dict['topic_prob'],  # 'topic_prob': [0] + pre_topic_prob,
-                        'state': 'END',
+                        'intent': intent,
+                        'entity': entity,
+                        'emotion': pre_emotion,
+                        'emotions': [emotion] + pre_emotions,
+                        'emotion_prob': [max_emotion_prob] + pre_emotion_prob,
+                        # 'topic': topic,
+                        'topics': [topic] + pre_topics,
+                        'topic_prob': [max_topic_prob] + pre_topic_prob,
+                        'state': 'FALLBACK',
                         'answer': config.ANSWER['goodbyemsg_uc'],
                         'previous_phase': ['/welcomemsg_chat', '/other_user'],
                         'current_phase': '/end_phase',
                         'next_phase': ['/end_phase'],
-                        'intent_turn_cnt': result_dict['intent_turn_cnt']
+                        'intent_turn_cnt': intent_turn_cnt
                     }
-                    '''
-
-                    '''
-                    else:
-                        return {
-                            'input': result_dict['input']+ pre_result_dict['input'],
-                            'intent': intent,
-                            'entity': entity,
-                            'emotion': pre_emotion,
-                            'emotions': [emotion] + pre_emotions,
-                            'emotion_prob': [max_emotion_prob] + pre_emotion_prob,
-                            # 'topic': topic,
-                            'topics': [topic] + pre_topics,
-                            'topic_prob': [max_topic_prob] + pre_topic_prob,
-                            'state': 'FALLBACK',
-                            'answer': config.ANSWER['goodbyemsg_uc'],
-                            'previous_phase': ['/welcomemsg_chat', '/other_user'],
-                            'current_phase': '/end_phase',
-                            'next_phase': ['/end_phase'],
-                            'intent_turn_cnt': intent_turn_cnt
-                        }
-                    '''
-
-                elif (scenario.intent == pre_result_dict['intent']) and (pre_result_dict['intent'] in config.SORT_INTENT['PHISICALDISCOMFORT']):
+                '''
+
+            else:
+                pre_intent = pre_result_dict['intent']
+                scenario = self.scenario_table.get(pre_intent)
+
+                if scenario is not None and pre_intent in self.intent_sets['PHISICALDISCOMFORT']:
                     # 이전 단계에서 불편함 대화였으면
                     return scenario.apply(pre_result_dict, result_dict)
 
-                elif (scenario.intent == pre_result_dict['intent']) and (pre_result_dict['intent'] in config.SORT_INTENT['QURIOUS']):
+                elif scenario is not None and pre_intent in self.intent_sets['QURIOUS']:
                     # 이전 단계에서 궁금함 대화였으면
                     prep = self.dataset.load_predict(text, self.embed_processor)
                     #intent = self.intent_classifier.predict(prep, calibrate=False)
@@ -145,59 +151,49 @@ class ScenarioManager:
                     result_dict['entity'] = entity
                     return scenario.apply(pre_result_dict, result_dict)
 
-                elif (scenario.intent == pre_result_dict['intent']) and pre_result_dict['intent'] == '마음상태호소':
+                elif scenario is not None and pre_intent == '마음상태호소':
                     # 이전 단계에서 감정 대화였으면
                     return scenario.apply_emotion(pre_result_dict, result_dict, text, turn_cnt)
 
-                else:
-                    continue
-
-            ############################# #############################
-            else:
-                # 이전 대화에서 불,궁,감 대화에 안들어왔으면
-                # 다른 인텐트 존재 가능
+        ############################# #############################
+        else:
+            # 이전 대화에서 불,궁,감 대화에 안들어왔으면
+            # 다른 인텐트 존재 가능
 
-                print('(system msg) scenario.intent ' + scenario.intent)
-                if (scenario.intent == result_dict['intent']) and (result_dict['intent'] in config.SORT_INTENT['QURIOUS']):
-                    # 현재 대화가 궁금함 대화일 경우
-                    #prep = self.dataset.load_predict(text, self.embed_processor)
-                    #intent = self.intent_classifier.predict(prep, calibrate=False)
-                    #entity = self.entity_recognizer.predict(prep)
-                    #print('(system msg) intent : ' + str(intent))
-                    #result_dict['intent'] = intent    # 궁금함_dust
-                    #result_dict['entity'] = entity
-                    return scenario.apply(pre_result_dict, result_dict)
+            intent = result_dict['intent']
+            scenario = self.scenario_table.get(intent)
+            print('(system msg) scenario.intent ' + str(scenario.intent if scenario is not None else None))
 
+            if scenario is not None and intent in self.intent_sets['QURIOUS']:
+                # 현재 대화가 궁금함 대화일 경우
+                return scenario.apply(pre_result_dict, result_dict)
 
-                # (불궁일 때)현재 대화의 scenario의 intent랑 들어온 인텐트가 같으면 default_scenario대로 수행하게
-                elif (scenario.intent == result_dict['intent']) and (result_dict['intent'] in config.SORT_INTENT['PHISICALDISCOMFORT']):
+            # (불궁일 때)현재 대화의 intent에 해당하는 scenario가 있으면 default_scenario대로 수행하게
+            elif scenario is not None and intent in self.intent_sets['PHISICALDISCOMFORT']:
                 # 각 intent 별 시나리오를 demo.scenarios.py에 저장해놨기 때문에 그 시나리오에 기록하면서 사용
-                    print('(system msg) 엔티티 : ' + str(result_dict['entity']))
-                    return scenario.apply(pre_result_dict, result_dict)
-
-                # (감정일 때)현재 대화의 scenario의 intent랑 들어온 인텐트가 같으면 감정, 주제 필링 수행
-                elif (scenario.intent == result_dict['intent']) and (result_dict['intent'] in config.SORT_INTENT['SENTIMENTDISCOMFORT']):
-                    # 각 intent 별 시나리오를 demo.scenarios.py에 저장해놨기 때문에 그 시나리오에 기록하면서 사용
-                    return scenario.apply_emotion(pre_result_dict, result_dict, text, turn_cnt)
+                print('(system msg) 엔티티 : ' + str(result_dict['entity']))
+                return scenario.apply(pre_result_dict, result_dict)
 
-                else:
-                    continue
+            # (감정일 때)현재 대화의 intent에 해당하는 scenario가 있으면 감정, 주제 필링 수행
+            elif scenario is not None and intent in self.intent_sets['SENTIMENTDISCOMFORT']:
+                # 각 intent 별 시나리오를 demo.scenarios.py에 저장해놨기 때문에 그 시나리오에 기록하면서 사용
+                return scenario.apply_emotion(pre_result_dict, result_dict, text, turn_cnt)
 
-            #############################  #############################
+        #############################  #############################
 
-        else:
-            print("(system msg) scenario 반복문 빠져나옴")
+        print("(system msg) 해당하는 scenario 없음")
         # default_scenario에 없는 시나리오 즉, 넋두리(긍정, 부정일 경우에도 여기에 속함)
-            if result_dict['intent'] in ['부정', '긍정']:
-                return scenario.apply_np(pre_result_dict, result_dict)
-            # (인사일 때)
-            elif result_dict['intent'] == '만남인사':
-                # 각 intent 별 시나리오를 demo.scenarios.py에 저장해놨기 때문에 그 시나리오에 기록하면서 사용
-                print("(system msg) scenario 반복문 빠져나옴")
-                return scenario.apply_greet(pre_result_dict, result_dict)
-            # (UNK일 때)
-            else:
-                return scenario.apply_unk(pre_result_dict, result_dict)  # apply_unk() 생성 예정
+        # (넋두리 처리는 시나리오별 정보를 쓰지 않으므로 마지막으로 등록된 시나리오로 처리)
+        scenario = self.scenarios[-1]
+        if result_dict['intent'] in ['부정', '긍정']:
+            return scenario.apply_np(pre_result_dict, result_dict)
+        # (인사일 때)
+        elif result_dict['intent'] == '만남인사':
+            # 각 intent 별 시나리오를 demo.scenarios.py에 저장해놨기 때문에 그 시나리오에 기록하면서 사용
+            return scenario.apply_greet(pre_result_dict, result_dict)
+        # (UNK일 때)
+        else:
+            return scenario.apply_unk(pre_result_dict, result_dict)  # apply_unk() 생성 예정
 
         '''
         # 넋두리(모름)일 때
@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import binascii
+import io
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web
+
+import emotionchat_config as config
+from emotionchat_engine import EmotionChat
+from emotionchat_session import SessionState
+from model.emotion.wav import WavStream
+
+
+def to_json(value):
+    """
+    numpy 값이 섞인 result_dict를 json으로 보낼 수 있는 형태로 바꿉니다.
+    """
+
+    if isinstance(value, dict):
+        return {key: to_json(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(val) for val in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class Session:
+
+    def __init__(self, session_id: str):
+        """
+        서버에서 유지하는 대화 세션 상태입니다.
+        같은 세션의 요청은 lock으로 순서대로 처리합니다.
+
+        :param session_id: 세션 id
+        """
+
+        self.session_id = session_id
+        self.state = SessionState()
+        self.lock = asyncio.Lock()
+        self.last_access = time.monotonic()
+
+
+class SessionStore:
+
+    def __init__(self, ttl: float = config.API['session_ttl'], max_sessions: int = config.API['max_sessions']):
+        """
+        세션 id -> Session 저장소입니다. 오래 사용하지 않은 세션은 ttl이 지나면 삭제됩니다.
+
+        :param ttl: 마지막 요청 이후 세션을 유지하는 시간 (초)
+        :param max_sessions: 동시에 유지하는 최대 세션 수
+        """
+
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def get(self, session_id: str = None, create: bool = True):
+        """
+        세션을 가져옵니다. session_id가 없거나 만료되었으면 create=True일 때 새로 만듭니다.
+
+        :return: Session 또는 None
+        """
+
+        self.expire()
+        session = self.sessions.get(session_id) if session_id else None
+
+        if session is None:
+            if not create:
+                return None
+            session = Session(session_id or uuid.uuid4().hex)
+            self.sessions[session.session_id] = session
+            self.evict(keep=session.session_id)
+
+        session.last_access = time.monotonic()
+        self.sessions.move_to_end(session.session_id)
+        return session
+
+    def evict(self, keep: str = None):
+        """
+        세션 수가 max_sessions를 넘으면 오래 사용하지 않은 세션부터 삭제합니다.
+        처리 중인(lock이 잡힌) 세션과 keep 세션은 삭제하지 않습니다.
+
+        :param keep: 삭제하지 않을 세션 id (방금 만든 세션)
+        """
+
+        for session_id in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            if session_id != keep and not self.sessions[session_id].lock.locked():
+                del self.sessions[session_id]
+
+    def remove(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+    def expire(self):
+        """
+        ttl이 지난 세션을 삭제합니다. (최근 사용 순으로 정렬되어 있으므로 앞에서부터 확인)
+        """
+
+        now = time.monotonic()
+        while len(self.sessions) > 0:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_access < self.ttl or session.lock.locked():
+                break
+            self.sessions.popitem(last=False)
+
+
+class ChatServer:
+
+    def __init__(self, engine: EmotionChat = None, max_workers: int = config.API['max_workers']):
+        """
+        EmotionChat.run을 HTTP로 제공하는 asyncio 서버입니다.
+        모델 추론은 executor 쓰레드에서 실행해서 event loop가 막히지 않게 합니다.
+
+        :param engine: 사용할 EmotionChat 엔진 (없으면 새로 생성)
+        :param max_workers: 모델 추론을 실행할 executor 쓰레드 수
+        """
+
+        self.engine = engine if engine is not None else EmotionChat()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat')
+        self.sessions = SessionStore()
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.post('/' + config.API['request_chat_url_pattern'], self.request_chat),
+            web.post('/' + config.API['request_chat_stream_url_pattern'], self.request_chat_stream),
+            web.post('/' + config.API['fill_slot_url_pattern'], self.fill_slot),
+            web.post('/' + config.API['get_intent_url_pattern'], self.get_intent),
+            web.post('/' + config.API['get_entity_url_pattern'], self.get_entity),
+        ])
+        self.app.on_cleanup.append(self._on_cleanup)
+
+    async def request_chat(self, request: web.Request) -> web.Response:
+        """
+        대화 한 턴을 처리합니다.
+        body: {"session_id": (선택), "text": 사용자 발화, "audio": base64로 인코딩된 wav}
+        """
+
+        body = await self._read_body(request)
+        session = self.sessions.get(body.get('session_id'))
+        return await self._run_turn(session, body)
+
+    async def request_chat_stream(self, request: web.Request) -> web.Response:
+        """
+        음성을 받는 대로 감정 feature를 계산하면서 대화 한 턴을 처리합니다.
+        업로드와 feature 계산이 겹쳐서, 음성이 다 도착하면 바로 감정 인식을 할 수 있습니다.
+        query: session_id (선택), text: 사용자 발화
+        body: wav 바이트 (chunked 전송 가능)
+        """
+
+        body = dict(request.query)
+        self._text(body)
+        stream = await self._read_audio_stream(request)
+        # 음성을 읽는 동안 세션이 만료/삭제되지 않도록 세션은 다 읽은 뒤에 가져옴
+        session = self.sessions.get(body.get('session_id'))
+        return await self._run_turn(session, body, stream)
+
+    async def fill_slot(self, request: web.Request) -> web.Response:
+        """
+        엔티티(slot)를 요청한 상태(REQUIRE_*)인 세션에 사용자 답변을 채웁니다.
+        body는 request_chat과 같고, session_id가 반드시 필요합니다.
+        """
+
+        body = await self._read_body(request)
+        session = self.sessions.get(body.get('session_id'), create=False)
+        if session is None:
+            raise web.HTTPNotFound(reason='unknown session_id')
+        if 'REQUIRE_' not in session.state.state:
+            raise web.HTTPConflict(reason='session is not waiting for a slot')
+
+        return await self._run_turn(session, body)
+
+    async def get_intent(self, request: web.Request) -> web.Response:
+        """
+        body: {"text": 사용자 발화} -> {"intent": 인텐트}
+        """
+
+        body = await self._read_body(request)
+        intent, _ = await self._call(self.engine.intent_entity_classifier, self._text(body))
+        return web.json_response({'intent': intent})
+
+    async def get_entity(self, request: web.Request) -> web.Response:
+        """
+        body: {"text": 사용자 발화} -> {"entity": 엔티티 리스트}
+        """
+
+        body = await self._read_body(request)
+        _, entity = await self._call(self.engine.intent_entity_classifier, self._text(body))
+        return web.json_response({'entity': self.engine._edit_entity(entity)})
+
+    async def _run_turn(self, session: Session, body: dict, wav_file=None) -> web.Response:
+        text = self._text(body)
+        if wav_file is None:
+            wav_file = self._audio(body)
+
+        # 같은 세션의 턴은 순서대로, 다른 세션의 턴은 executor에서 동시에 실행
+        async with session.lock:
+            result_dict = await self._call(self.engine.run, text, wav_file,
+                                           session.state.to_result_dict(), session.state.turn_cnts)
+            session.state.update(result_dict)
+
+        if result_dict['current_phase'] == '/end_phase':
+            self.sessions.remove(session.session_id)
+
+        return web.json_response(to_json({'session_id': session.session_id, **result_dict}))
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    @staticmethod
+    async def _read_body(request: web.Request) -> dict:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(reason='request body must be json')
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(reason='request body must be a json object')
+        return body
+
+    @staticmethod
+    def _text(body: dict) -> str:
+        text = body.get('text')
+        if not isinstance(text, str) or text.strip() == '':
+            raise web.HTTPBadRequest(reason='"text" is required')
+        return text
+
+    @staticmethod
+    def _audio(body: dict) -> io.BytesIO:
+        """
+        base64로 인코딩된 wav를 파일 객체로 바꿉니다. (디스크에 쓰지 않음)
+        """
+
+        audio = body.get('audio')
+        if not isinstance(audio, str):
+            raise web.HTTPBadRequest(reason='"audio" (base64 wav) is required')
+        try:
+            return io.BytesIO(base64.b64decode(audio, validate=True))
+        except (binascii.Error, ValueError):
+            raise web.HTTPBadRequest(reason='"audio" must be base64 encoded')
+
+    async def _read_audio_stream(self, request: web.Request):
+        """
+        요청 body로 들어오는 wav를 chunk 단위로 읽으면서 감정 인식용 MFCC를 미리 계산합니다.
+        감정 모델이 쓰는 앞부분(max_len_audio frame)이 다 계산되면 나머지 음성은 읽지 않습니다.
+
+        :return: wav_file 대신 엔진에 넘길 StreamingMFCC
+        """
+
+        reader = WavStream()
+        stream = self.engine.emotion_recognizer.stream()
+
+        async for chunk in request.content.iter_any():
+            try:
+                samples = reader.feed(chunk)
+                if reader.header is not None:
+                    self.engine.emotion_recognizer.check_sample_rate(reader.sample_rate)
+            except Exception as e:
+                raise web.HTTPBadRequest(reason='invalid wav stream : {}'.format(e))
+
+            if len(samples) > 0 and await self._call(stream.feed, samples):
+                break
+
+        if reader.header is None:
+            raise web.HTTPBadRequest(reason='wav body is required')
+        return stream
+
+    async def _on_cleanup(self, app: web.Application):
+        self.executor.shutdown(wait=False)
+
+    def run(self, host: str = config.API['host'], port: int = config.API['port']):
+        web.run_app(self.app, host=host, port=port)
+
+
+if __name__ == '__main__':
+    ChatServer().run()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 테스트에서 저장소 최상위 패키지(model, data, ...)를 import 할 수 있게 함
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('sklearn')
+
+from model.batching import MicroBatcher
+
+
+class RecordingBatchFn:
+
+    def __init__(self, delay: float = 0.):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, items: list) -> list:
+        with self.lock:
+            self.batches.append(list(items))
+        time.sleep(self.delay)
+        return [item * 10 for item in items]
+
+
+def test_results_follow_request_order():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch=4, max_wait_ms=50)
+
+    futures = [batcher.submit(item) for item in range(10)]
+
+    assert [future.result(timeout=5) for future in futures] == [item * 10 for item in range(10)]
+    assert [item for batch in batch_fn.batches for item in batch] == list(range(10))
+    assert all(len(batch) <= 4 for batch in batch_fn.batches)
+    assert len(batch_fn.batches) < 10  # 요청이 batch로 묶임
+
+
+def test_concurrent_callers_get_their_own_result():
+    batcher = MicroBatcher(RecordingBatchFn(), max_batch=8, max_wait_ms=5)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda item: batcher(item, timeout=5), range(100)))
+
+    assert results == [item * 10 for item in range(100)]
+
+
+def test_single_request_waits_at_most_max_wait():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch=16, max_wait_ms=20)
+    batcher(0, timeout=5)  # worker 쓰레드 시작
+
+    start = time.monotonic()
+    assert batcher(1, timeout=5) == 10
+    assert time.monotonic() - start < 1.
+    assert batch_fn.batches[-1] == [1]
+
+
+def test_result_timeout():
+    batcher = MicroBatcher(RecordingBatchFn(delay=0.5), max_batch=1, max_wait_ms=0)
+
+    with pytest.raises(TimeoutError):
+        batcher(1, timeout=0.05)
+
+
+def test_batch_errors_reach_every_request():
+    def batch_fn(items):
+        raise ValueError('batch failed')
+
+    batcher = MicroBatcher(batch_fn, max_batch=4, max_wait_ms=50)
+    futures = [batcher.submit(item) for item in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch=4, max_wait_ms=50)
+    futures = [batcher.submit(item) for item in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+
+def test_cancelled_requests_are_skipped():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch=4, max_wait_ms=200)
+
+    first = batcher.submit(1)
+    cancelled = batcher.submit(2)
+    assert cancelled.cancel()
+
+    assert first.result(timeout=5) == 10
+    assert batch_fn.batches == [[1]]
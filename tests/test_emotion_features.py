@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+torch = pytest.importorskip('torch')
+torchaudio = pytest.importorskip('torchaudio')
+
+from model.emotion.features import MFCCFeaturizer
+
+
+def make_clip(rng, length, lead=0, tail=0):
+    clip = rng.standard_normal(length).astype(np.float32) * 1000
+    return np.concatenate([np.zeros(lead, np.float32), clip, np.zeros(tail, np.float32)])
+
+
+def reference_mfcc(featurizer, clip):
+    """
+    clip 하나씩 resample → 앞뒤 무음 제거 → MFCC(center=True) → 정규화 (batch 처리 전 방식)
+    단, 모델이 쓰는 앞의 max_len개 frame만으로 MFCC를 계산 (top_db 기준도 그 frame들 안에서)
+    """
+
+    audio = featurizer.resample(torch.as_tensor(clip).unsqueeze(0))[0]
+    nonzero = torch.nonzero(audio).flatten()
+    audio = audio[int(nonzero[0]):int(nonzero[-1]) + 1]
+
+    transform = torchaudio.transforms.MFCC(
+        sample_rate=16000,
+        n_mfcc=featurizer.n_mfcc,
+        log_mels=False,
+        melkwargs={'n_fft': featurizer.n_fft, 'hop_length': featurizer.hop_length,
+                   'center': True, 'pad_mode': 'reflect'}
+    )
+    mel = transform.MelSpectrogram(audio)[:, :featurizer.max_len]
+    mfcc = torch.matmul(transform.amplitude_to_DB(mel).T, transform.dct_mat).T
+    return featurizer.normalize(mfcc).T
+
+
+def test_batch_matches_per_clip_path():
+    rng = np.random.default_rng(0)
+    featurizer = MFCCFeaturizer(max_len=60)
+    clips = [
+        make_clip(rng, 48000),
+        make_clip(rng, 7001, lead=1203, tail=4800),
+        make_clip(rng, 3000, lead=17),
+        make_clip(rng, 12345, tail=999),
+        make_clip(rng, 9000) * 1e-4,  # 다른 clip보다 훨씬 작은 소리 (top_db 기준이 clip마다 달라야 함)
+    ]
+
+    padded, frames = featurizer(clips)
+
+    assert padded.shape == (len(clips), 60, featurizer.n_mfcc)
+    for idx, clip in enumerate(clips):
+        expected = reference_mfcc(featurizer, clip)
+        assert int(frames[idx]) == len(expected)
+        torch.testing.assert_close(padded[idx, :len(expected)], expected, rtol=1e-3, atol=1e-3)
+        assert torch.all(padded[idx, len(expected):] == 0)
+
+
+def test_silent_and_empty_clips_keep_one_frame():
+    featurizer = MFCCFeaturizer(max_len=20)
+    clips = [np.zeros(4800, np.float32), np.zeros(0, np.float32)]
+
+    padded, frames = featurizer(clips)
+
+    assert frames.tolist() == [1, 1]
+    assert torch.all(padded == 0)
+
+    feature, frames = featurizer.stream().finish()
+    assert frames.tolist() == [1]
+    assert torch.all(feature == 0)
@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+torch = pytest.importorskip('torch')
+pytest.importorskip('torchaudio')
+
+from model.emotion.features import MFCCFeaturizer
+
+
+@pytest.fixture(scope='module')
+def featurizer():
+    return MFCCFeaturizer(max_len=50)
+
+
+def make_clip(length, lead, tail, seed):
+    rng = np.random.default_rng(seed)
+    clip = rng.standard_normal(length).astype(np.float32) * 1000
+    return np.concatenate([np.zeros(lead, np.float32), clip, np.zeros(tail, np.float32)])
+
+
+def stream(featurizer, clip, chunk_size):
+    streaming = featurizer.stream()
+    for begin in range(0, len(clip), chunk_size):
+        if streaming.feed(clip[begin:begin + chunk_size]):
+            break
+    return streaming.finish()
+
+
+# 48kHz 입력에서 FFT window(400 samples @16kHz)는 입력 1200개이므로
+# 1200으로 나누어떨어지지 않는 chunk 크기는 경계가 window 중간에 걸림
+@pytest.mark.parametrize('chunk_size', [1, 37, 599, 1200, 1201, 4801, 10 ** 6])
+@pytest.mark.parametrize('clip', [
+    make_clip(9000, 0, 0, seed=1),
+    make_clip(7001, 1203, 4800, seed=2),  # 앞뒤 무음
+    make_clip(48000, 500, 0, seed=3),  # max_len보다 긴 음성
+], ids=['plain', 'silence', 'long'])
+def test_stream_matches_offline(featurizer, clip, chunk_size):
+    expected, expected_frames = featurizer([clip])
+    feature, frames = stream(featurizer, clip, chunk_size)
+
+    assert frames.tolist() == expected_frames.tolist()
+    torch.testing.assert_close(feature, expected, rtol=1e-3, atol=1e-3)
+
+
+def test_stream_stops_after_max_len(featurizer):
+    clip = make_clip(48000, 0, 0, seed=4)
+    streaming = featurizer.stream()
+
+    assert streaming.feed(clip)
+    assert streaming.feed(clip)  # 이후 입력은 무시
+    assert streaming.finish()[1].tolist() == [featurizer.max_len]
@@ -0,0 +1,188 @@
+import io
+import struct
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+wav = pytest.importorskip('model.emotion.wav')
+
+
+def pcm_bytes(samples, sample_width):
+    """
+    (frames, channels) 정수 샘플을 little endian PCM 바이트로 만듭니다. (8bit는 unsigned)
+    """
+    if sample_width == 1:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if sample_width == 3:
+        return b''.join(int(s).to_bytes(3, 'little', signed=True) for s in samples.reshape(-1))
+    return samples.astype('<i{}'.format(sample_width)).tobytes()
+
+
+def make_samples(frames, channels, sample_width, seed=0):
+    limit = 2 ** (8 * sample_width - 1)
+    rng = np.random.default_rng(seed)
+    return rng.integers(-limit, limit, size=(frames, channels), dtype=np.int64)
+
+
+def expected_mono(samples, sample_width):
+    if sample_width == 3:
+        samples = samples * 256  # 24bit는 pydub처럼 32bit로 << 8
+    if samples.shape[1] == 1:
+        return samples[:, 0].astype(np.float32)
+    return np.floor(samples.astype(np.float64).mean(axis=1)).astype(np.float32)
+
+
+def write_wave(samples, sample_width, sample_rate=48000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(samples.shape[1])
+        w.setsampwidth(sample_width)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm_bytes(samples, sample_width))
+    return buffer.getvalue()
+
+
+def riff(chunks) -> bytes:
+    body = b'WAVE'
+    for chunk_id, data in chunks:
+        body += chunk_id + struct.pack('<I', len(data)) + data + b'\x00' * (len(data) & 1)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def fmt_chunk(channels, sample_rate, sample_width, extensible=False) -> bytes:
+    block_align = channels * sample_width
+    tag = wav.WAVE_FORMAT_EXTENSIBLE if extensible else wav.WAVE_FORMAT_PCM
+    fmt = struct.pack('<HHIIHH', tag, channels, sample_rate, sample_rate * block_align,
+                      block_align, sample_width * 8)
+    if extensible:
+        guid = bytes.fromhex('0100000000001000800000aa00389b71')  # KSDATAFORMAT_SUBTYPE_PCM
+        fmt += struct.pack('<HHI', 22, sample_width * 8, 0) + guid
+    return fmt
+
+
+@pytest.mark.parametrize('channels', [1, 2])
+@pytest.mark.parametrize('sample_width', [1, 2, 3, 4])
+def test_read_wav_matches_wave_module(tmp_path, sample_width, channels):
+    samples = make_samples(333, channels, sample_width, seed=sample_width)
+    data = write_wave(samples, sample_width, sample_rate=44100)
+    path = tmp_path / 'sample.wav'
+    path.write_bytes(data)
+
+    expected = expected_mono(samples, sample_width)
+    for source in [str(path), path, data, bytearray(data), io.BytesIO(data)]:
+        audio, sample_rate = wav.read_wav(source)
+        assert sample_rate == 44100
+        assert audio.dtype == np.float32
+        np.testing.assert_array_equal(audio, expected)
+
+    # wave 모듈이 읽은 raw frame과 비교
+    with wave.open(io.BytesIO(data)) as w:
+        raw = np.frombuffer(w.readframes(w.getnframes()), dtype=np.uint8)
+    np.testing.assert_array_equal(wav._to_samples(raw, channels, sample_width).reshape(-1),
+                                  samples.reshape(-1) * (256 if sample_width == 3 else 1))
+
+
+@pytest.mark.parametrize('channels', [1, 2])
+@pytest.mark.parametrize('sample_width', [1, 2, 4])
+def test_read_wav_matches_pydub(sample_width, channels):
+    AudioSegment = pytest.importorskip('pydub').AudioSegment
+    data = write_wave(make_samples(500, channels, sample_width), sample_width)
+
+    segment = AudioSegment.from_wav(io.BytesIO(data)).set_channels(1)
+    audio, sample_rate = wav.read_wav(data)
+    assert sample_rate == segment.frame_rate
+    np.testing.assert_array_equal(audio, np.array(segment.get_array_of_samples(), dtype=np.float32))
+
+
+def test_extensible_format():
+    samples = make_samples(100, 2, 3)
+    data = riff([(b'fmt ', fmt_chunk(2, 48000, 3, extensible=True)), (b'data', pcm_bytes(samples, 3))])
+
+    audio, sample_rate = wav.read_wav(data)
+    assert sample_rate == 48000
+    np.testing.assert_array_equal(audio, expected_mono(samples, 3))
+
+
+def test_odd_sized_chunk_is_padded():
+    samples = make_samples(50, 1, 2)
+    data = riff([(b'fmt ', fmt_chunk(1, 16000, 2)), (b'LIST', b'abc'), (b'data', pcm_bytes(samples, 2))])
+    assert data.index(b'data') % 2 == 0  # 3바이트 chunk 뒤에 pad byte
+
+    audio, sample_rate = wav.read_wav(data)
+    assert sample_rate == 16000
+    np.testing.assert_array_equal(audio, expected_mono(samples, 2))
+
+
+def test_truncated_data_chunk():
+    samples = make_samples(80, 2, 2)
+    data = write_wave(samples, 2)
+
+    # 끝에서 frame 10개 반을 잘라냄 (헤더의 data 크기는 그대로)
+    audio, _ = wav.read_wav(data[:-(10 * 4 + 2)])
+    np.testing.assert_array_equal(audio, expected_mono(samples[:-11], 2))
+
+
+def test_fmt_after_data_and_missing_data():
+    pcm = pcm_bytes(make_samples(10, 1, 2), 2)
+    with pytest.raises(Exception):
+        wav.read_wav(riff([(b'data', pcm), (b'fmt ', fmt_chunk(1, 48000, 2))]))
+    with pytest.raises(Exception):
+        wav.read_wav(riff([(b'fmt ', fmt_chunk(1, 48000, 2))]))
+    with pytest.raises(Exception):
+        wav.read_wav(b'ID3\x03' + b'\x00' * 100)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_stream_matches_read_wav_in_any_split(seed):
+    samples = make_samples(700, 2, 3, seed=seed)
+    data = riff([(b'fmt ', fmt_chunk(2, 48000, 3)), (b'LIST', b'x' * 7), (b'data', pcm_bytes(samples, 3))])
+    expected, _ = wav.read_wav(data)
+
+    rng = np.random.default_rng(seed)
+    cuts = np.sort(rng.choice(np.arange(1, len(data)), size=60, replace=False))
+    if seed == 0:
+        cuts = np.arange(1, len(data))  # 1바이트씩
+
+    reader = wav.WavStream()
+    parts = [reader.feed(data[begin:end]) for begin, end in zip([0, *cuts], [*cuts, len(data)])]
+
+    assert reader.sample_rate == 48000
+    assert reader.remaining == 0
+    np.testing.assert_array_equal(np.concatenate(parts), expected)
+
+
+def test_stream_ignores_bytes_after_data_chunk():
+    samples = make_samples(20, 1, 2)
+    data = riff([(b'fmt ', fmt_chunk(1, 48000, 2)), (b'data', pcm_bytes(samples, 2)), (b'LIST', b'tail')])
+
+    reader = wav.WavStream()
+    assert reader.sample_rate is None
+    audio = reader.feed(data)
+    np.testing.assert_array_equal(audio, expected_mono(samples, 2))
+    assert len(reader.feed(b'more')) == 0
+
+
+def test_stream_rejects_non_pcm():
+    fmt = struct.pack('<HHIIHH', 3, 1, 48000, 48000 * 4, 4, 32)  # IEEE float
+    with pytest.raises(Exception):
+        wav.WavStream().feed(riff([(b'fmt ', fmt), (b'data', b'\x00' * 8)]))
+
+
+def test_trim_silence():
+    audio = np.array([0, 0, 3, 0, -1, 0], dtype=np.float32)
+    np.testing.assert_array_equal(wav.trim_silence(audio), [3, 0, -1])
+    assert len(wav.trim_silence(np.zeros(5, dtype=np.float32))) == 0
+
+
+def test_extract_audio_array_rejects_other_sample_rates():
+    predict = pytest.importorskip('model.emotion.predict')
+    recognizer = SimpleNamespace(sample_rate=48000)
+    recognizer.check_sample_rate = lambda rate: predict.IAI_EMOTION.check_sample_rate(recognizer, rate)
+    samples = make_samples(30, 1, 2)
+
+    audio = predict.IAI_EMOTION.extract_audio_array(recognizer, write_wave(samples, 2, sample_rate=48000))
+    np.testing.assert_array_equal(audio, expected_mono(samples, 2))
+    with pytest.raises(Exception):
+        predict.IAI_EMOTION.extract_audio_array(recognizer, write_wave(samples, 2, sample_rate=16000))
@@ -0,0 +1,75 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('torch')
+pytest.importorskip('sklearn')
+
+from sklearn.neighbors import KNeighborsClassifier
+
+from model.proc.feature_index import FeatureIndex
+
+
+def make_data(seed=0, n=300, dim=16, n_classes=5):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_classes, dim)) * 3
+    labels = rng.integers(0, n_classes, n)
+    feats = (centers[labels] + rng.standard_normal((n, dim))).astype(np.float32)
+    queries = (centers[rng.integers(0, n_classes, 50)] + rng.standard_normal((50, dim)) * 2).astype(np.float32)
+    return feats, np.array(['class{}'.format(label) for label in labels]), queries
+
+
+@pytest.mark.parametrize('p', [1, 2])
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+def test_search_matches_sklearn(p, weights):
+    feats, labels, queries = make_data()
+    model = KNeighborsClassifier(n_neighbors=7, p=p, weights=weights).fit(feats, labels)
+    index = FeatureIndex.from_estimator(model)
+
+    predicts, distances = index.search(queries, batch_size=16)
+    expected_dist, _ = model.kneighbors(queries)
+
+    assert predicts.tolist() == model.predict(queries).tolist()
+    np.testing.assert_allclose(distances, expected_dist, rtol=1e-4, atol=1e-4)
+
+
+def test_exact_match_votes_with_distance_weights():
+    feats, labels, _ = make_data()
+    model = KNeighborsClassifier(n_neighbors=5, weights='distance').fit(feats, labels)
+
+    predicts, distances = FeatureIndex.from_estimator(model).search(feats[:10])
+
+    assert predicts.tolist() == labels[:10].tolist()
+    np.testing.assert_allclose(distances[:, 0], 0., atol=1e-2)
+
+
+def test_save_and_load(tmp_path):
+    feats, labels, queries = make_data(seed=1)
+    model = KNeighborsClassifier(n_neighbors=3, p=1).fit(feats, labels)
+    index = FeatureIndex.from_estimator(model)
+    path = str(tmp_path / 'index.fidx')
+
+    index.save(path)
+    loaded = FeatureIndex.load(path)
+
+    assert (loaded.n_neighbors, loaded.p, loaded.weights) == (3, 1, 'uniform')
+    np.testing.assert_array_equal(loaded.feats, index.feats)
+    np.testing.assert_array_equal(loaded.classes, index.classes)
+    for actual, expected in zip(loaded.search(queries), index.search(queries)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_index'
+    path.write_bytes(b'something else')
+
+    with pytest.raises(Exception):
+        FeatureIndex.load(str(path))
+
+
+def test_neighbors_are_capped_by_samples():
+    feats, labels, queries = make_data(n=4)
+    model = KNeighborsClassifier(n_neighbors=4).fit(feats, labels)
+    index = FeatureIndex(feats, model._y, model.classes_, n_neighbors=10)
+
+    _, distances = index.search(queries)
+    assert distances.shape == (len(queries), 4)
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('sklearn')
+
+from emotionchat_session import LabelAggregator, SessionState, merge_history
+
+
+def make_result_dict(emotions: list, emotion_prob: list) -> dict:
+    return {
+        'input': ['토큰'], 'intent': '부정', 'entity': [], 'state': 'SUCCESS', 'emotion': emotions[0],
+        'emotions': emotions, 'emotion_prob': emotion_prob, 'emotion_probs': [0.5, 0.5],
+        'topics': ['일상'], 'topic_prob': [0.9], 'answer': '', 'previous_phase': [],
+        'current_phase': '/recognize_emotion_chat', 'next_phase': [], 'intent_turn_cnt': 0
+    }
+
+
+def test_label_aggregator_decay():
+    stats = LabelAggregator(decay=0.5)
+    stats.add('a', 1.0)
+    stats.add('b', 1.0)
+    stats.add('a', 0.5)
+
+    decayed = stats.decayed()
+    assert decayed['a'] == pytest.approx(1.0 * 0.25 + 0.5)
+    assert decayed['b'] == pytest.approx(0.5)
+    assert stats.top_decayed() == 'a'
+    assert stats.mode() == 'a'
+    assert stats.max_prob == {'a': 1.0, 'b': 1.0}
+    assert len(stats) == 3
+
+
+def test_label_aggregator_rescale_matches_naive_decay():
+    labels = ['a', 'b', 'c']
+    stats = LabelAggregator(decay=0.5)
+    naive = {}
+
+    for step in range(1000):  # 0.5 ** -1000 은 RESCALE_LIMIT를 넘으므로 중간에 정규화됨
+        naive = {label: score * 0.5 for label, score in naive.items()}
+        label = labels[step % 3]
+        naive[label] = naive.get(label, 0.0) + 1.0
+        stats.add(label, 1.0)
+
+    assert stats.decayed() == pytest.approx(naive)
+    assert stats.mode() == 'a'  # 'a'가 334번으로 가장 많이 등장
+
+
+def test_session_state_aggregates_only_new_labels():
+    session = SessionState()
+    session.update(merge_history(session.to_result_dict(), make_result_dict(['기쁨'], [0.6])))
+    session.update(merge_history(session.to_result_dict(), make_result_dict(['슬픔'], [0.9])))
+
+    assert session.emotion_stats.counts == {'기쁨': 1, '슬픔': 1}
+    assert session.emotion_stats.mode() == '슬픔'  # 횟수가 같으면 가장 최근 라벨
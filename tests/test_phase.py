@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('sklearn')
+
+import emotionchat_config as config
+from emotionchat_phase import PhaseGraph
+
+PHASES = sorted(set(config.PRED_PHASE) | set(config.PHASE_INTENT)) + ['/unknown_phase', '', '/check']
+
+NEXT_PHASES = list(config.PRED_PHASE.values()) + [
+    [],
+    ['/unknown_phase'],
+    ['/check_ucs', '/not_in_config'],
+    ('/end_chat', '/end_phase'),
+    '/check_ucs',  # 문자열이면 부분 문자열 검사
+    [['/other_user'], '/end_phase'],  # hash 할 수 없는 원소
+    [('/other_user',), '/end_phase'],
+]
+
+
+def outcome(check, next_phases, phase):
+    try:
+        return check(next_phases, phase)
+    except TypeError:
+        return TypeError
+
+
+@pytest.mark.parametrize('next_phases', NEXT_PHASES, ids=repr)
+def test_check_matches_membership(next_phases):
+    graph = PhaseGraph(config.PRED_PHASE, list(config.PHASE_INTENT))
+
+    for phase in PHASES + [None, ('/other_user',)]:
+        expected = outcome(lambda phases, current: current in phases, next_phases, phase)
+        assert outcome(graph.check, next_phases, phase) == expected, phase
+
+
+def test_check_unregistered_phase_is_remembered():
+    graph = PhaseGraph({'/a': ['/b']})
+
+    assert not graph.check(['/b'], '/c')
+    assert graph.check(['/c'], '/c')
+    assert graph.check(['/b'], '/b')
+    assert '/c' in graph.verify()[-1]
+
+
+def test_next_phases_returns_a_copy():
+    graph = PhaseGraph({'/a': ['/b', '/c'], '/b': ['/a'], '/c': ['/a']})
+
+    nexts = graph.next_phases('/a')
+    nexts.append('/d')
+
+    assert graph.next_phases('/a') == ['/b', '/c']
+    assert graph.can_follow('/a', '/b') and not graph.can_follow('/b', '/c')
@@ -0,0 +1,79 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from model.registry import ModelRegistry
+
+
+class Loader:
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return torch.nn.Linear(2, 2)
+
+
+def test_acquire_shares_one_handle():
+    registry, loader = ModelRegistry(), Loader()
+
+    first = registry.acquire('model.pt', loader)
+    second = registry.acquire('model.pt', loader)
+
+    assert first is second
+    assert loader.calls == 1
+    assert registry.refcount('model.pt') == 2
+    assert not first.training
+    assert not any(param.requires_grad for param in first.parameters())
+
+
+def test_keys_include_device_and_dtype():
+    registry, loader = ModelRegistry(), Loader()
+
+    registry.acquire('model.pt', loader)
+    registry.acquire('model.pt', loader, dtype=torch.float16)
+
+    assert loader.calls == 2
+    assert registry.refcount('model.pt') == 1
+    assert registry.refcount('model.pt', dtype=torch.float16) == 1
+
+
+def test_release_counts_down_and_unload_waits_for_zero():
+    registry, loader = ModelRegistry(), Loader()
+    registry.acquire('model.pt', loader)
+    registry.acquire('model.pt', loader)
+
+    assert registry.release('model.pt') == 1
+    assert not registry.unload('model.pt')
+    assert registry.release('model.pt') == 0
+    assert registry.release('model.pt') == 0  # 0 아래로 내려가지 않음
+    assert len(registry.loaded()) == 1  # 참조가 0이어도 자동으로 내리지 않음
+
+    assert registry.unload('model.pt')
+    assert registry.loaded() == []
+    assert registry.refcount('model.pt') == 0
+
+    registry.acquire('model.pt', loader)
+    assert loader.calls == 2  # unload 후에는 다시 로드
+
+
+def test_force_unload():
+    registry = ModelRegistry()
+    registry.acquire('model.pt', Loader())
+
+    assert registry.unload('model.pt', force=True)
+    assert registry.release('model.pt') == 0
+
+
+def test_failed_load_releases_reference():
+    registry = ModelRegistry()
+
+    def loader():
+        raise IOError('no checkpoint')
+
+    with pytest.raises(IOError):
+        registry.acquire('model.pt', loader)
+
+    assert registry.refcount('model.pt') == 0
+    assert registry.loaded() == []
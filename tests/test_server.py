@@ -0,0 +1,148 @@
+import asyncio
+import base64
+
+import pytest
+
+pytest.importorskip('aiohttp')
+server = pytest.importorskip('server')
+
+from aiohttp.test_utils import TestClient, TestServer
+
+AUDIO = base64.b64encode(b'RIFF0000WAVE').decode('ascii')
+
+
+class StubEngine:
+    """
+    EmotionChat.run 대신 입력 문장에 따라 정해진 result_dict를 돌려주는 엔진입니다.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.intent_entity_classifier = lambda text: ('인텐트', ['엔티티'])
+
+    @staticmethod
+    def _edit_entity(entity):
+        return entity
+
+    def run(self, text, wav_file, pre_result_dict, turn_cnts):
+        self.calls.append((text, pre_result_dict, turn_cnts))
+        state, phase = 'SUCCESS', '/recognize_emotion_chat'
+        if text == 'slot':
+            state = 'REQUIRE_LOCATION'
+        elif text == 'bye':
+            phase = '/end_phase'
+
+        return {
+            'input': [text] + pre_result_dict['input'],
+            'intent': '부정',
+            'entity': [],
+            'state': state,
+            'emotion': '슬픔',
+            'emotions': ['슬픔'] + pre_result_dict['emotions'],
+            'emotion_prob': [0.9] + pre_result_dict['emotion_prob'],
+            'emotion_probs': [0.1, 0.9],
+            'topics': ['일상'] + pre_result_dict['topics'],
+            'topic_prob': [0.8] + pre_result_dict['topic_prob'],
+            'answer': '답변',
+            'previous_phase': pre_result_dict['current_phase'],
+            'current_phase': phase,
+            'next_phase': ['/generate_emotion_chat', '/end_phase'],
+            'intent_turn_cnt': turn_cnts['intent_turn_cnt'] + 1
+        }
+
+
+def run_client(test):
+    async def main():
+        chat_server = server.ChatServer(engine=StubEngine(), max_workers=2)
+        async with TestClient(TestServer(chat_server.app)) as client:
+            await test(client, chat_server)
+
+    asyncio.run(main())
+
+
+def test_session_is_reused():
+    async def test(client, chat_server):
+        first = await client.post('/request_chat', json={'text': '안녕', 'audio': AUDIO})
+        assert first.status == 200
+        session_id = (await first.json())['session_id']
+
+        second = await client.post('/request_chat', json={'session_id': session_id, 'text': '우울해', 'audio': AUDIO})
+        body = await second.json()
+        assert body['session_id'] == session_id
+        assert body['input'] == ['우울해', '안녕']
+
+        _, pre_result_dict, turn_cnts = chat_server.engine.calls[-1]
+        assert turn_cnts == {'turn_cnt': 1, 'intent_turn_cnt': 1}
+        assert pre_result_dict['input'] == ['안녕']
+
+    run_client(test)
+
+
+def test_fill_slot_requires_waiting_session():
+    async def test(client, chat_server):
+        response = await client.post('/fill_slot', json={'session_id': 'unknown', 'text': '서울', 'audio': AUDIO})
+        assert response.status == 404
+
+        session_id = (await (await client.post('/request_chat', json={'text': '안녕', 'audio': AUDIO})).json())['session_id']
+        response = await client.post('/fill_slot', json={'session_id': session_id, 'text': '서울', 'audio': AUDIO})
+        assert response.status == 409
+
+        await client.post('/request_chat', json={'session_id': session_id, 'text': 'slot', 'audio': AUDIO})
+        response = await client.post('/fill_slot', json={'session_id': session_id, 'text': '서울', 'audio': AUDIO})
+        assert response.status == 200
+        assert chat_server.engine.calls[-1][0] == '서울'
+
+    run_client(test)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'data': 'not json'},
+    {'json': ['not', 'an', 'object']},
+    {'json': {'audio': AUDIO}},  # text 없음
+    {'json': {'text': '안녕'}},  # audio 없음
+    {'json': {'text': '안녕', 'audio': '%%% not base64 %%%'}},
+], ids=['not_json', 'not_object', 'no_text', 'no_audio', 'bad_base64'])
+def test_bad_requests(kwargs):
+    async def test(client, chat_server):
+        response = await client.post('/request_chat', **kwargs)
+        assert response.status == 400
+        assert chat_server.engine.calls == []
+
+    run_client(test)
+
+
+def test_end_phase_removes_session():
+    async def test(client, chat_server):
+        session_id = (await (await client.post('/request_chat', json={'text': '안녕', 'audio': AUDIO})).json())['session_id']
+        response = await client.post('/request_chat', json={'session_id': session_id, 'text': 'bye', 'audio': AUDIO})
+        assert (await response.json())['current_phase'] == '/end_phase'
+        assert session_id not in chat_server.sessions.sessions
+
+        response = await client.post('/fill_slot', json={'session_id': session_id, 'text': '서울', 'audio': AUDIO})
+        assert response.status == 404
+
+    run_client(test)
+
+
+def test_get_intent_and_entity():
+    async def test(client, chat_server):
+        response = await client.post('/get_intent', json={'text': '안녕'})
+        assert await response.json() == {'intent': '인텐트'}
+        response = await client.post('/get_entity', json={'text': '안녕'})
+        assert await response.json() == {'entity': ['엔티티']}
+
+    run_client(test)
+
+
+def test_evict_skips_busy_sessions():
+    async def test():
+        store = server.SessionStore(ttl=1000, max_sessions=2)
+        busy = store.get('busy')
+        await busy.lock.acquire()
+        store.get('idle')
+        store.get('new')
+
+        assert list(store.sessions) == ['busy', 'new']
+        busy.lock.release()
+
+    asyncio.run(test())
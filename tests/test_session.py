@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('sklearn')
+
+from emotionchat_session import RingBuffer, SessionState, merge_history
+
+
+def make_result_dict(turn: int, pre_result_dict: dict) -> dict:
+    result_dict = {
+        'input': ['토큰{}'.format(turn)],
+        'intent': '부정',
+        'entity': [],
+        'state': 'SUCCESS',
+        'emotion': '슬픔',
+        'emotions': ['슬픔' if turn % 2 else '기쁨'],
+        'emotion_prob': [0.5 + turn / 100],
+        'emotion_probs': [0.1, 0.2, 0.7],
+        'topics': ['일상'],
+        'topic_prob': [0.9],
+        'answer': '답변{}'.format(turn),
+        'previous_phase': ['/welcomemsg_chat'],
+        'current_phase': '/recognize_emotion_chat',
+        'next_phase': ['/generate_emotion_chat', '/end_phase'],
+        'intent_turn_cnt': turn
+    }
+    return merge_history(pre_result_dict, result_dict)
+
+
+def test_ring_buffer_keeps_latest_first():
+    buffer = RingBuffer(3)
+    for value in range(1, 6):
+        buffer.push(value)
+
+    assert buffer.tolist() == [5, 4, 3]
+    assert len(buffer) == 3
+    assert buffer[0] == 5 and buffer[-1] == 3
+    with pytest.raises(IndexError):
+        buffer[3]
+
+    buffer.assign([9, 8, 7, 6])
+    assert buffer.tolist() == [9, 8, 7]
+
+    probs = RingBuffer(2, 'd')
+    probs.assign([0.25])
+    assert probs.tolist() == [0.25]
+
+
+def test_session_state_round_trip():
+    session = SessionState()
+    for turn in range(5):
+        session.update(make_result_dict(turn, session.to_result_dict()))
+
+    dict_ = json.loads(json.dumps(session.to_dict(), ensure_ascii=False))
+    restored = SessionState.from_dict(dict_)
+
+    assert restored.to_dict() == session.to_dict()
+    assert restored.turn_cnt == 5
+    assert restored.emotion_stats.decayed() == pytest.approx(session.emotion_stats.decayed())
+    assert restored.to_result_dict()['emotions'] == ['기쁨', '슬픔', '기쁨', '슬픔', '기쁨']
+
+
+def test_session_state_rejects_unknown_version():
+    dict_ = SessionState().to_dict()
+    dict_['version'] = SessionState.VERSION + 1
+
+    with pytest.raises(ValueError):
+        SessionState.from_dict(dict_)
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('sklearn')
+pytest.importorskip('pandas')
+pytest.importorskip('konlpy')
+pytest.importorskip('requests')
+
+from data.spell_checker import BaseSpellChecker, CachedSpellChecker, LocalSpellChecker
+
+SPELL_DICT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'data', 'spell_dict.txt')
+
+
+class CountingSpellChecker(BaseSpellChecker):
+
+    def __init__(self, name: str = 'counting'):
+        self.name = name
+        self.calls = []
+
+    @property
+    def cache_key(self) -> str:
+        return self.name
+
+    def fix(self, text: str) -> str:
+        return text.upper()
+
+    def try_fix(self, text: str) -> str:
+        self.calls.append(text)
+        return None if 'fail' in text else self.fix(text)
+
+    def fallback_fix(self, text: str) -> str:
+        return text
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'spell_cache.sqlite3')
+
+
+def test_hit_after_miss(cache_path):
+    checker = CountingSpellChecker()
+    cached = CachedSpellChecker(checker, cache_path)
+
+    assert cached.fix('안녕 hello') == '안녕 HELLO'
+    assert cached.fix('안녕   hello ') == '안녕 HELLO'  # 정규화된 문장이 같으면 같은 key
+    assert checker.calls == ['안녕 hello']
+    cached.close()
+
+
+def test_cache_is_kept_on_disk(cache_path):
+    CachedSpellChecker(CountingSpellChecker(), cache_path).fix('hello')
+
+    checker = CountingSpellChecker()
+    assert CachedSpellChecker(checker, cache_path).fix('hello') == 'HELLO'
+    assert checker.calls == []
+
+
+def test_backends_do_not_share_entries(cache_path):
+    CachedSpellChecker(CountingSpellChecker('a'), cache_path).fix('hello')
+
+    checker = CountingSpellChecker('b')
+    CachedSpellChecker(checker, cache_path).fix('hello')
+    assert checker.calls == ['hello']
+
+
+def test_failed_fix_is_not_cached(cache_path):
+    checker = CountingSpellChecker()
+    cached = CachedSpellChecker(checker, cache_path)
+
+    assert cached.fix('fail me') == 'fail me'
+    assert cached.fix('fail me') == 'fail me'
+    assert checker.calls == ['fail me', 'fail me']
+
+
+def test_empty_text_skips_backend(cache_path):
+    checker = CountingSpellChecker()
+
+    assert CachedSpellChecker(checker, cache_path).fix('   ') == ''
+    assert checker.calls == []
+
+
+@pytest.fixture(scope='module')
+def local_checker():
+    return LocalSpellChecker(SPELL_DICT)
+
+
+@pytest.mark.parametrize('text', [
+    '지금새로운 일을 시작했어요',
+    '방금새벽에 일어났어',
+    '김희안 선생님이 오셨어',
+    '오늘 기분이 좋아요',
+])
+def test_local_keeps_near_miss_words(local_checker, text):
+    assert local_checker.fix(text) == text
+
+
+@pytest.mark.parametrize('text, fixed', [
+    ('금새 괜찮아졌어', '금세 괜찮아졌어'),
+    ('정말 희안하다', '정말 희한하다'),
+    ('일이 잘 안됬어', '일이 잘 안됐어'),
+    ('내일 공부할께요', '내일 공부할게요'),
+    ('그러면 안되요', '그러면 안 돼요'),
+    ('ㅋㅋㅋㅋㅋ 오랫만이야', 'ㅋㅋ 오랜만이야'),
+])
+def test_local_fixes_known_mistakes(local_checker, text, fixed):
+    assert local_checker.fix(text) == fixed
+
+
+def test_local_cache_key_follows_dict(tmp_path):
+    path = tmp_path / 'spell_dict.txt'
+    path.write_text('~됬\t됐\n', encoding='utf-8')
+    first = LocalSpellChecker(str(path))
+    path.write_text('됬\t됐\n', encoding='utf-8')  # 위치 제한만 바뀌어도 교정 결과가 달라짐
+    second = LocalSpellChecker(str(path))
+
+    assert first.cache_key != second.cache_key
+    assert first.fix('안됬어') == '안됐어'
+    assert second.fix('안됬어') == '안됬어'